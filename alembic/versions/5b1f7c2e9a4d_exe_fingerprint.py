@@ -0,0 +1,33 @@
+"""exe fingerprint cache
+
+Revision ID: 5b1f7c2e9a4d
+Revises: 0e35fff276f3
+Create Date: 2026-10-17 09:12:41.204318
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '5b1f7c2e9a4d'
+down_revision = '0e35fff276f3'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table('exe_fingerprint',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('path', sa.Text(), nullable=False, index=True, unique=True),
+        sa.Column('size', sa.BigInteger, nullable=False),
+        sa.Column('mtime', sa.BigInteger, nullable=False),
+        sa.Column('file_id', sa.String(64), nullable=False),
+        sa.Column('sha256', sa.String(64), nullable=False),
+        sa.Column('version', sa.String(32), nullable=False),
+        sa.Column('updated_on', sa.DateTime, nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table('exe_fingerprint')
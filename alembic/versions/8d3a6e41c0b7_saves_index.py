@@ -0,0 +1,36 @@
+"""saves index
+
+Revision ID: 8d3a6e41c0b7
+Revises: 5b1f7c2e9a4d
+Create Date: 2026-10-17 14:37:05.861920
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '8d3a6e41c0b7'
+down_revision = '5b1f7c2e9a4d'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table('saves_directory',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('save_dir', sa.Text(), nullable=False, index=True),
+        sa.Column('path', sa.Text(), nullable=False),
+        sa.Column('world', sa.Text(), nullable=False),
+        sa.Column('mtime', sa.BigInteger, nullable=False),
+        sa.Column('size', sa.BigInteger, nullable=False),
+        sa.Column('files', sa.Integer, nullable=False),
+        sa.Column('sav_files', sa.Integer, nullable=False),
+        sa.Column('world_files', sa.Integer, nullable=False),
+        sa.Column('subdirs', sa.Text(), nullable=False),
+        sa.UniqueConstraint('save_dir', 'path'),
+    )
+
+
+def downgrade():
+    op.drop_table('saves_directory')
@@ -0,0 +1,27 @@
+"""saves size breakdown
+
+Revision ID: c41e9b27f5d3
+Revises: 8d3a6e41c0b7
+Create Date: 2026-10-17 16:05:48.372615
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'c41e9b27f5d3'
+down_revision = '8d3a6e41c0b7'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    # Existing records have no categories and are scanned again
+    with op.batch_alter_table('saves_directory') as batch_op:
+        batch_op.add_column(sa.Column('categories', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('saves_directory') as batch_op:
+        batch_op.drop_column('categories')
@@ -0,0 +1,34 @@
+"""build archive store
+
+Revision ID: e72a5d90b1c6
+Revises: c41e9b27f5d3
+Create Date: 2026-10-17 19:22:10.518094
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'e72a5d90b1c6'
+down_revision = 'c41e9b27f5d3'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table('build_archive',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('build', sa.String(16), nullable=False),
+        sa.Column('asset_name', sa.Text(), nullable=False),
+        sa.Column('sha256', sa.String(64), nullable=False),
+        sa.Column('path', sa.Text(), nullable=False),
+        sa.Column('size', sa.BigInteger, nullable=False),
+        sa.Column('stored_on', sa.DateTime, nullable=False),
+        sa.Column('last_used_on', sa.DateTime, nullable=False),
+        sa.UniqueConstraint('build', 'asset_name', 'sha256'),
+    )
+
+
+def downgrade():
+    op.drop_table('build_archive')
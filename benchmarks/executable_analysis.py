@@ -0,0 +1,250 @@
+"""Measure the cost of fingerprinting game executables on synthetic binaries
+and store the results as JSON so they can be compared between commits.
+
+Each engine computes the SHA-256 hexdigest and the game version of the
+executable, which is what update_version and analyse_new_build need before
+the version label can be set. Runs headless, without Qt.
+
+Usage:
+    python benchmarks/executable_analysis.py [--sizes 10,50,100,200]
+        [--runs N] [--output FILE]
+    python benchmarks/executable_analysis.py --compare BASE.json NEW.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__),
+    '..')))
+
+import cddagl.constants as cons
+from cddagl.fingerprint import Fingerprinter, fingerprint_file
+
+from synthetic import make_executable, rdata_range, section_layout
+
+VERSION = '0.E-12345-gdeadbee'
+
+
+def legacy_engine(path):
+    """Hashing and version detection as done by the former QTimer reading
+    loop, without the event loop overhead between chunks.
+    """
+    sha256 = hashlib.sha256()
+    game_version = ''
+    last_bytes = None
+
+    with open(path, 'rb') as exe_file:
+        while True:
+            data = exe_file.read(cons.READ_BUFFER_SIZE)
+            if len(data) == 0:
+                break
+
+            last_frame = data
+            if last_bytes is not None:
+                last_frame = last_bytes + last_frame
+
+            match = re.search(
+                b'(?P<version>[01]\\.[A-F](-\\d+-g[0-9a-f]+)?)\\x00',
+                last_frame)
+            if match is not None:
+                version = match.group('version').decode('ascii')
+                if len(version) > len(game_version):
+                    game_version = version
+
+            sha256.update(data)
+            last_bytes = data
+
+    return sha256.hexdigest(), game_version
+
+
+def stream_engine(path):
+    """Fingerprinting of a stream as done while extracting a new build."""
+    fingerprinter = Fingerprinter()
+
+    with open(path, 'rb') as exe_file:
+        while True:
+            data = exe_file.read(cons.FINGERPRINT_CHUNK_SIZE)
+            if len(data) == 0:
+                break
+
+            fingerprinter.update(data)
+
+    return fingerprinter.result()
+
+
+ENGINES = {
+    'legacy': legacy_engine,
+    'mmap': fingerprint_file,
+    'stream': stream_engine,
+}
+
+
+def version_offsets(size, rng_seed):
+    """Return the (case, offset) pairs embedding the version at a random
+    offset of the read-only data, across a READ_BUFFER_SIZE boundary of the
+    read-only data and at a random offset outside of it.
+    """
+    rng = random.Random(rng_seed)
+
+    rdata_start, rdata_end = rdata_range(size)
+    version_length = len(VERSION) + 1
+
+    boundary = rng.randrange(rdata_start // cons.READ_BUFFER_SIZE + 1,
+        (rdata_end - version_length) // cons.READ_BUFFER_SIZE)
+    boundary *= cons.READ_BUFFER_SIZE
+
+    for name, start, section_size, characteristics in section_layout(size):
+        if name == b'.data':
+            data_offset = rng.randrange(start, start + section_size -
+                version_length)
+
+    return (
+        ('random', rng.randrange(rdata_start, rdata_end - version_length)),
+        ('split', boundary - version_length // 2),
+        ('outside', data_offset),
+    )
+
+
+def measure(engine, path, runs):
+    timings = []
+    for run in range(runs):
+        started = time.perf_counter()
+        sha256, version = engine(path)
+        # The label is set as soon as the engine returns since the build
+        # lookup needs the hash as well as the version
+        timings.append(time.perf_counter() - started)
+
+    return timings, sha256, version
+
+
+def current_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes, engines, runs, seed):
+    results = []
+
+    with tempfile.TemporaryDirectory(prefix=cons.TEMP_PREFIX) as temp_dir:
+        exe_path = os.path.join(temp_dir, 'cataclysm-tiles.exe')
+
+        for size_mib in sizes:
+            size = size_mib * 1024 * 1024
+            for case, offset in version_offsets(size, seed + size_mib):
+                make_executable(exe_path, size, VERSION, offset,
+                    seed=seed + size_mib)
+
+                with open(exe_path, 'rb') as exe_file:
+                    expected_sha256 = hashlib.sha256(exe_file.read()).hexdigest()
+
+                for engine_name in engines:
+                    timings, sha256, version = measure(ENGINES[engine_name],
+                        exe_path, runs)
+
+                    best = min(timings)
+                    result = {
+                        'size_mib': size_mib,
+                        'case': case,
+                        'version_offset': offset,
+                        'engine': engine_name,
+                        'timings': timings,
+                        'time_to_label': best,
+                        'throughput_mib_s': size_mib / best,
+                        'version': version,
+                        'correct': (version == VERSION and
+                            sha256 == expected_sha256),
+                    }
+                    results.append(result)
+
+                    print('{size:>4} MiB {case:>8} {engine:>7}: {elapsed:8.4f} s'
+                        ' {throughput:8.1f} MiB/s {status}'.format(
+                        size=size_mib, case=case, engine=engine_name,
+                        elapsed=best, throughput=result['throughput_mib_s'],
+                        status='ok' if result['correct'] else 'WRONG'))
+
+    return results
+
+
+def result_key(result):
+    return result['size_mib'], result['case'], result['engine']
+
+
+def compare(base_file, new_file):
+    with open(base_file, 'r', encoding='utf8') as f:
+        base = json.load(f)
+    with open(new_file, 'r', encoding='utf8') as f:
+        new = json.load(f)
+
+    print('{0} -> {1}'.format(base.get('commit'), new.get('commit')))
+
+    base_results = dict((result_key(result), result)
+        for result in base['results'])
+    for result in new['results']:
+        base_result = base_results.get(result_key(result))
+        if base_result is None:
+            continue
+
+        ratio = result['time_to_label'] / base_result['time_to_label']
+        print('{size:>4} MiB {case:>8} {engine:>7}: {base:8.4f} s -> '
+            '{new:8.4f} s ({change:+.1%})'.format(size=result['size_mib'],
+            case=result['case'], engine=result['engine'],
+            base=base_result['time_to_label'], new=result['time_to_label'],
+            change=ratio - 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10,50,100,200',
+        help='comma separated sizes of the synthetic executables in MiB')
+    parser.add_argument('--engines', default=','.join(ENGINES),
+        help='comma separated engines among {0}'.format(', '.join(ENGINES)))
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='executable_analysis.json',
+        help='JSON file where the results are stored')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'),
+        help='compare two result files instead of running the benchmarks')
+    args = parser.parse_args()
+
+    if args.compare is not None:
+        compare(*args.compare)
+        return
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    engines = args.engines.split(',')
+    for engine_name in engines:
+        if engine_name not in ENGINES:
+            parser.error('unknown engine: {0}'.format(engine_name))
+
+    results = run_benchmarks(sizes, engines, args.runs, args.seed)
+
+    report = {
+        'commit': current_commit(),
+        'created_on': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'runs': args.runs,
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf8') as f:
+        json.dump(report, f, indent=2)
+
+    print('Results stored in {0}'.format(args.output))
+
+
+if __name__ == '__main__':
+    main()
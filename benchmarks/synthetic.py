@@ -0,0 +1,117 @@
+"""Synthetic game executables used by the benchmarks.
+
+The generated files are minimal PE images with a code section of random
+bytes, a read-only data section made of null terminated strings and a
+writable data section. The version string is embedded at a chosen offset.
+"""
+
+import random
+import struct
+
+PE_OFFSET = 0x80
+HEADERS_SIZE = 0x400
+OPTIONAL_HEADER_SIZE = 0xE0
+CHUNK_SIZE = 4 * 1024 * 1024
+
+SECTIONS = (
+    # name, share of the file, characteristics
+    (b'.text', 0.70, 0x60000020),
+    (b'.rdata', 0.20, 0x40000040),
+    (b'.data', 0.10, 0xC0000040),
+)
+
+# Strings never contain upper case letters so no accidental version string
+# can be generated in the read-only data section
+STRINGS_ALPHABET = b'abcdefghijklmnopqrstuvwxyz0123456789 ._/%-\x00'
+STRINGS_TABLE = bytes(STRINGS_ALPHABET[x % len(STRINGS_ALPHABET)]
+    for x in range(256))
+
+
+def random_bytes(size, rng):
+    return rng.getrandbits(size * 8).to_bytes(size, 'little')
+
+
+def random_strings(size, rng):
+    return random_bytes(size, rng).translate(STRINGS_TABLE)
+
+
+def pe_headers(section_layout):
+    headers = bytearray(HEADERS_SIZE)
+    headers[0:2] = b'MZ'
+    struct.pack_into('<I', headers, 0x3C, PE_OFFSET)
+    headers[PE_OFFSET:PE_OFFSET + 4] = b'PE\0\0'
+    struct.pack_into('<HHIIIHH', headers, PE_OFFSET + 4, 0x8664,
+        len(section_layout), 0, 0, 0, OPTIONAL_HEADER_SIZE, 0x22)
+
+    section_table = PE_OFFSET + 24 + OPTIONAL_HEADER_SIZE
+    for index, (name, start, size, characteristics) in enumerate(
+        section_layout):
+        struct.pack_into('<8sIIIIIIHHI', headers, section_table + index * 40,
+            name, size, start, size, start, 0, 0, 0, 0, characteristics)
+
+    return bytes(headers)
+
+
+def section_layout(size):
+    layout = []
+    start = HEADERS_SIZE
+    body_size = size - HEADERS_SIZE
+    for index, (name, share, characteristics) in enumerate(SECTIONS):
+        if index == len(SECTIONS) - 1:
+            section_size = size - start
+        else:
+            section_size = int(body_size * share)
+        layout.append((name, start, section_size, characteristics))
+        start += section_size
+
+    return layout
+
+
+def rdata_range(size):
+    """Return the (start, end) offsets of the read-only data section of a
+    synthetic executable of the given size."""
+    for name, start, section_size, characteristics in section_layout(size):
+        if name == b'.rdata':
+            return start, start + section_size
+
+
+def make_executable(path, size, version, version_offset=None, seed=None):
+    """Write a synthetic executable of size bytes at path with version
+    embedded as a null terminated string. The version is put at a random
+    offset of the read-only data section unless version_offset is given.
+    Return the offset used.
+    """
+    rng = random.Random(seed)
+    layout = section_layout(size)
+
+    version_bytes = version.encode('ascii') + b'\x00'
+    if version_offset is None:
+        rdata_start, rdata_end = rdata_range(size)
+        version_offset = rng.randrange(rdata_start,
+            rdata_end - len(version_bytes))
+    version_end = version_offset + len(version_bytes)
+
+    with open(path, 'wb') as exe_file:
+        exe_file.write(pe_headers(layout))
+        for name, start, section_size, characteristics in layout:
+            if name == b'.rdata':
+                generate = random_strings
+            else:
+                generate = random_bytes
+
+            # Sections are generated in chunks to bound memory usage
+            end = start + section_size
+            for chunk_start in range(start, end, CHUNK_SIZE):
+                chunk_end = min(chunk_start + CHUNK_SIZE, end)
+                content = bytearray(generate(chunk_end - chunk_start, rng))
+
+                if version_offset < chunk_end and chunk_start < version_end:
+                    first = max(version_offset, chunk_start)
+                    last = min(version_end, chunk_end)
+                    content[first - chunk_start:last - chunk_start] = (
+                        version_bytes[first - version_offset:
+                            last - version_offset])
+
+                exe_file.write(content)
+
+    return version_offset
@@ -0,0 +1,98 @@
+"""Compare the time needed to find the game version in synthetic executables
+with the legacy windowed regex scan, the whole file scan and the PE section
+aware locator.
+
+Usage: python benchmarks/version_locator.py [--size MIB] [--runs N]
+"""
+
+import argparse
+import mmap
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__),
+    '..')))
+
+import cddagl.constants as cons
+from cddagl.fingerprint import locate_version, scan_version
+
+from synthetic import make_executable
+
+VERSION = '0.E-12345-gdeadbee'
+
+
+def legacy_scan(mapped):
+    """Version detection as done by the former QTimer reading loop."""
+    game_version = ''
+    last_bytes = None
+    for start in range(0, len(mapped), cons.READ_BUFFER_SIZE):
+        data = mapped[start:start + cons.READ_BUFFER_SIZE]
+        last_frame = data
+        if last_bytes is not None:
+            last_frame = last_bytes + last_frame
+
+        match = re.search(
+            b'(?P<version>[01]\\.[A-F](-\\d+-g[0-9a-f]+)?)\\x00',
+            last_frame)
+        if match is not None:
+            version = match.group('version').decode('ascii')
+            if len(version) > len(game_version):
+                game_version = version
+
+        last_bytes = data
+
+    return game_version
+
+
+def full_scan(mapped):
+    return scan_version(mapped, 0, len(mapped))
+
+
+def measure(function, mapped, runs):
+    best = None
+    for run in range(runs):
+        started = time.perf_counter()
+        result = function(mapped)
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=64,
+        help='size of the synthetic executable in MiB')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix=cons.TEMP_PREFIX) as temp_dir:
+        exe_path = os.path.join(temp_dir, 'cataclysm-tiles.exe')
+        make_executable(exe_path, args.size * 1024 * 1024, VERSION,
+            seed=args.seed)
+
+        with open(exe_path, 'rb') as exe_file:
+            with mmap.mmap(exe_file.fileno(), 0,
+                access=mmap.ACCESS_READ) as mapped:
+                results = []
+                for name, function in (('legacy', legacy_scan),
+                    ('full scan', full_scan), ('pe sections', locate_version)):
+                    elapsed, version = measure(function, mapped, args.runs)
+                    results.append((name, elapsed, version))
+
+    legacy_elapsed = results[0][1]
+    print('{0} MiB synthetic executable, best of {1} runs'.format(args.size,
+        args.runs))
+    for name, elapsed, version in results:
+        print('{name:>12}: {elapsed:8.4f} s  x{speedup:<7.1f} {version}'.format(
+            name=name, elapsed=elapsed, speedup=legacy_elapsed / elapsed,
+            version=version))
+
+
+if __name__ == '__main__':
+    main()
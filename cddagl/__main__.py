@@ -1,3 +1,11 @@
+import sys
+
+if len(sys.argv) > 1 and sys.argv[1] == 'update':
+    # The headless update does not load the user interface
+    import cddagl.updater
+
+    sys.exit(cddagl.updater.main(sys.argv[2:]))
+
 import cddagl.launcher
 
 cddagl.launcher.run_cddagl()
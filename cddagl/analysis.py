@@ -0,0 +1,115 @@
+import copy
+import os
+import threading
+from os import scandir
+
+import cddagl.constants as cons
+from cddagl.assets import scan_mods, scan_soundpacks
+from cddagl.fingerprint import fingerprint_file, fingerprint_key
+from cddagl.saves import saves_summary
+
+# Directories, relative to the game directory, whose mtimes and the mtimes of
+# their direct subdirectories invalidate each kind of analysis result
+SIGNATURE_PATHS = {
+    'saves': (('save',),),
+    'mods': (('data', 'mods'), ('mods',)),
+    'soundpacks': (('data', 'sound'),),
+}
+
+ANALYSERS = {
+    'saves': lambda game_dir: saves_summary(os.path.join(game_dir, 'save')),
+    'mods': scan_mods,
+    'soundpacks': scan_soundpacks,
+}
+
+
+def find_executable(game_dir):
+    """Return the path of the game executable in game_dir or None."""
+    for exe_name in cons.GAME_EXECUTABLES:
+        exe_path = os.path.join(game_dir, exe_name)
+        if os.path.isfile(exe_path):
+            return exe_path
+
+    return None
+
+
+def directory_signature(game_dir, kind):
+    signature = []
+    for subpath in SIGNATURE_PATHS[kind]:
+        path = os.path.join(game_dir, *subpath)
+        try:
+            path_mtime = os.stat(path).st_mtime_ns
+            with scandir(path) as dir_scan:
+                children = sorted((entry.name, entry.stat().st_mtime_ns)
+                    for entry in dir_scan if entry.is_dir())
+        except OSError:
+            path_mtime = None
+            children = []
+
+        signature.append((path, path_mtime, tuple(children)))
+
+    return tuple(signature)
+
+
+class AnalysisCache:
+    """Analysis results of game directories. A result is only returned while
+    the directories it was computed from keep the same mtimes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def key(self, kind, game_dir):
+        return kind, os.path.normcase(os.path.abspath(game_dir))
+
+    def get(self, kind, game_dir):
+        with self._lock:
+            entry = self._entries.get(self.key(kind, game_dir))
+
+        if entry is None:
+            return None
+
+        signature, value = entry
+        if signature != directory_signature(game_dir, kind):
+            return None
+
+        return copy.deepcopy(value)
+
+    def put(self, kind, game_dir, signature, value):
+        with self._lock:
+            self._entries[self.key(kind, game_dir)] = (signature,
+                copy.deepcopy(value))
+
+    def analyse(self, kind, game_dir):
+        """Return the cached result or compute and cache a new one."""
+        value = self.get(kind, game_dir)
+        if value is None:
+            # The signature is taken first so that changes made during the
+            # analysis invalidate its result
+            signature = directory_signature(game_dir, kind)
+            value = ANALYSERS[kind](game_dir)
+            self.put(kind, game_dir, signature, value)
+
+        return value
+
+
+analysis_cache = AnalysisCache()
+
+
+def analyse_game_dir(game_dir, fingerprint=False):
+    """Warm the analysis cache for a game directory. When fingerprint is
+    True, also return the (path, identity, sha256, version) fingerprint of
+    its executable to be stored in the fingerprint cache.
+    """
+    for kind in ANALYSERS:
+        analysis_cache.analyse(kind, game_dir)
+
+    if fingerprint:
+        exe_path = find_executable(game_dir)
+        if exe_path is not None:
+            path, identity = fingerprint_key(exe_path)
+            sha256, version = fingerprint_file(exe_path)
+            return path, identity, sha256, version
+
+    return None
@@ -0,0 +1,134 @@
+import hashlib
+import os
+import shutil
+
+import cddagl.constants as cons
+from cddagl.sql.functions import (
+    get_config_value, config_true, get_config_path, get_build_archive,
+    get_build_archives, add_build_archive, touch_build_archive,
+    remove_build_archive
+)
+
+
+def sha256_file(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as archive_file:
+        while True:
+            data = archive_file.read(cons.FINGERPRINT_CHUNK_SIZE)
+            if len(data) == 0:
+                break
+            sha256.update(data)
+
+    return sha256.hexdigest()
+
+
+def default_store_dir():
+    return os.path.join(os.path.dirname(get_config_path()), 'archives')
+
+
+class BuildArchiveStore:
+    """Downloaded build archives kept in store_dir under their sha256 and
+    indexed in the config database by build number, asset name and sha256.
+    The least recently used archives are removed when their total size goes
+    over size_budget bytes.
+    """
+
+    def __init__(self, store_dir, size_budget):
+        self.store_dir = store_dir
+        self.size_budget = size_budget
+
+    def archive_path(self, sha256, asset_name):
+        return os.path.join(self.store_dir, sha256, asset_name)
+
+    def find(self, build, asset_name, sha256=None):
+        """Return the stored archive of a build asset or None. sha256 is
+        checked when it is known before downloading.
+        """
+        archive = get_build_archive(build, asset_name, sha256)
+        if archive is None:
+            return None
+
+        try:
+            size = os.path.getsize(archive['path'])
+        except OSError:
+            size = None
+
+        if size != archive['size']:
+            # The archive was removed or changed outside of the launcher
+            self.remove(archive)
+            return None
+
+        touch_build_archive(archive['id'])
+        return archive
+
+    def add(self, build, asset_name, sha256, path):
+        """Move the archive at path into the store and return its new
+        path.
+        """
+        target = self.archive_path(sha256, asset_name)
+        size = os.path.getsize(path)
+
+        if not (os.path.isfile(target) and os.path.getsize(target) == size):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            # This is a rename when the store is on the same volume
+            shutil.move(path, target)
+
+        add_build_archive(build, asset_name, sha256, target, size)
+        self.evict(target)
+
+        return target
+
+    def remove(self, archive):
+        """Forget a stored archive and delete its file unless another build
+        uses the same content. Return True when the file was deleted.
+        """
+        remove_build_archive(archive['id'])
+
+        if any(other['path'] == archive['path']
+            for other in get_build_archives()):
+            return False
+
+        try:
+            os.remove(archive['path'])
+            os.rmdir(os.path.dirname(archive['path']))
+        except OSError:
+            pass
+
+        return True
+
+    def evict(self, keep_path=None):
+        """Remove the least recently used archives, except the one at
+        keep_path, until the store fits in its size budget.
+        """
+        archives = get_build_archives()
+
+        sizes = {}
+        for archive in archives:
+            sizes[archive['path']] = archive['size']
+        total_size = sum(sizes.values())
+
+        for archive in archives:
+            if total_size <= self.size_budget:
+                break
+            if archive['path'] == keep_path:
+                continue
+
+            if self.remove(archive):
+                total_size -= archive['size']
+
+
+def get_build_store():
+    """Return the build archive store configured in the settings or None
+    when archives are not kept.
+    """
+    if not config_true(get_config_value('keep_archive_copy', 'False')):
+        return None
+
+    store_dir = get_config_value('archive_directory', '')
+    if store_dir == '':
+        store_dir = default_store_dir()
+
+    size_budget = int(get_config_value('archive_store_size',
+        str(cons.ARCHIVE_STORE_SIZE))) * 1024 * 1024
+
+    return BuildArchiveStore(store_dir, size_budget)
@@ -0,0 +1,214 @@
+import json
+import os
+import stat
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from os import scandir
+
+import cddagl.constants as cons
+
+
+def tree_size(path):
+    """Return the total size of the files in a directory tree."""
+    next_scans = deque()
+    current_scan = scandir(path)
+
+    total_size = 0
+
+    while True:
+        try:
+            entry = next(current_scan)
+            if entry.is_dir():
+                next_scans.append(entry.path)
+            elif entry.is_file():
+                total_size += entry.stat().st_size
+        except StopIteration:
+            if len(next_scans) > 0:
+                current_scan = scandir(next_scans.popleft())
+            else:
+                break
+
+    return total_size
+
+
+def mod_config_info(config_file):
+    val = {}
+    keys = ('ident', 'name', 'author', 'authors', 'description', 'category',
+        'version')
+    try:
+        with open(config_file, 'r', encoding='utf8') as f:
+            try:
+                values = json.load(f)
+                if isinstance(values, dict):
+                    if values.get('type', '') == 'MOD_INFO':
+                        for key in keys:
+                            val[key] = values.get(key, None)
+                elif isinstance(values, list):
+                    for item in values:
+                        if (isinstance(item, dict)
+                            and item.get('type', '') == 'MOD_INFO'):
+                                for key in keys:
+                                    val[key] = item.get(key, None)
+                                break
+            except ValueError:
+                pass
+    except FileNotFoundError:
+        return val
+    return val
+
+
+def soundpack_config_info(config_file):
+    val = {}
+    try:
+        with open(config_file, 'r', encoding='latin1') as f:
+            for line in f:
+                if line.startswith('NAME'):
+                    space_index = line.find(' ')
+                    name = line[space_index:].strip().replace(
+                        ',', '')
+                    val['NAME'] = name
+                elif line.startswith('VIEW'):
+                    space_index = line.find(' ')
+                    view = line[space_index:].strip()
+                    val['VIEW'] = view
+
+                if 'NAME' in val and 'VIEW' in val:
+                    break
+    except FileNotFoundError:
+        return val
+    return val
+
+
+def scan_assets(assets_dir, config_name, config_info, required_keys):
+    """Return the info of each asset directory in assets_dir that has a
+    config file (possibly disabled) with all the required keys."""
+    assets = []
+
+    if not os.path.isdir(assets_dir):
+        return assets
+
+    with scandir(assets_dir) as dir_scan:
+        for entry in dir_scan:
+            if not entry.is_dir():
+                continue
+
+            for file_name, enabled in ((config_name, True),
+                (config_name + '.disabled', False)):
+                config_file = os.path.join(entry.path, file_name)
+                info = asset_index.config_info(config_file, config_info)
+                if info is not None:
+                    if all(key in info for key in required_keys):
+                        asset_info = {
+                            'path': entry.path,
+                            'enabled': enabled
+                        }
+                        asset_info.update(info)
+                        asset_info['size'] = tree_size(entry.path)
+
+                        assets.append(asset_info)
+                        break
+
+    return assets
+
+
+# Config file, parser and identity key of each kind of asset
+ASSET_KINDS = {
+    'tilesets': ('tileset.txt', soundpack_config_info, 'NAME'),
+    'soundpacks': ('soundpack.txt', soundpack_config_info, 'NAME'),
+    'mods': ('modinfo.json', mod_config_info, 'ident'),
+}
+
+
+class AssetIndex:
+    """Info parsed from asset config files. An info is only reused while its
+    config file keeps the same mtime and size.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def config_info(self, config_file, config_info):
+        """Return the cached or newly parsed info of a config file or None
+        when it does not exist."""
+        try:
+            config_stat = os.stat(config_file)
+        except OSError:
+            return None
+        if not stat.S_ISREG(config_stat.st_mode):
+            return None
+
+        key = os.path.normcase(os.path.abspath(config_file))
+        signature = (config_info, config_stat.st_mtime_ns,
+            config_stat.st_size)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+        if entry is None or entry[0] != signature:
+            entry = (signature, config_info(config_file))
+            with self._lock:
+                self._entries[key] = entry
+
+        return dict(entry[1])
+
+    def identity(self, asset_dir, kind):
+        """Return the identity of an asset directory or None."""
+        config_name, config_info, key = ASSET_KINDS[kind]
+
+        for file_name in (config_name, config_name + '.disabled'):
+            info = self.config_info(os.path.join(asset_dir, file_name),
+                config_info)
+            if info is not None:
+                ident = info.get(key, None)
+                # Mods can have a list of idents
+                if isinstance(ident, list):
+                    ident = tuple(ident)
+                return ident
+
+        return None
+
+    def identities(self, assets_dir, kind):
+        """Return the {ident: path} map of the asset directories in
+        assets_dir. The first directory found keeps a duplicated ident."""
+        try:
+            with scandir(assets_dir) as dir_scan:
+                asset_dirs = [entry.path for entry in dir_scan
+                    if entry.is_dir()]
+        except OSError:
+            return {}
+
+        with ThreadPoolExecutor(max_workers=cons.ASSET_INDEX_WORKERS
+            ) as executor:
+            idents = list(executor.map(
+                lambda asset_dir: self.identity(asset_dir, kind),
+                asset_dirs))
+
+        identities = {}
+        for ident, asset_dir in zip(idents, asset_dirs):
+            if ident is not None and ident not in identities:
+                identities[ident] = asset_dir
+
+        return identities
+
+
+asset_index = AssetIndex()
+
+
+def scan_mods(game_dir):
+    """Return the installed mods of a game directory sorted by name."""
+    mods = []
+    for mods_dir in (os.path.join(game_dir, 'data', 'mods'),
+        os.path.join(game_dir, 'mods')):
+        mods.extend(scan_assets(mods_dir, 'modinfo.json', mod_config_info,
+            ('ident',)))
+
+    mods.sort(key=lambda x: x['name'])
+    return mods
+
+
+def scan_soundpacks(game_dir):
+    """Return the installed soundpacks of a game directory."""
+    return scan_assets(os.path.join(game_dir, 'data', 'sound'),
+        'soundpack.txt', soundpack_config_info, ('NAME', 'VIEW'))
@@ -0,0 +1,103 @@
+import os
+import re
+import zipfile
+from os import scandir
+
+from cddagl.fileops import remove_file
+
+# Counter placed at the end of a backup name to make it unique
+NAME_COUNTER_REGEX = re.compile(r'^(.*?)(\d+)$')
+
+
+def auto_backup_name(auto, reason):
+    """Return the name of an automatic backup. auto is the translated
+    prefix shared by every automatic backup and reason the translated
+    moment it is made at."""
+    return '{auto}_{reason}'.format(auto=auto, reason=reason)
+
+
+def backup_archives(backup_dir):
+    """Yield the scandir entries of the zip archives in backup_dir."""
+    with scandir(backup_dir) as entries:
+        for entry in entries:
+            if (entry.is_file() and
+                os.path.splitext(entry.name)[1].lower() == '.zip'):
+                yield entry
+
+
+def prune_auto_backups(backup_dir, auto, max_auto_backups,
+    remove=remove_file):
+    """Remove the oldest automatic backups of backup_dir, those starting
+    with auto and an underscore, so that max_auto_backups remain with the
+    next one. remove is called with the path of each removed archive.
+    """
+    if not os.path.isdir(backup_dir):
+        return
+
+    max_auto_backups = max(max_auto_backups, 1)
+    search_start = (auto + '_').lower()
+
+    auto_backups = sorted((entry for entry in backup_archives(backup_dir)
+        if entry.name.lower().startswith(search_start)),
+        key=lambda x: x.stat().st_mtime)
+
+    remove_count = len(auto_backups) - max_auto_backups + 1
+    for entry in auto_backups[:max(remove_count, 0)]:
+        remove(entry.path)
+
+
+def split_counter(name):
+    """Return name without its trailing counter and the counter, None when
+    there is none."""
+    match = NAME_COUNTER_REGEX.match(name)
+    if match is None:
+        return name, None
+    return match.group(1), int(match.group(2))
+
+
+def unique_backup_name(backup_dir, name):
+    """Return a name for a new backup in backup_dir which does not exist
+    yet. When name is taken, the counter at its end is increased past the
+    highest counter of the backups sharing its base name.
+    """
+    name_base = split_counter(name.lower())[0]
+
+    duplicate_name = False
+    duplicate_base = False
+    max_counter = 0
+
+    for entry in backup_archives(backup_dir):
+        filename = os.path.splitext(entry.name)[0].lower()
+        if filename == name.lower():
+            duplicate_name = True
+            continue
+
+        base, counter = split_counter(filename)
+        if counter is not None and base == name_base:
+            duplicate_base = True
+            max_counter = max(max_counter, counter)
+
+    if duplicate_base:
+        return split_counter(name)[0] + str(max_counter + 1)
+    if duplicate_name:
+        return name + '2'
+    return name
+
+
+def write_backup(game_dir, backup_path):
+    """Compress the save directory of game_dir into backup_path with paths
+    relative to game_dir, like the backups tab does. Return the number of
+    bytes and files compressed.
+    """
+    byte_count = 0
+    file_count = 0
+    with zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED) as z:
+        for dir_path, dir_names, file_names in os.walk(
+            os.path.join(game_dir, 'save')):
+            for file_name in file_names:
+                file_path = os.path.join(dir_path, file_name)
+                z.write(file_path, os.path.relpath(file_path, game_dir))
+                byte_count += os.path.getsize(file_path)
+                file_count += 1
+
+    return byte_count, file_count
@@ -0,0 +1,107 @@
+import json
+import re
+import urllib.request
+
+import arrow
+
+import cddagl.constants as cons
+from cddagl import __version__ as version
+
+
+def user_agent():
+    return 'CDDA-Game-Launcher/' + version
+
+
+def releases_url():
+    return cons.GITHUB_REST_API_URL + cons.CDDA_RELEASES
+
+
+def parse_releases(releases, base_asset):
+    """Return the builds of the GitHub releases, the newest first. A build
+    without an asset matching base_asset has None as its url.
+    """
+    builds = []
+
+    asset_platform = base_asset['Platform']
+    asset_graphics = base_asset['Graphics']
+
+    target_regex = re.compile(r'cataclysmdda-(?P<major>.+)-' +
+        re.escape(asset_platform) + r'-' +
+        re.escape(asset_graphics) + r'-' +
+        r'(?P<build>\d+)\.zip'
+        )
+
+    build_regex = re.compile(r'build #(?P<build>\d+)')
+
+    for release in releases:
+        if any(x not in release for x in ('name', 'created_at')):
+            continue
+
+        build_match = build_regex.search(release['name'])
+        if build_match is not None:
+            asset = None
+            if 'assets' in release:
+                asset_iter = (
+                    x for x in release['assets']
+                    if 'browser_download_url' in x
+                       and 'name' in x
+                       and target_regex.search(x['name']) is not None
+                )
+                asset = next(asset_iter, None)
+
+            sha256 = None
+            if asset is not None and asset.get('digest') is not None:
+                # Assets can have a digest such as sha256:<hexdigest>
+                algorithm, __, digest = asset['digest'].partition(':')
+                if algorithm == 'sha256':
+                    sha256 = digest
+
+            build = {
+                'url': asset['browser_download_url'] if asset is not None
+                                                     else None,
+                'name': asset['name'] if asset is not None else None,
+                'number': build_match.group('build'),
+                'date': arrow.get(release['created_at']).datetime,
+                'sha256': sha256
+            }
+            builds.append(build)
+
+    builds.sort(key=lambda x: (int(x['number']), x['date']), reverse=True)
+    return builds
+
+
+def stable_builds(platform):
+    """Return the stable builds for platform, the newest first."""
+    builds = []
+
+    for stable_version in cons.STABLE_ASSETS:
+        version_details = cons.STABLE_ASSETS[stable_version]
+
+        build = {
+            'url': version_details['Tiles'][platform],
+            'name': version_details['name'],
+            'number': version_details['number'],
+            'date': arrow.get(version_details['released_on']).datetime
+        }
+        builds.append(build)
+
+    builds.sort(key=lambda x: (x['number'], x['date']), reverse=True)
+    return builds
+
+
+def fetch_builds(branch, platform):
+    """Return the builds of a branch for platform, the newest first. The
+    experimental builds are fetched from the GitHub API.
+    """
+    if branch == cons.CONFIG_BRANCH_STABLE:
+        return stable_builds(platform)
+
+    request = urllib.request.Request(releases_url(), headers={
+        'User-Agent': user_agent(),
+        'Accept': cons.GITHUB_API_VERSION.decode('ascii')
+    })
+    with urllib.request.urlopen(request,
+        timeout=cons.DOWNLOAD_TIMEOUT) as response:
+        releases = json.loads(response.read().decode('utf8'))
+
+    return parse_releases(releases, cons.BASE_ASSETS['Tiles'][platform])
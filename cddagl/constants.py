@@ -1,9 +1,72 @@
 MAX_LOG_SIZE = 1024 * 1024
 MAX_LOG_FILES = 5
 
+# File of the launcher log directory where the timings of the updates are
+# kept as JSON lines and the number of updates kept in it
+UPDATE_TIMINGS_FILE = 'updates.jsonl'
+MAX_UPDATE_TIMINGS = 500
+
 SAVES_WARNING_SIZE = 150 * 1024 * 1024
 
 READ_BUFFER_SIZE = 16 * 1024
+FINGERPRINT_CHUNK_SIZE = 1024 * 1024
+
+# Minimum delay in seconds between progress updates sent by worker threads
+PROGRESS_UPDATE_INTERVAL = 0.1
+# Minimum delay in seconds between updates of labels showing partial results
+LABEL_UPDATE_INTERVAL = 0.25
+# Delay in seconds during which save directory changes are coalesced
+SAVES_WATCH_DELAY = 1.0
+# Delay in seconds between scans of save directories that cannot be watched
+SAVES_POLL_INTERVAL = 10.0
+# Number of directories listed in the saves details
+SAVES_HEAVY_DIRECTORIES = 10
+
+# Number of game directories analysed in parallel at startup
+ANALYSIS_WORKERS = 4
+# Number of threads copying the files of a directory tree
+COPY_WORKERS = 4
+# Number of threads deleting the files of a directory tree
+DELETION_WORKERS = 8
+# Number of threads reading the config files of tilesets, soundpacks and mods
+ASSET_INDEX_WORKERS = 8
+# Number of threads inflating the members of a new build
+EXTRACTION_WORKERS = 4
+
+# Number of connections used to download a new build and the size of the
+# byte ranges they fetch
+DOWNLOAD_CONNECTIONS = 4
+DOWNLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+DOWNLOAD_RETRIES = 3
+DOWNLOAD_TIMEOUT = 30
+
+# Size of the chunks copied by the kernel and of the buffer used when it
+# cannot copy between two files
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Bytes read from the end of a remote archive to find its central directory
+CENTRAL_DIRECTORY_TAIL_SIZE = 128 * 1024
+# Free space in bytes that should remain on a volume after an update and the
+# number of past updates used to estimate the duration of the next one
+UPDATE_FREE_SPACE_MARGIN = 512 * 1024 * 1024
+UPDATE_PLAN_HISTORY = 20
+
+# Default size budget of the kept build archives in MiB
+ARCHIVE_STORE_SIZE = 2048
+
+# Directory of the game directory where a new build is extracted before it
+# replaces the current one
+STAGING_DIRECTORY = '.cddagl-staging'
+
+# Directory of the game directory where the newest build is extracted in
+# advance while the current version is played
+PREFETCH_DIRECTORY = '.cddagl-prefetch'
+
+# Directory of the game directory where removed trees wait to be deleted in
+# the background and the number of files deleted per second from it
+TRASH_DIRECTORY = '.cddagl-trash'
+TRASH_DELETE_RATE = 200
 
 MAX_GAME_DIRECTORIES = 6
 
@@ -24,6 +87,8 @@ CDDAGL_ISSUE_URL_ROOT = 'https://github.com/remyroy/CDDA-Game-Launcher/issues/'
 
 BUILD_CHANGES_URL = lambda bn: f'http://gorgon.narc.ro:8080/job/Cataclysm-Matrix/{bn}/changes'
 
+GAME_EXECUTABLES = ('cataclysm.exe', 'cataclysm-tiles.exe')
+
 WORLD_FILES = set(('worldoptions.json', 'worldoptions.txt', 'master.gsav'))
 
 FAKE_USER_AGENT = (b'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
@@ -151,3 +216,11 @@ def get_data_path(*subpaths):
 def get_cdda_uld_path(*subpaths):
     """Returns path used for CDDA when 'Use the launcher directory as game directory' is set."""
     return os.path.join(get_cddagl_path(), 'cdda', *subpaths)
+
+
+def get_logging_path(*subpaths):
+    local_app_data = os.environ.get('LOCALAPPDATA', os.environ.get('APPDATA'))
+    if local_app_data is None or not os.path.isdir(local_app_data):
+        local_app_data = ''
+
+    return os.path.join(local_app_data, 'CDDA Game Launcher', *subpaths)
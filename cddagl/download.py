@@ -0,0 +1,296 @@
+import hashlib
+import http.client
+import json
+import os
+import queue
+import re
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+
+import cddagl.constants as cons
+
+CONTENT_RANGE_REGEX = re.compile(r'bytes (\d+)-(\d+)/(\d+)')
+
+
+class DownloadCancelled(Exception):
+    pass
+
+
+class DownloadError(Exception):
+    pass
+
+
+def download_dir_for(url):
+    """Return the directory where the download of url is kept until it is
+    used so that an interrupted download can be resumed.
+    """
+    url_hash = hashlib.sha256(url.encode('utf8')).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(),
+        '{prefix}_downloads'.format(prefix=cons.TEMP_PREFIX), url_hash)
+
+
+class RangeBitmap:
+    """One bit per chunk of a download telling if it was written."""
+
+    def __init__(self, chunk_count, packed=None):
+        self.chunk_count = chunk_count
+        if packed is None:
+            self.bits = bytearray((chunk_count + 7) // 8)
+        else:
+            self.bits = bytearray(packed)
+
+    def __contains__(self, index):
+        return bool(self.bits[index // 8] & (1 << (index % 8)))
+
+    def add(self, index):
+        self.bits[index // 8] |= 1 << (index % 8)
+
+    def missing(self):
+        return [index for index in range(self.chunk_count)
+            if index not in self]
+
+    def complete(self):
+        return len(self.missing()) == 0
+
+
+class RangedDownload:
+    """Download url to target_path over several connections using byte
+    ranges. The data is written to target_path.part and the written chunks
+    are recorded in target_path.part.json so an interrupted download resumes
+    where it stopped. When the server ignores the Range header, the file is
+    downloaded as a single stream instead.
+
+    progress is called with (bytes_read, total_bytes) from the worker
+    threads. cancel() can be called from any thread.
+    """
+
+    def __init__(self, url, target_path, progress=None, user_agent=None,
+        connections=cons.DOWNLOAD_CONNECTIONS,
+        chunk_size=cons.DOWNLOAD_CHUNK_SIZE):
+        self.url = url
+        self.target_path = target_path
+        self.part_path = target_path + '.part'
+        self.state_path = target_path + '.part.json'
+        self.progress = progress
+        self.user_agent = user_agent
+        self.connections = connections
+        self.chunk_size = chunk_size
+
+        self.cancelled = False
+        self.lock = threading.Lock()
+        self.state_lock = threading.Lock()
+        self.bytes_read = 0
+        self.total_bytes = None
+        self.bitmap = None
+        self.validator = None
+
+    def cancel(self):
+        self.cancelled = True
+
+    def open(self, url, start=None, end=None):
+        headers = {}
+        if self.user_agent is not None:
+            headers['User-Agent'] = self.user_agent
+        if start is not None:
+            headers['Range'] = 'bytes={start}-{end}'.format(start=start,
+                end=end)
+
+        request = urllib.request.Request(url, headers=headers)
+        try:
+            return urllib.request.urlopen(request,
+                timeout=cons.DOWNLOAD_TIMEOUT)
+        except (urllib.error.URLError, OSError) as e:
+            raise DownloadError(str(e))
+
+    def report(self, byte_count):
+        with self.lock:
+            self.bytes_read += byte_count
+            bytes_read = self.bytes_read
+
+        if self.progress is not None:
+            self.progress(bytes_read, self.total_bytes or 0)
+
+    def copy_response(self, response, target_file, expected=None):
+        copied = 0
+        while True:
+            if self.cancelled:
+                raise DownloadCancelled()
+
+            try:
+                data = response.read(cons.READ_BUFFER_SIZE * 4)
+            except (OSError, http.client.HTTPException) as e:
+                raise DownloadError(str(e))
+            if len(data) == 0:
+                break
+
+            target_file.write(data)
+            copied += len(data)
+            self.report(len(data))
+
+        if expected is not None and copied != expected:
+            raise DownloadError('Received {copied} bytes instead of '
+                '{expected}'.format(copied=copied, expected=expected))
+
+        return copied
+
+    def load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf8') as state_file:
+                state = json.load(state_file)
+        except (OSError, ValueError):
+            return False
+
+        if (state.get('url') != self.url or
+            state.get('size') != self.total_bytes or
+            state.get('validator') != self.validator or
+            state.get('chunk_size') != self.chunk_size or
+            not os.path.isfile(self.part_path) or
+            os.path.getsize(self.part_path) != self.total_bytes):
+            return False
+
+        self.bitmap = RangeBitmap(self.chunk_count(),
+            bytes.fromhex(state['bitmap']))
+        return True
+
+    def save_state(self):
+        with self.lock:
+            state = {
+                'url': self.url,
+                'size': self.total_bytes,
+                'validator': self.validator,
+                'chunk_size': self.chunk_size,
+                'bitmap': bytes(self.bitmap.bits).hex()
+            }
+
+        # Workers save the state as they complete chunks
+        with self.state_lock:
+            temp_path = self.state_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf8') as state_file:
+                json.dump(state, state_file)
+            os.replace(temp_path, self.state_path)
+
+    def chunk_count(self):
+        return (self.total_bytes + self.chunk_size - 1) // self.chunk_size
+
+    def chunk_range(self, index):
+        start = index * self.chunk_size
+        end = min(start + self.chunk_size, self.total_bytes) - 1
+        return start, end
+
+    def run(self):
+        """Download the file. Raise DownloadCancelled or DownloadError if it
+        could not be completed, keeping what was downloaded for the next
+        attempt.
+        """
+        # Probe the server with a one byte range
+        response = self.open(self.url, 0, 0)
+        with response:
+            content_range = response.headers.get('Content-Range', '')
+            match = CONTENT_RANGE_REGEX.match(content_range)
+            if response.status != 206 or match is None:
+                self.stream(response)
+                return
+
+            self.total_bytes = int(match.group(3))
+            self.validator = (response.headers.get('ETag') or
+                response.headers.get('Last-Modified'))
+            # Keep using the redirected url for the ranges
+            ranges_url = response.geturl()
+
+        if not self.load_state():
+            with open(self.part_path, 'wb') as part_file:
+                part_file.truncate(self.total_bytes)
+            self.bitmap = RangeBitmap(self.chunk_count())
+            self.save_state()
+
+        missing = self.bitmap.missing()
+        self.bytes_read = self.total_bytes - sum(
+            self.chunk_range(index)[1] - self.chunk_range(index)[0] + 1
+            for index in missing)
+        self.report(0)
+
+        chunks = queue.Queue()
+        for index in missing:
+            chunks.put(index)
+
+        errors = []
+        workers = []
+        for worker_index in range(min(self.connections, len(missing))):
+            worker = threading.Thread(target=self.fetch_chunks,
+                args=(ranges_url, chunks, errors))
+            worker.start()
+            workers.append(worker)
+
+        for worker in workers:
+            worker.join()
+
+        self.save_state()
+
+        if self.cancelled:
+            raise DownloadCancelled()
+        if len(errors) > 0:
+            raise errors[0]
+        if not self.bitmap.complete():
+            raise DownloadError('Some ranges could not be downloaded')
+
+        os.replace(self.part_path, self.target_path)
+        os.remove(self.state_path)
+
+    def fetch_chunks(self, url, chunks, errors):
+        with open(self.part_path, 'r+b') as part_file:
+            while not self.cancelled and len(errors) == 0:
+                try:
+                    index = chunks.get_nowait()
+                except queue.Empty:
+                    return
+
+                try:
+                    self.fetch_chunk(url, index, part_file)
+                except DownloadCancelled:
+                    return
+                except DownloadError as e:
+                    errors.append(e)
+                    return
+                except OSError as e:
+                    errors.append(DownloadError(str(e)))
+                    return
+
+    def fetch_chunk(self, url, index, part_file):
+        start, end = self.chunk_range(index)
+
+        for attempt in range(cons.DOWNLOAD_RETRIES):
+            part_file.seek(start)
+            try:
+                with self.open(url, start, end) as response:
+                    if response.status != 206:
+                        raise DownloadError('Range request was not honored')
+                    self.copy_response(response, part_file, end - start + 1)
+                break
+            except DownloadError:
+                # Forget the bytes of the failed attempt
+                self.report(start - part_file.tell())
+                if attempt == cons.DOWNLOAD_RETRIES - 1:
+                    raise
+
+        # The chunk must be on disk before the state says it is complete
+        with self.lock:
+            part_file.flush()
+            os.fsync(part_file.fileno())
+            self.bitmap.add(index)
+        self.save_state()
+
+    def stream(self, response):
+        """Download the whole file from a response ignoring ranges."""
+        length = response.headers.get('Content-Length')
+        self.total_bytes = int(length) if length is not None else None
+
+        # The partial data of a previous attempt cannot be used
+        if os.path.isfile(self.state_path):
+            os.remove(self.state_path)
+
+        with open(self.part_path, 'wb') as part_file:
+            self.copy_response(response, part_file, self.total_bytes)
+
+        os.replace(self.part_path, self.target_path)
@@ -0,0 +1,309 @@
+import os
+import queue
+import stat
+import sys
+import threading
+import zipfile
+import zlib
+
+import cddagl.constants as cons
+from cddagl.fileops import copy_file, OperationCancelled
+from cddagl.fingerprint import Fingerprinter
+
+# Errors raised while reading a corrupted or truncated archive. ZipExtFile
+# checks the CRC-32 of a member when it is read to its end.
+ARCHIVE_ERRORS = (zipfile.BadZipFile, zlib.error, EOFError)
+
+
+class ExtractionCancelled(Exception):
+    pass
+
+
+def staging_dir_for(game_dir):
+    return os.path.join(game_dir, cons.STAGING_DIRECTORY)
+
+
+def excluded_game_entries(game_dir, keep_saves=False):
+    """Return the entries of game_dir which stay in place when a build is
+    installed or restored. The save directory stays with keep_saves.
+    """
+    excluded = set((cons.TRASH_DIRECTORY, cons.PREFETCH_DIRECTORY))
+    if keep_saves:
+        excluded.add('save')
+
+    # Prevent moving the launcher if it's in the game directory
+    if getattr(sys, 'frozen', False):
+        launcher_exe = os.path.abspath(sys.executable)
+        launcher_dir = os.path.dirname(launcher_exe)
+        if os.path.abspath(game_dir) == launcher_dir:
+            excluded.add(os.path.basename(launcher_exe))
+
+    return excluded
+
+
+def swap_entries(game_dir, source_dir, backup_dir, excluded=()):
+    """Move the entries of game_dir into backup_dir, then the entries of
+    source_dir into game_dir, with one rename per top-level entry. Entries
+    named in excluded and the source and backup directories themselves stay
+    where they are. backup_dir is only created when there is something to
+    move in it.
+
+    If a rename fails, the renames already made are undone before the error
+    is raised.
+    """
+    skipped = set(excluded)
+    skipped.update((os.path.basename(source_dir),
+        os.path.basename(backup_dir)))
+
+    renames = []
+
+    def rename(source, target):
+        os.rename(source, target)
+        renames.append((source, target))
+
+    try:
+        for name in os.listdir(game_dir):
+            if name not in skipped:
+                if not os.path.isdir(backup_dir):
+                    os.makedirs(backup_dir)
+                rename(os.path.join(game_dir, name),
+                    os.path.join(backup_dir, name))
+
+        if os.path.isdir(source_dir):
+            for name in os.listdir(source_dir):
+                if name not in skipped:
+                    rename(os.path.join(source_dir, name),
+                        os.path.join(game_dir, name))
+    except OSError:
+        for source, target in reversed(renames):
+            try:
+                os.rename(target, source)
+            except OSError:
+                pass
+        raise
+
+
+def member_path(member):
+    """Return the path of a member relative to the extraction directory,
+    sanitized like ZipFile.extract does.
+    """
+    arcname = member.filename.replace('/', os.sep)
+    if os.altsep:
+        arcname = arcname.replace(os.altsep, os.sep)
+    arcname = os.path.splitdrive(arcname)[1]
+    arcname = os.sep.join(part for part in arcname.split(os.sep)
+        if part not in ('', os.curdir, os.pardir))
+    if os.sep == '\\':
+        arcname = zipfile.ZipFile._sanitize_windows_name(arcname, os.sep)
+
+    return arcname
+
+
+def plan_directories(infolist):
+    """Return the directories to create before extracting the members of
+    infolist, parents first.
+    """
+    directories = set()
+    for member in infolist:
+        path = member_path(member)
+        if not member.is_dir():
+            path = os.path.dirname(path)
+
+        while path != '' and path not in directories:
+            directories.add(path)
+            path = os.path.dirname(path)
+
+    return sorted(directories, key=lambda path: path.count(os.sep))
+
+
+class ArchiveExtractor:
+    """Extract the members of a zip archive into target_dir with a pool of
+    threads, each reading the archive with its own file handle. The CRC of
+    each member is checked as it is inflated.
+
+    When reuse_dir is given, a member whose size and CRC-32 match the file
+    at the same path in reuse_dir is copied from there instead of being
+    inflated. This is used to reuse the unchanged files of the current
+    version of the game. With link_reused, the file is hard linked instead,
+    so both trees share it. This is only safe when the file in reuse_dir is
+    deleted soon after, since writing to either path changes the other.
+
+    progress is called with (bytes_written, total_bytes, member_name) from
+    the worker threads, the bytes being counted in decompressed file sizes.
+    The members named in fingerprinted are fingerprinted while they are
+    written. cancel() can be called from any thread. A member being written
+    when the extraction stops is removed so every extracted file is
+    complete.
+    """
+
+    def __init__(self, archive_path, infolist, target_dir, progress=None,
+        fingerprinted=(), reuse_dir=None, workers=cons.EXTRACTION_WORKERS,
+        link_reused=False):
+        self.archive_path = archive_path
+        self.infolist = infolist
+        self.target_dir = target_dir
+        self.progress = progress
+        self.fingerprinted = fingerprinted
+        self.reuse_dir = reuse_dir
+        self.workers = workers
+        self.link_reused = link_reused
+
+        self.cancelled = False
+        self.lock = threading.Lock()
+        self.bytes_written = 0
+        self.total_bytes = sum(member.file_size for member in infolist
+            if not member.is_dir())
+        self.fingerprints = {}
+        self.errors = []
+        self.reused_files = 0
+        self.reused_bytes = 0
+
+    def cancel(self):
+        self.cancelled = True
+
+    def report(self, byte_count, member_name):
+        with self.lock:
+            self.bytes_written += byte_count
+            bytes_written = self.bytes_written
+
+        if self.progress is not None:
+            self.progress(bytes_written, self.total_bytes, member_name)
+
+    def run(self):
+        """Extract the archive and return the (sha256, version) fingerprints
+        of the fingerprinted members by name. Raise ExtractionCancelled, one
+        of ARCHIVE_ERRORS or OSError if it could not be completed.
+        """
+        for directory in plan_directories(self.infolist):
+            os.makedirs(os.path.join(self.target_dir, directory),
+                exist_ok=True)
+
+        # Start with the largest members so that they do not end up last
+        # on a single thread
+        members = queue.Queue()
+        for member in sorted(self.infolist,
+            key=lambda member: member.compress_size, reverse=True):
+            if not member.is_dir():
+                members.put(member)
+
+        workers = []
+        for worker_index in range(min(self.workers, members.qsize())):
+            worker = threading.Thread(target=self.extract_members,
+                args=(members,))
+            worker.start()
+            workers.append(worker)
+
+        for worker in workers:
+            worker.join()
+
+        if len(self.errors) > 0:
+            raise self.errors[0]
+        if self.cancelled:
+            raise ExtractionCancelled()
+
+        return self.fingerprints
+
+    def extract_members(self, members):
+        try:
+            with zipfile.ZipFile(self.archive_path) as archive:
+                while not self.cancelled:
+                    try:
+                        member = members.get_nowait()
+                    except queue.Empty:
+                        return
+
+                    self.extract_member(archive, member)
+        except ExtractionCancelled:
+            return
+        except ARCHIVE_ERRORS + (OSError,) as e:
+            with self.lock:
+                self.errors.append(e)
+            # Stop the other workers on the first error
+            self.cancelled = True
+
+    def file_crc32(self, path):
+        crc = 0
+        with open(path, 'rb') as source:
+            while True:
+                if self.cancelled:
+                    raise ExtractionCancelled()
+
+                data = source.read(cons.FINGERPRINT_CHUNK_SIZE)
+                if len(data) == 0:
+                    break
+
+                crc = zlib.crc32(data, crc)
+
+        return crc
+
+    def reuse_member(self, member, target_path):
+        """Copy or link the file of reuse_dir matching member to
+        target_path. Return False when there is no such file or it cannot be
+        copied or linked.
+        """
+        source_path = os.path.join(self.reuse_dir, member_path(member))
+        try:
+            source_stat = os.stat(source_path)
+            if (not stat.S_ISREG(source_stat.st_mode) or
+                source_stat.st_size != member.file_size):
+                return False
+
+            if self.file_crc32(source_path) != member.CRC:
+                return False
+
+            if self.link_reused:
+                os.link(source_path, target_path)
+            else:
+                copy_file(source_path, target_path,
+                    is_cancelled=lambda: self.cancelled)
+        except OperationCancelled:
+            raise ExtractionCancelled()
+        except OSError:
+            # Hard links are not supported on every file system, the member
+            # is inflated instead
+            return False
+
+        with self.lock:
+            self.reused_files += 1
+            self.reused_bytes += member.file_size
+
+        return True
+
+    def extract_member(self, archive, member):
+        target_path = os.path.join(self.target_dir, member_path(member))
+
+        if self.reuse_dir is not None and self.reuse_member(member,
+            target_path):
+            self.report(member.file_size, member.filename)
+            return
+
+        fingerprinter = None
+        if member.filename in self.fingerprinted:
+            fingerprinter = Fingerprinter()
+
+        try:
+            with archive.open(member) as source, open(target_path,
+                'wb') as target:
+                while True:
+                    if self.cancelled:
+                        raise ExtractionCancelled()
+
+                    data = source.read(cons.FINGERPRINT_CHUNK_SIZE)
+                    if len(data) == 0:
+                        break
+
+                    if fingerprinter is not None:
+                        fingerprinter.update(data)
+                    target.write(data)
+                    self.report(len(data), member.filename)
+        except:
+            # Do not leave a partial file behind
+            try:
+                os.remove(target_path)
+            except OSError:
+                pass
+            raise
+
+        if fingerprinter is not None:
+            with self.lock:
+                self.fingerprints[member.filename] = fingerprinter.result()
@@ -0,0 +1,407 @@
+import errno
+import os
+import shutil
+import stat
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from os import scandir
+
+import cddagl.constants as cons
+
+# Errors meaning the kernel cannot copy between these two files, in which
+# case the data goes through a user space buffer instead
+KERNEL_COPY_ERRORS = set((errno.EXDEV, errno.ENOSYS, errno.EINVAL,
+    errno.EBADF, errno.EOPNOTSUPP))
+
+
+class OperationCancelled(Exception):
+    pass
+
+
+def trash_dir_for(game_dir):
+    return os.path.join(game_dir, cons.TRASH_DIRECTORY)
+
+
+def move_to_trash(path, trash_dir):
+    """Rename path into trash_dir under a unique name and return its new
+    path. This is immediate when trash_dir is on the same volume.
+    """
+    os.makedirs(trash_dir, exist_ok=True)
+    target = os.path.join(trash_dir, '{name}-{unique}'.format(
+        name=os.path.basename(path), unique=uuid.uuid4().hex))
+    os.rename(path, target)
+    return target
+
+
+def kernel_copy(source_fd, target_fd, count):
+    if hasattr(os, 'copy_file_range'):
+        return os.copy_file_range(source_fd, target_fd, count)
+    return os.sendfile(target_fd, source_fd, None, count)
+
+
+def can_kernel_copy():
+    # sendfile only accepts a regular file as its output on Linux
+    return hasattr(os, 'copy_file_range') or (hasattr(os, 'sendfile') and
+        sys.platform.startswith('linux'))
+
+
+def copy_file(source, target, progress=None, is_cancelled=None):
+    """Copy the content and metadata of the source file to target. The
+    kernel copies the data when it can, otherwise it goes through a large
+    buffer. progress is called with the number of bytes copied by each
+    chunk. A partially copied target is removed if the copy fails.
+    """
+    try:
+        with open(source, 'rb') as source_file, \
+            open(target, 'wb') as target_file:
+            source_fd = source_file.fileno()
+            target_fd = target_file.fileno()
+
+            use_kernel = can_kernel_copy()
+            copied = 0
+            while use_kernel:
+                if is_cancelled is not None and is_cancelled():
+                    raise OperationCancelled()
+                try:
+                    count = kernel_copy(source_fd, target_fd,
+                        cons.COPY_CHUNK_SIZE)
+                except OSError as e:
+                    if copied > 0 or e.errno not in KERNEL_COPY_ERRORS:
+                        raise
+                    use_kernel = False
+                    break
+                if count == 0:
+                    break
+                copied += count
+                if progress is not None:
+                    progress(count)
+
+            if not use_kernel:
+                buffer = bytearray(cons.COPY_BUFFER_SIZE)
+                view = memoryview(buffer)
+                while True:
+                    if is_cancelled is not None and is_cancelled():
+                        raise OperationCancelled()
+                    count = source_file.readinto(buffer)
+                    if count == 0:
+                        break
+                    target_file.write(view[:count])
+                    if progress is not None:
+                        progress(count)
+
+        shutil.copystat(source, target)
+    except BaseException:
+        try:
+            os.remove(target)
+        except OSError:
+            pass
+        raise
+
+
+def link_or_copy_tree(source_dir, target_dir, skips=(), progress=None,
+    is_cancelled=None):
+    """Recreate the source_dir tree in target_dir with hard links to its
+    files. Files are copied when they cannot be linked, for instance when
+    target_dir is on another volume. Paths in skips are left out. progress
+    is called with the number of bytes carried over and the relative path
+    of the current file.
+    """
+    can_link = True
+    next_scans = [(source_dir, target_dir)]
+
+    while len(next_scans) > 0:
+        current_source, current_target = next_scans.pop()
+        os.makedirs(current_target, exist_ok=True)
+
+        with scandir(current_source) as entries:
+            for entry in entries:
+                if is_cancelled is not None and is_cancelled():
+                    raise OperationCancelled()
+                if entry.path in skips:
+                    continue
+
+                target = os.path.join(current_target, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    next_scans.append((entry.path, target))
+                    continue
+
+                name = os.path.relpath(entry.path, source_dir)
+                size = entry.stat(follow_symlinks=False).st_size
+
+                if can_link:
+                    try:
+                        os.link(entry.path, target)
+                        if progress is not None:
+                            progress(size, name)
+                        continue
+                    except OSError as e:
+                        # Every other file would fail the same way
+                        if e.errno in (errno.EXDEV, errno.EPERM,
+                            errno.ENOSYS, errno.EOPNOTSUPP):
+                            can_link = False
+
+                chunk_progress = None
+                if progress is not None:
+                    chunk_progress = (lambda count, name=name:
+                        progress(count, name))
+                copy_file(entry.path, target, chunk_progress, is_cancelled)
+
+
+def carry_over(source_dir, target_dir, skips=(), progress=None,
+    is_cancelled=None):
+    """Bring the source_dir tree to target_dir when source_dir is deleted
+    afterwards. The directory is renamed, which is immediate on the same
+    volume and leaves nothing in source_dir. When the rename fails, the tree
+    is linked or copied, the links being safe since source_dir does not
+    outlive them. A tree which stays in place must be copied with
+    TreeCopier instead. Return True when the directory was moved.
+    """
+    try:
+        os.rename(source_dir, target_dir)
+    except OSError:
+        pass
+    else:
+        for skip in skips:
+            relative_path = os.path.relpath(skip, source_dir)
+            if relative_path.startswith(os.pardir):
+                continue
+            try:
+                os.remove(os.path.join(target_dir, relative_path))
+            except OSError:
+                pass
+        return True
+
+    link_or_copy_tree(source_dir, target_dir, skips, progress, is_cancelled)
+    return False
+
+
+def remove_file(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        # Remove read-only and try again
+        os.chmod(path, stat.S_IWRITE)
+        os.unlink(path)
+
+
+def remove_directory(path):
+    try:
+        os.rmdir(path)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        # Remove read-only and try again
+        os.chmod(path, stat.S_IWRITE)
+        os.rmdir(path)
+
+
+class TreeRemover:
+    """Delete the directory tree at path. Its files are unlinked by a pool of
+    workers, then its directories are removed bottom-up. progress is called
+    with the number of files deleted, the total number of files and the path
+    of the last deleted file, from any of the workers. When rate is set, no
+    more than rate files are deleted per second.
+
+    The first error stops the workers and is raised by run(). Entries
+    already deleted stay deleted, so another remover can retry.
+    """
+
+    def __init__(self, path, progress=None, workers=cons.DELETION_WORKERS,
+        rate=None):
+        self.path = path
+        self.progress = progress
+        self.workers = workers
+        self.rate = rate
+
+        self.cancelled = False
+        self.error = None
+        self.lock = threading.Lock()
+
+        self.deleted_files = 0
+        self.total_files = 0
+
+    def cancel(self):
+        self.cancelled = True
+
+    def scan(self):
+        """Return the directories of the tree from the top down and its
+        files. Links are deleted without following them."""
+        directories = [self.path]
+        files = []
+
+        next_scans = [self.path]
+        while len(next_scans) > 0:
+            if self.cancelled:
+                raise OperationCancelled()
+
+            with scandir(next_scans.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        directories.append(entry.path)
+                        next_scans.append(entry.path)
+                    else:
+                        files.append(entry.path)
+
+        return directories, files
+
+    def remove_file(self, path):
+        if self.cancelled:
+            return
+
+        try:
+            remove_file(path)
+        except OSError as e:
+            with self.lock:
+                if self.error is None:
+                    self.error = e
+            self.cancelled = True
+            return
+
+        with self.lock:
+            self.deleted_files += 1
+            deleted_files = self.deleted_files
+
+        if self.progress is not None:
+            self.progress(deleted_files, self.total_files, path)
+
+        if self.rate is not None:
+            delay = (deleted_files / self.rate -
+                (time.monotonic() - self.start_time))
+            if delay > 0:
+                time.sleep(delay)
+
+    def run(self):
+        self.error = None
+
+        directories, files = self.scan()
+
+        self.deleted_files = 0
+        self.total_files = len(files)
+        self.start_time = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for path in files:
+                executor.submit(self.remove_file, path)
+
+        if self.error is not None:
+            raise self.error
+        if self.cancelled:
+            raise OperationCancelled()
+
+        for path in reversed(directories):
+            if self.cancelled:
+                raise OperationCancelled()
+            remove_directory(path)
+
+
+class TreeCopier:
+    """Copy the directory tree at source_dir to target_dir, which must not
+    exist. The tree is scanned once, then its files are copied by a pool of
+    workers, the largest first, with copy_file. Paths in skips are left out
+    with everything under them. progress is called with the number of bytes
+    copied, the total number of bytes and the path of the current file
+    relative to source_dir, from any of the workers.
+
+    The first error stops the workers and is raised by run().
+    """
+
+    def __init__(self, source_dir, target_dir, skips=None, progress=None,
+        workers=cons.COPY_WORKERS):
+        self.source_dir = source_dir
+        self.target_dir = target_dir
+        self.skips = skips
+        self.progress = progress
+        self.workers = workers
+
+        self.cancelled = False
+        self.error = None
+        self.lock = threading.Lock()
+
+        self.copied_bytes = 0
+        self.total_bytes = 0
+
+    def cancel(self):
+        self.cancelled = True
+
+    def is_cancelled(self):
+        return self.cancelled
+
+    def scan(self):
+        """Return the relative paths of the directories of the tree from the
+        top down and the (relative path, size) of its files."""
+        directories = []
+        files = []
+
+        next_scans = [self.source_dir]
+        while len(next_scans) > 0:
+            if self.cancelled:
+                raise OperationCancelled()
+
+            with scandir(next_scans.pop()) as entries:
+                for entry in entries:
+                    if self.skips is not None and entry.path in self.skips:
+                        continue
+
+                    relative_path = os.path.relpath(entry.path,
+                        self.source_dir)
+                    if entry.is_dir():
+                        directories.append(relative_path)
+                        next_scans.append(entry.path)
+                    elif entry.is_file():
+                        files.append((relative_path, entry.stat().st_size))
+
+        return directories, files
+
+    def report(self, byte_count, relative_path):
+        with self.lock:
+            self.copied_bytes += byte_count
+            copied_bytes = self.copied_bytes
+
+        if self.progress is not None:
+            self.progress(copied_bytes, self.total_bytes, relative_path)
+
+    def copy_file(self, relative_path):
+        if self.cancelled:
+            return
+
+        try:
+            copy_file(os.path.join(self.source_dir, relative_path),
+                os.path.join(self.target_dir, relative_path),
+                lambda count: self.report(count, relative_path),
+                self.is_cancelled)
+        except OperationCancelled:
+            pass
+        except OSError as e:
+            with self.lock:
+                if self.error is None:
+                    self.error = e
+            self.cancelled = True
+
+    def run(self):
+        directories, files = self.scan()
+
+        self.total_bytes = sum(size for relative_path, size in files)
+
+        os.makedirs(self.target_dir)
+        for relative_path in directories:
+            os.makedirs(os.path.join(self.target_dir, relative_path),
+                exist_ok=True)
+
+        self.report(0, '')
+
+        # Large files start first so they do not end the copy on their own
+        files.sort(key=lambda x: x[1], reverse=True)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for relative_path, size in files:
+                executor.submit(self.copy_file, relative_path)
+
+        if self.error is not None:
+            raise self.error
+        if self.cancelled:
+            raise OperationCancelled()
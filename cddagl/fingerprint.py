@@ -0,0 +1,201 @@
+import hashlib
+import mmap
+import os
+import re
+import struct
+
+import cddagl.constants as cons
+
+VERSION_REGEX = re.compile(b'(?P<version>[01]\\.[A-F](-\\d+-g[0-9a-f]+)?)\\x00')
+
+# Matches starting near the end of a chunk are searched in the following bytes
+# up to this length so a version string split by a chunk boundary is found.
+VERSION_MAX_LENGTH = 64
+
+# Every version string contains one of those right after its first byte
+VERSION_SEPARATORS = tuple(b'.' + bytes((letter,)) for letter in b'ABCDEF')
+
+PE_SECTION_HEADER_SIZE = 40
+IMAGE_SCN_CNT_CODE = 0x00000020
+IMAGE_SCN_CNT_INITIALIZED_DATA = 0x00000040
+IMAGE_SCN_MEM_EXECUTE = 0x20000000
+IMAGE_SCN_MEM_WRITE = 0x80000000
+IMAGE_SCN_NOT_READONLY_DATA = (IMAGE_SCN_CNT_CODE | IMAGE_SCN_MEM_EXECUTE |
+    IMAGE_SCN_MEM_WRITE)
+
+
+class FingerprintCancelled(Exception):
+    pass
+
+
+def fingerprint_key(path):
+    """Return the normalized path and the identity of a file as used by the
+    fingerprint cache. The identity changes whenever the file is replaced or
+    modified.
+    """
+    path = os.path.normcase(os.path.abspath(path))
+    file_stat = os.stat(path)
+    file_id = '{dev}:{ino}'.format(dev=file_stat.st_dev, ino=file_stat.st_ino)
+
+    return path, (file_stat.st_size, file_stat.st_mtime_ns, file_id)
+
+
+def best_version(current, candidate):
+    """Return the most descriptive of two detected version strings."""
+    if len(candidate) > len(current):
+        return candidate
+    return current
+
+
+def scan_version(buffer, start, end, game_version=''):
+    """Search for the game version in buffer for matches starting between
+    start and end. buffer can be bytes or a mmap.
+
+    The regex only runs where bytes.find located the separator between the
+    major version digit and the release letter.
+    """
+    buffer_length = len(buffer)
+    find_end = min(end + 2, buffer_length)
+
+    matches = []
+    for separator in VERSION_SEPARATORS:
+        position = buffer.find(separator, start + 1, find_end)
+        while position != -1:
+            match = VERSION_REGEX.match(buffer, position - 1,
+                min(position - 1 + VERSION_MAX_LENGTH, buffer_length))
+            if match is not None:
+                matches.append((match.start(), match.group('version')))
+
+            position = buffer.find(separator, position + 1, find_end)
+
+    # Keep the same result as a scan from the start of the buffer
+    for position, version in sorted(matches):
+        game_version = best_version(game_version, version.decode('ascii'))
+
+    return game_version
+
+
+def readonly_data_ranges(buffer):
+    """Return the (start, end) file offsets of the read-only initialized
+    data sections of a PE image. Return None if buffer does not look like a
+    valid PE image.
+    """
+    try:
+        if buffer[:2] != b'MZ':
+            return None
+
+        pe_offset, = struct.unpack_from('<I', buffer, 0x3C)
+        if buffer[pe_offset:pe_offset + 4] != b'PE\0\0':
+            return None
+
+        section_count, = struct.unpack_from('<H', buffer, pe_offset + 6)
+        optional_header_size, = struct.unpack_from('<H', buffer,
+            pe_offset + 20)
+        section_table = pe_offset + 24 + optional_header_size
+
+        ranges = []
+        for index in range(section_count):
+            section_header = section_table + index * PE_SECTION_HEADER_SIZE
+            raw_size, raw_pointer = struct.unpack_from('<II', buffer,
+                section_header + 16)
+            characteristics, = struct.unpack_from('<I', buffer,
+                section_header + 36)
+
+            if (characteristics & IMAGE_SCN_CNT_INITIALIZED_DATA and
+                not characteristics & IMAGE_SCN_NOT_READONLY_DATA):
+                end = min(raw_pointer + raw_size, len(buffer))
+                if raw_pointer < end:
+                    ranges.append((raw_pointer, end))
+    except struct.error:
+        return None
+
+    return ranges
+
+
+def locate_version(buffer):
+    """Return the game version found in the read-only data sections of a PE
+    image. Fall back to scanning the whole buffer when it cannot be parsed or
+    when no version is found in those sections.
+    """
+    game_version = ''
+
+    ranges = readonly_data_ranges(buffer)
+    if ranges:
+        for start, end in ranges:
+            game_version = scan_version(buffer, start, end, game_version)
+
+    if game_version == '':
+        game_version = scan_version(buffer, 0, len(buffer))
+
+    return game_version
+
+
+class Fingerprinter:
+    """Incrementally compute the SHA-256 hexdigest and the embedded game
+    version of a stream of bytes fed in order.
+    """
+
+    def __init__(self):
+        self.sha256 = hashlib.sha256()
+        self.game_version = ''
+        self.pending = b''
+
+    def update(self, data):
+        self.sha256.update(data)
+
+        # Keep the end of the data for the next update in case a version
+        # string starts there
+        buffer = self.pending + data
+        end = len(buffer) - VERSION_MAX_LENGTH
+        if end > 0:
+            self.game_version = scan_version(buffer, 0, end,
+                self.game_version)
+            self.pending = buffer[end:]
+        else:
+            self.pending = buffer
+
+    def result(self):
+        self.game_version = scan_version(self.pending, 0, len(self.pending),
+            self.game_version)
+        self.pending = b''
+
+        return self.sha256.hexdigest(), self.game_version
+
+
+def fingerprint_file(path, progress=None, is_cancelled=None):
+    """Compute the SHA-256 hexdigest and the embedded game version of an
+    executable from a read-only memory map of the file. The version is
+    located without reading the whole file again when it is a PE image.
+
+    progress is called with (bytes_read, total_bytes) after each chunk and
+    is_cancelled is polled before each chunk. FingerprintCancelled is raised
+    when it returns True.
+    """
+    sha256 = hashlib.sha256()
+    game_version = ''
+
+    total_bytes = os.path.getsize(path)
+    if total_bytes == 0:
+        # Empty files cannot be mapped
+        return sha256.hexdigest(), game_version
+
+    with open(path, 'rb') as exe_file:
+        with mmap.mmap(exe_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                for start in range(0, total_bytes, cons.FINGERPRINT_CHUNK_SIZE):
+                    if is_cancelled is not None and is_cancelled():
+                        raise FingerprintCancelled()
+
+                    end = min(start + cons.FINGERPRINT_CHUNK_SIZE, total_bytes)
+
+                    sha256.update(view[start:end])
+
+                    if progress is not None:
+                        progress(end, total_bytes)
+            finally:
+                view.release()
+
+            game_version = locate_version(mapped)
+
+    return sha256.hexdigest(), game_version
@@ -15,7 +15,9 @@ if not getattr(sys, 'frozen', False):
 
 import cddagl.constants as cons
 from cddagl import __version__ as version
-from cddagl.constants import get_cddagl_path, get_locale_path, get_resource_path
+from cddagl.constants import (
+    get_cddagl_path, get_locale_path, get_resource_path, get_logging_path
+)
 from cddagl.i18n import (
     load_gettext_locale, load_gettext_no_locale,
     proxy_gettext as _, get_available_locales
@@ -67,11 +69,7 @@ def init_logging():
     logger = logging.getLogger('cddagl')
     logger.setLevel(logging.INFO)
 
-    local_app_data = os.environ.get('LOCALAPPDATA', os.environ.get('APPDATA'))
-    if local_app_data is None or not os.path.isdir(local_app_data):
-        local_app_data = ''
-
-    logging_dir = os.path.join(local_app_data, 'CDDA Game Launcher')
+    logging_dir = get_logging_path()
     if not os.path.isdir(logging_dir):
         os.makedirs(logging_dir)
 
@@ -0,0 +1,335 @@
+import http.client
+import os
+import shutil
+import statistics
+import urllib.error
+import urllib.request
+import zipfile
+from urllib.parse import urlparse, unquote
+
+import cddagl.constants as cons
+from cddagl.assets import tree_size
+from cddagl.download import CONTENT_RANGE_REGEX
+from cddagl.extraction import member_path, staging_dir_for, ARCHIVE_ERRORS
+from cddagl.spans import read_records
+
+# Phases of an update whose duration depends on the size of the build
+SIZED_PHASES = ('download', 'extraction')
+
+
+class PlanningError(Exception):
+    pass
+
+
+class RemoteArchive:
+    """Read-only file object over a remote archive fetching byte ranges, so
+    zipfile can read the central directory without downloading the archive.
+    The end of the archive is fetched once when it is opened.
+    """
+
+    def __init__(self, url, user_agent=None):
+        self.url = url
+        self.user_agent = user_agent
+        self.position = 0
+
+        self.tail, self.tail_start, self.size = self.fetch(
+            'bytes=-{0}'.format(cons.CENTRAL_DIRECTORY_TAIL_SIZE))
+
+    def fetch(self, byte_range):
+        headers = {'Range': byte_range}
+        if self.user_agent is not None:
+            headers['User-Agent'] = self.user_agent
+
+        request = urllib.request.Request(self.url, headers=headers)
+        try:
+            with urllib.request.urlopen(request,
+                timeout=cons.DOWNLOAD_TIMEOUT) as response:
+                content_range = response.headers.get('Content-Range', '')
+                match = CONTENT_RANGE_REGEX.match(content_range)
+                if response.status != 206 or match is None:
+                    raise PlanningError('Range request was not honored')
+                data = response.read()
+        except (urllib.error.URLError, OSError,
+            http.client.HTTPException) as e:
+            raise PlanningError(str(e))
+
+        return data, int(match.group(1)), int(match.group(3))
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self.position
+        elif whence == os.SEEK_END:
+            offset += self.size
+        self.position = max(offset, 0)
+        return self.position
+
+    def tell(self):
+        return self.position
+
+    def read(self, size=-1):
+        end = self.size
+        if size >= 0:
+            end = min(self.position + size, self.size)
+        if end <= self.position:
+            return b''
+
+        if self.position >= self.tail_start:
+            data = self.tail[self.position - self.tail_start:
+                end - self.tail_start]
+        else:
+            data = self.fetch('bytes={start}-{end}'.format(
+                start=self.position, end=end - 1))[0]
+
+        self.position += len(data)
+        return data
+
+
+# Summaries of remote archives by url, the content of a build does not change
+remote_summaries = {}
+
+
+def summarize(infolist, archive_bytes):
+    members = [(member_path(member), member.file_size)
+        for member in infolist if not member.is_dir()]
+
+    return {
+        'archive_bytes': archive_bytes,
+        'extracted_bytes': sum(size for path, size in members),
+        'members': members
+    }
+
+
+def local_summary(archive_path):
+    try:
+        with zipfile.ZipFile(archive_path) as z:
+            infolist = z.infolist()
+    except ARCHIVE_ERRORS as e:
+        raise PlanningError(str(e))
+
+    return summarize(infolist, os.path.getsize(archive_path))
+
+
+def remote_summary(url, user_agent=None):
+    """Return the sizes of a remote archive and of its members from its
+    central directory."""
+    summary = remote_summaries.get(url)
+    if summary is None:
+        archive = RemoteArchive(url, user_agent)
+        try:
+            with zipfile.ZipFile(archive) as z:
+                infolist = z.infolist()
+        except ARCHIVE_ERRORS as e:
+            raise PlanningError(str(e))
+
+        summary = summarize(infolist, archive.size)
+        remote_summaries[url] = summary
+
+    return summary
+
+
+def likely_reused_bytes(members, game_dir):
+    """Return the bytes of the members likely to be linked from the current
+    version of the game, those with a file of the same size at their path.
+    The extraction still checks their CRC-32.
+    """
+    reused_bytes = 0
+    for path, size in members:
+        try:
+            if os.path.getsize(os.path.join(game_dir, path)) == size:
+                reused_bytes += size
+        except OSError:
+            pass
+
+    return reused_bytes
+
+
+def existing_ancestor(path):
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+
+    return path
+
+
+def device_of(path):
+    return os.stat(existing_ancestor(path)).st_dev
+
+
+def phase_history(records, kind=None):
+    """Return the median throughput in bytes per second and the median
+    duration in seconds of each phase of the completed update records of
+    kind."""
+    throughputs = {}
+    durations = {}
+    for record in records:
+        if record.get('outcome') != 'completed':
+            continue
+        if kind is not None and record.get('kind') != kind:
+            continue
+
+        for span in record.get('spans', ()):
+            name = span['name']
+            durations.setdefault(name, []).append(span['duration'])
+            if span.get('bytes') and span['duration'] > 0:
+                throughputs.setdefault(name, []).append(
+                    span['bytes'] / span['duration'])
+
+    return ({name: statistics.median(values)
+            for name, values in throughputs.items()},
+        {name: statistics.median(values)
+            for name, values in durations.items()})
+
+
+def estimate_duration(records, kind, download_bytes, extracted_bytes):
+    """Return the estimated duration in seconds of an update or None when
+    the past updates do not tell how fast the build is downloaded or
+    extracted."""
+    throughputs, durations = phase_history(records, kind)
+
+    sized = {
+        'download': download_bytes,
+        'extraction': extracted_bytes
+    }
+
+    seconds = 0
+    for name in SIZED_PHASES:
+        if sized[name] == 0:
+            continue
+        if name not in throughputs:
+            return None
+        seconds += sized[name] / throughputs[name]
+
+    for name, duration in durations.items():
+        if name not in SIZED_PHASES:
+            seconds += duration
+
+    return seconds
+
+
+class UpdatePlan:
+    """Disk space needed by an update on each volume it writes to and its
+    estimated duration in seconds, None when there is no history to base it
+    on. Each volume is a dict with its path, its free bytes and the bytes
+    written at the peak of the update, required with the files likely to be
+    reused and worst without them.
+    """
+
+    def __init__(self):
+        self.archive_bytes = 0
+        self.extracted_bytes = 0
+        self.reused_bytes = 0
+        self.carried_bytes = 0
+        self.file_count = 0
+        self.volumes = {}
+        self.estimated_seconds = None
+
+    def need(self, path, required, worst=None):
+        if worst is None:
+            worst = required
+
+        path = existing_ancestor(path)
+        device = os.stat(path).st_dev
+
+        volume = self.volumes.get(device)
+        if volume is None:
+            volume = {
+                'path': path,
+                'free': shutil.disk_usage(path).free,
+                'required': 0,
+                'worst': 0
+            }
+            self.volumes[device] = volume
+
+        volume['required'] += required
+        volume['worst'] += worst
+
+    def shortages(self):
+        """Return the volumes without enough free space for the update."""
+        return [volume for volume in self.volumes.values()
+            if volume['required'] > volume['free']]
+
+    def warnings(self):
+        """Return the volumes with enough free space for the update but
+        little left after it, or not enough if no file can be reused."""
+        return [volume for volume in self.volumes.values()
+            if volume['required'] <= volume['free'] <
+                volume['worst'] + cons.UPDATE_FREE_SPACE_MARGIN]
+
+
+def plan_update(game_dir, url, archive_path=None, download_dir=None,
+    store_dir=None, reuse=False, backup=False, kind='update',
+    user_agent=None, records=None, carried_dirs=(), skips=()):
+    """Return the UpdatePlan of installing the build archive at url in
+    game_dir without writing anything.
+
+    archive_path is the stored archive of the build when there is one.
+    Otherwise the archive is downloaded in download_dir and moved to
+    store_dir when archives are kept. reuse tells if the unchanged files of
+    the current version are linked and backup if the saves are compressed
+    before the update. carried_dirs are the directories copied to the new
+    build, without the files in skips. Raise PlanningError when the central
+    directory of the archive cannot be read.
+    """
+    if archive_path is not None:
+        summary = local_summary(archive_path)
+    else:
+        summary = remote_summary(url, user_agent)
+
+    plan = UpdatePlan()
+    plan.archive_bytes = summary['archive_bytes']
+    plan.extracted_bytes = summary['extracted_bytes']
+    plan.file_count = len(summary['members'])
+    if reuse:
+        plan.reused_bytes = likely_reused_bytes(summary['members'], game_dir)
+
+    download_bytes = 0
+    if archive_path is None:
+        download_bytes = plan.archive_bytes
+
+        # An interrupted download already has the size of the archive
+        part_path = os.path.join(download_dir,
+            unquote(os.path.basename(urlparse(url).path))) + '.part'
+        try:
+            part_bytes = os.path.getsize(part_path)
+        except OSError:
+            part_bytes = 0
+        if part_bytes == plan.archive_bytes:
+            plan.need(download_dir, 0)
+        else:
+            plan.need(download_dir, plan.archive_bytes)
+
+        # The archive is copied when the store is on another volume
+        if (store_dir is not None and
+            device_of(store_dir) != device_of(download_dir)):
+            plan.need(store_dir, plan.archive_bytes)
+
+    # The new build is extracted next to the current version, which is only
+    # renamed to previous_version
+    plan.need(staging_dir_for(game_dir),
+        plan.extracted_bytes - plan.reused_bytes, plan.extracted_bytes)
+
+    # Directories kept by the previous version are copied to the new build
+    for path in carried_dirs:
+        if os.path.isdir(path):
+            plan.carried_bytes += tree_size(path)
+    for path in skips:
+        try:
+            plan.carried_bytes -= os.path.getsize(path)
+        except OSError:
+            pass
+    if plan.carried_bytes > 0:
+        plan.need(game_dir, plan.carried_bytes)
+
+    save_dir = os.path.join(game_dir, 'save')
+    if backup and os.path.isdir(save_dir):
+        plan.need(save_dir, tree_size(save_dir))
+
+    if records is None:
+        records = read_records(count=cons.UPDATE_PLAN_HISTORY)
+    plan.estimated_seconds = estimate_duration(records, kind, download_bytes,
+        plan.extracted_bytes)
+
+    return plan
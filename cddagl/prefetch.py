@@ -0,0 +1,235 @@
+import json
+import os
+import time
+import zipfile
+from os import scandir
+from urllib.parse import urlparse, unquote
+
+import cddagl.constants as cons
+from cddagl.archives import sha256_file
+from cddagl.download import download_dir_for, RangedDownload, DownloadCancelled
+from cddagl.extraction import (
+    ArchiveExtractor, ExtractionCancelled, ARCHIVE_ERRORS
+)
+from cddagl.fileops import TreeRemover, OperationCancelled
+from cddagl.planner import plan_update, PlanningError
+
+MANIFEST_FILE = 'build.json'
+STAGED_DIRECTORY = 'build'
+
+
+class PrefetchError(Exception):
+    pass
+
+
+def prefetch_dir_for(game_dir):
+    return os.path.join(game_dir, cons.PREFETCH_DIRECTORY)
+
+
+def archive_path_for(url):
+    """Return the path where the update downloads the archive at url."""
+    return os.path.join(download_dir_for(url),
+        unquote(os.path.basename(urlparse(url).path)))
+
+
+def read_manifest(game_dir):
+    try:
+        with open(os.path.join(prefetch_dir_for(game_dir), MANIFEST_FILE),
+            'r', encoding='utf8') as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(game_dir, manifest):
+    prefetch_dir = prefetch_dir_for(game_dir)
+    os.makedirs(prefetch_dir, exist_ok=True)
+
+    manifest_path = os.path.join(prefetch_dir, MANIFEST_FILE)
+    temp_path = manifest_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf8') as manifest_file:
+        json.dump(manifest, manifest_file)
+    os.replace(temp_path, manifest_path)
+
+
+def modified_since(directory, timestamp):
+    """Return True when a file of the directory tree was modified after
+    timestamp."""
+    next_scans = [directory]
+    while len(next_scans) > 0:
+        with scandir(next_scans.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    next_scans.append(entry.path)
+                elif entry.stat(follow_symlinks=False).st_mtime > timestamp:
+                    return True
+
+    return False
+
+
+def prefetched_build(game_dir, build):
+    """Return what was prefetched in game_dir for build or None. This is a
+    dict with the url, number and sha256 of the build, the path of its
+    verified archive and of its extracted files, None when they are missing,
+    and the fingerprints of its executables by name.
+    """
+    manifest = read_manifest(game_dir)
+    if (manifest is None or manifest.get('url') != build['url'] or
+        manifest.get('number') != build['number']):
+        return None
+
+    archive_path = manifest.get('archive')
+    try:
+        if os.path.getsize(archive_path) != manifest['archive_bytes']:
+            archive_path = None
+    except (OSError, TypeError, KeyError):
+        archive_path = None
+
+    staged_dir = None
+    if manifest.get('prepared_on') is not None:
+        staged_dir = os.path.join(prefetch_dir_for(game_dir),
+            STAGED_DIRECTORY)
+        try:
+            if modified_since(staged_dir, manifest['prepared_on']):
+                staged_dir = None
+        except OSError:
+            staged_dir = None
+
+    if archive_path is None and staged_dir is None:
+        return None
+
+    return {
+        'url': manifest['url'],
+        'number': manifest['number'],
+        'sha256': manifest.get('sha256'),
+        'archive': archive_path,
+        'staged_dir': staged_dir,
+        'fingerprints': {name: tuple(fingerprint) for name, fingerprint
+            in manifest.get('fingerprints', {}).items()}
+    }
+
+
+class Prefetcher:
+    """Download and verify a build ahead of the update of game_dir and, when
+    stage is True, extract it in the prefetch directory of game_dir so the
+    update only has to swap it in. The archive is downloaded where the
+    update looks for it. A single connection and a single extraction worker
+    are used so the game keeps most of the network and the disk.
+
+    The build is only extracted when the planned disk space leaves a margin,
+    and the unchanged files of the current version are copied instead of
+    being inflated when reuse is True. They are never linked, since the
+    current version is still played. cancel() can be called from any
+    thread.
+    """
+
+    def __init__(self, game_dir, build, stage=False, reuse=False,
+        user_agent=None):
+        self.game_dir = game_dir
+        self.build = build
+        self.stage = stage
+        self.reuse = reuse
+        self.user_agent = user_agent
+
+        self.cancelled = False
+        self.task = None
+
+    def cancel(self):
+        self.cancelled = True
+        task = self.task
+        if task is not None:
+            task.cancel()
+
+    def run(self):
+        """Prefetch the build and return it as prefetched_build() does.
+        Raise OperationCancelled, PrefetchError, DownloadError or OSError if
+        it could not be completed.
+        """
+        prefetched = prefetched_build(self.game_dir, self.build)
+        if prefetched is not None and (prefetched['staged_dir'] is not None
+            or not self.stage):
+            return prefetched
+
+        # Forget what was prefetched for another build
+        prefetch_dir = prefetch_dir_for(self.game_dir)
+        if os.path.isdir(prefetch_dir):
+            self.task = TreeRemover(prefetch_dir, workers=1)
+            self.check_cancelled()
+            self.task.run()
+
+        url = self.build['url']
+        archive_path = archive_path_for(url)
+        downloaded = os.path.isfile(archive_path)
+
+        try:
+            plan = plan_update(self.game_dir, url,
+                archive_path if downloaded else None,
+                os.path.dirname(archive_path), None, False, False,
+                'update', self.user_agent)
+        except PlanningError:
+            plan = None
+        if plan is not None and len(plan.shortages()) > 0:
+            raise PrefetchError('Not enough disk space')
+        stage = self.stage and plan is not None and len(plan.warnings()) == 0
+
+        if not downloaded:
+            os.makedirs(os.path.dirname(archive_path), exist_ok=True)
+            self.task = RangedDownload(url, archive_path, None,
+                self.user_agent, connections=1)
+            self.check_cancelled()
+            try:
+                self.task.run()
+            except DownloadCancelled:
+                raise OperationCancelled()
+
+        self.check_cancelled()
+        sha256 = sha256_file(archive_path)
+        if (self.build.get('sha256') is not None and
+            sha256 != self.build['sha256']):
+            os.remove(archive_path)
+            raise PrefetchError('Checksum mismatch')
+
+        manifest = {
+            'url': url,
+            'number': self.build['number'],
+            'sha256': sha256,
+            'archive': archive_path,
+            'archive_bytes': os.path.getsize(archive_path),
+            'fingerprints': {},
+            'prepared_on': None
+        }
+
+        if stage:
+            self.check_cancelled()
+            try:
+                manifest['fingerprints'] = self.extract(archive_path,
+                    os.path.join(prefetch_dir, STAGED_DIRECTORY))
+            except ARCHIVE_ERRORS:
+                os.remove(archive_path)
+                raise PrefetchError('Downloaded archive is invalid')
+            # Extracted and copied files are older, a later change means
+            # the build was tampered with
+            manifest['prepared_on'] = time.time()
+
+        write_manifest(self.game_dir, manifest)
+
+        return prefetched_build(self.game_dir, self.build)
+
+    def extract(self, archive_path, staged_dir):
+        os.makedirs(staged_dir)
+
+        with zipfile.ZipFile(archive_path) as z:
+            infolist = z.infolist()
+
+        reuse_dir = self.game_dir if self.reuse else None
+        self.task = ArchiveExtractor(archive_path, infolist, staged_dir, None,
+            cons.GAME_EXECUTABLES, reuse_dir, workers=1)
+        self.check_cancelled()
+        try:
+            return self.task.run()
+        except ExtractionCancelled:
+            raise OperationCancelled()
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise OperationCancelled()
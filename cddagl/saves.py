@@ -0,0 +1,261 @@
+import heapq
+import os
+from os import scandir
+
+import cddagl.constants as cons
+
+
+class SavesScanCancelled(Exception):
+    pass
+
+
+def file_category(relative_path, name):
+    """Return the category of a file of the save tree for the size
+    breakdown. relative_path is the path of its directory relative to the
+    save directory.
+    """
+    parts = relative_path.split(os.sep) if relative_path != '' else []
+
+    if len(parts) == 0:
+        return 'other'
+
+    if len(parts) == 1:
+        # Character files are prefixed with a # and overmap files with o.
+        if name.startswith('#'):
+            return 'characters'
+        if name.startswith('o.'):
+            return 'overmaps'
+        return 'other'
+
+    world_subdir = parts[1]
+    if world_subdir in ('maps', 'overmaps', 'memorial'):
+        return world_subdir
+    if world_subdir.startswith('#'):
+        return 'characters'
+    return 'other'
+
+
+def scan_save_directory(path, mtime, relative_path):
+    """Return the index record of a directory of the save tree, counting its
+    direct files only.
+    """
+    record = {
+        'mtime': mtime,
+        'size': 0,
+        'files': 0,
+        'sav_files': 0,
+        'world_files': 0,
+        'subdirs': [],
+        'categories': {}
+    }
+
+    categories = record['categories']
+    with scandir(path) as dir_scan:
+        for entry in dir_scan:
+            if entry.is_dir():
+                record['subdirs'].append(entry.name)
+            elif entry.is_file():
+                size = entry.stat().st_size
+                record['size'] += size
+                record['files'] += 1
+
+                category = file_category(relative_path, entry.name)
+                categories[category] = categories.get(category, 0) + size
+
+                if entry.name.endswith('.sav'):
+                    record['sav_files'] += 1
+                if entry.name in cons.WORLD_FILES:
+                    record['world_files'] += 1
+
+    return record
+
+
+def record_outdated(record, mtime):
+    # Records stored before the size breakdown existed have no categories
+    return (record is None or record['mtime'] != mtime or
+        record['categories'] is None)
+
+
+def world_name(relative_path):
+    """Return the name of the world a directory relative to the save
+    directory belongs to or '' for the save directory itself.
+    """
+    return relative_path.split(os.sep, 1)[0]
+
+
+def apply_record(summary, relative_path, record, sign=1):
+    """Add the contribution of a directory record to a saves summary, or
+    remove it when sign is -1.
+    """
+    summary['size'] += sign * record['size']
+
+    if relative_path != '' and world_name(relative_path) == relative_path:
+        summary['characters'] += sign * record['sav_files']
+        if record['world_files'] > 0:
+            summary['worlds'] += sign
+
+
+def indexed_saves_summary(save_dir, index, progress=None, is_cancelled=None):
+    """Walk the save directory and return its total size with the number of
+    worlds and characters it contains.
+
+    index maps the paths of directories relative to save_dir to their
+    records from a previous walk. Only the directories whose mtime changed
+    since then are scanned again. Return (summary, updated, removed) where
+    updated holds the new records and removed the paths that disappeared.
+
+    progress is called with the partial summary after each directory and
+    is_cancelled is polled before each directory. SavesScanCancelled is
+    raised when it returns True.
+    """
+    summary = {
+        'size': 0,
+        'worlds': 0,
+        'characters': 0
+    }
+    updated = {}
+
+    if not os.path.isdir(save_dir):
+        return summary, updated, list(index)
+
+    visited = set()
+    next_scans = ['']
+
+    while len(next_scans) > 0:
+        if is_cancelled is not None and is_cancelled():
+            raise SavesScanCancelled()
+
+        relative_path = next_scans.pop()
+        current_dir = os.path.join(save_dir, relative_path)
+        visited.add(relative_path)
+
+        # The mtime is read before scanning so that a change made during the
+        # scan is picked up by the next walk
+        mtime = os.stat(current_dir).st_mtime_ns
+        record = index.get(relative_path)
+        if record_outdated(record, mtime):
+            record = scan_save_directory(current_dir, mtime, relative_path)
+            updated[relative_path] = record
+
+        apply_record(summary, relative_path, record)
+
+        for name in record['subdirs']:
+            next_scans.append(os.path.join(relative_path, name))
+
+        if progress is not None:
+            progress(summary)
+
+    removed = [path for path in index if path not in visited]
+
+    return summary, updated, removed
+
+
+def saves_summary(save_dir, progress=None, is_cancelled=None):
+    """Walk the whole save directory without an index and return its
+    summary. See indexed_saves_summary.
+    """
+    summary, updated, removed = indexed_saves_summary(save_dir, {}, progress,
+        is_cancelled)
+
+    return summary
+
+
+def refresh_save_directories(save_dir, index, summary, paths):
+    """Scan again the directories at paths, relative to save_dir, and apply
+    the differences with their previous records to index and summary in
+    place. New subdirectories are scanned and vanished ones are dropped.
+    Return (updated, removed) like indexed_saves_summary.
+    """
+    updated = {}
+    removed = []
+
+    def remove_tree(relative_path):
+        next_removals = [relative_path]
+        while len(next_removals) > 0:
+            path = next_removals.pop()
+            record = index.pop(path, None)
+            updated.pop(path, None)
+            if record is not None:
+                apply_record(summary, path, record, -1)
+                removed.append(path)
+                next_removals.extend(os.path.join(path, name)
+                    for name in record['subdirs'])
+
+    next_scans = list(paths)
+    while len(next_scans) > 0:
+        relative_path = next_scans.pop()
+        current_dir = os.path.join(save_dir, relative_path)
+
+        try:
+            mtime = os.stat(current_dir).st_mtime_ns
+            previous = index.get(relative_path)
+            if not record_outdated(previous, mtime):
+                continue
+
+            record = scan_save_directory(current_dir, mtime, relative_path)
+        except FileNotFoundError:
+            remove_tree(relative_path)
+            continue
+
+        previous_subdirs = set()
+        if previous is not None:
+            apply_record(summary, relative_path, previous, -1)
+            previous_subdirs.update(previous['subdirs'])
+        apply_record(summary, relative_path, record)
+
+        index[relative_path] = record
+        updated[relative_path] = record
+
+        subdirs = set(record['subdirs'])
+        for name in subdirs - previous_subdirs:
+            next_scans.append(os.path.join(relative_path, name))
+        for name in previous_subdirs - subdirs:
+            remove_tree(os.path.join(relative_path, name))
+
+    return updated, removed
+
+
+def saves_breakdown(index):
+    """Return the size breakdown of a save tree from its index as a dict of
+    worlds with their size, file count, .sav file count and size by file
+    category.
+    """
+    worlds = {}
+    for relative_path, record in index.items():
+        world = world_name(relative_path)
+        if world not in worlds:
+            worlds[world] = {
+                'size': 0,
+                'files': 0,
+                'sav_files': 0,
+                'categories': {}
+            }
+
+        world_info = worlds[world]
+        world_info['size'] += record['size']
+        world_info['files'] += record['files']
+        world_info['sav_files'] += record['sav_files']
+
+        categories = world_info['categories']
+        for category, size in (record['categories'] or {}).items():
+            categories[category] = categories.get(category, 0) + size
+
+    return worlds
+
+
+def heavy_directories(index, count):
+    """Return the count directories of a save tree with the largest total
+    size, including their subdirectories, as (relative_path, size) pairs.
+    """
+    totals = {}
+    for relative_path, record in index.items():
+        if relative_path == '':
+            continue
+
+        # Add the size of the files to the directory and all its parents
+        parent = relative_path
+        while parent != '':
+            totals[parent] = totals.get(parent, 0) + record['size']
+            parent = os.path.dirname(parent)
+
+    return heapq.nlargest(count, totals.items(), key=lambda item: item[1])
@@ -0,0 +1,191 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+import cddagl.constants as cons
+from cddagl.constants import get_logging_path
+
+
+class SpanRecorder:
+    """Wall time, bytes and file counts of the phases of an update. Phases
+    are spans that follow each other, beginning a span ends the current one.
+    """
+
+    def __init__(self, **attributes):
+        self.record = dict(attributes)
+        self.record['started_on'] = datetime.now(timezone.utc).isoformat()
+        self.record['spans'] = []
+
+        self.started = time.monotonic()
+        self.span = None
+
+    def set(self, **attributes):
+        self.record.update(attributes)
+
+    def begin(self, name):
+        self.end()
+
+        self.span = {
+            'name': name,
+            'start': round(time.monotonic() - self.started, 3)
+        }
+        self.span_started = time.monotonic()
+
+    def end(self, byte_count=None, file_count=None, **values):
+        if self.span is None:
+            return
+
+        duration = time.monotonic() - self.span_started
+        self.span['duration'] = round(duration, 3)
+        if byte_count is not None:
+            self.span['bytes'] = byte_count
+            if duration > 0:
+                self.span['throughput'] = round(byte_count / duration)
+        if file_count is not None:
+            self.span['files'] = file_count
+        self.span.update(values)
+
+        self.record['spans'].append(self.span)
+        self.span = None
+
+    def finish(self, outcome):
+        """End the current span and return the record of the update."""
+        self.end()
+
+        self.record['outcome'] = outcome
+        self.record['duration'] = round(time.monotonic() - self.started, 3)
+        return self.record
+
+
+def timings_file():
+    return get_logging_path(cons.UPDATE_TIMINGS_FILE)
+
+
+def read_records(path=None, count=None):
+    """Return the last count update records, the oldest first."""
+    if path is None:
+        path = timings_file()
+
+    records = []
+    try:
+        with open(path, 'r', encoding='utf8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    pass
+    except FileNotFoundError:
+        return records
+
+    if count is not None:
+        # records[-0:] would be every record
+        records = records[-count:] if count > 0 else []
+    return records
+
+
+def write_record(record, path=None):
+    """Append an update record as a JSON line. Only the last
+    MAX_UPDATE_TIMINGS records are kept."""
+    if path is None:
+        path = timings_file()
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    records = read_records(path)
+    records.append(record)
+    if len(records) > cons.MAX_UPDATE_TIMINGS:
+        records = records[-cons.MAX_UPDATE_TIMINGS:]
+        mode = 'w'
+        lines = records
+    else:
+        mode = 'a'
+        lines = (record, )
+
+    with open(path, mode, encoding='utf8') as f:
+        for line in lines:
+            f.write(json.dumps(line, sort_keys=True) + '\n')
+
+
+def format_size(size):
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if abs(size) < 1024:
+            return '{0:.1f} {1}'.format(size, unit)
+        size /= 1024
+    return '{0:.1f} TiB'.format(size)
+
+
+def report(records):
+    """Return a text report of the time spent in each phase of the update
+    records."""
+    if len(records) == 0:
+        return 'No update was recorded.'
+
+    outcomes = {}
+    for record in records:
+        outcome = record.get('outcome', 'unknown')
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    total_time = sum(record.get('duration', 0) for record in records)
+
+    phases = {}
+    for record in records:
+        for span in record.get('spans', ()):
+            phases.setdefault(span['name'], []).append(span)
+
+    lines = []
+    lines.append('{count} updates ({outcomes}), {duration:.1f} s in '
+        'total'.format(count=len(records),
+            outcomes=', '.join('{0} {1}'.format(count, outcome)
+                for outcome, count in sorted(outcomes.items())),
+            duration=total_time))
+    lines.append('')
+    lines.append('{0:<20} {1:>5} {2:>9} {3:>9} {4:>9} {5:>6} {6:>13}'.format(
+        'phase', 'runs', 'mean s', 'median s', 'max s', 'share',
+        'throughput'))
+
+    # Phases are listed in the order they run
+    ordered = sorted(phases.items(), key=lambda x: statistics.median(
+        span['start'] for span in x[1]))
+    for name, spans in ordered:
+        durations = [span['duration'] for span in spans]
+
+        throughput = ''
+        measured = [span for span in spans
+            if span.get('bytes') and span['duration'] > 0]
+        if len(measured) > 0:
+            throughput = format_size(sum(span['bytes'] for span in measured) /
+                sum(span['duration'] for span in measured)) + '/s'
+
+        share = 0
+        if total_time > 0:
+            share = sum(durations) / total_time
+
+        lines.append('{0:<20} {1:>5} {2:>9.2f} {3:>9.2f} {4:>9.2f} {5:>6.0%} '
+            '{6:>13}'.format(name, len(spans), statistics.mean(durations),
+                statistics.median(durations), max(durations), share,
+                throughput))
+
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m cddagl.spans',
+        description='Report where time goes in the last game updates.')
+    parser.add_argument('-n', '--last', type=int, default=20,
+        help='number of updates to aggregate (default: %(default)s)')
+    parser.add_argument('--file', default=None,
+        help='update timings file (default: {0})'.format(timings_file()))
+    args = parser.parse_args(argv)
+    if args.last < 1:
+        parser.error('argument -n/--last: must be at least 1')
+
+    print(report(read_records(args.file, args.last)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
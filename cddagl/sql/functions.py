@@ -1,5 +1,7 @@
+import json
 import os
 import threading
+from datetime import datetime
 
 from alembic import command
 from alembic.config import Config
@@ -8,7 +10,10 @@ from sqlalchemy import create_engine
 from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker, joinedload
 
-from cddagl.sql.model import ConfigValue, GameVersion, GameBuild
+from cddagl.sql.model import (
+    ConfigValue, GameVersion, GameBuild, ExeFingerprint, SavesDirectory,
+    BuildArchive
+)
 
 
 class ThreadSafeSessionManager():
@@ -162,5 +167,190 @@ def get_build_from_sha256(sha256):
     return None
 
 
+def get_exe_fingerprint(path, identity):
+    """Return the cached sha256 and version of the executable at path if its
+    identity (size, mtime, file id) did not change since it was stored.
+    """
+    session = get_session()
+
+    size, mtime, file_id = identity
+
+    fingerprint = (session
+                   .query(ExeFingerprint)
+                   .filter_by(path=path, size=size, mtime=mtime,
+                              file_id=file_id)
+                   .first())
+
+    if fingerprint is not None:
+        return {
+            'sha256': fingerprint.sha256,
+            'version': fingerprint.version
+        }
+
+    return None
+
+
+def set_exe_fingerprint(path, identity, sha256, version):
+    session = get_session()
+
+    fingerprint = session.query(ExeFingerprint).filter_by(path=path).first()
+
+    if fingerprint is None:
+        fingerprint = ExeFingerprint()
+        fingerprint.path = path
+
+    fingerprint.size, fingerprint.mtime, fingerprint.file_id = identity
+    fingerprint.sha256 = sha256
+    fingerprint.version = version
+    fingerprint.updated_on = datetime.utcnow()
+
+    session.add(fingerprint)
+    session.commit()
+
+
+def get_saves_index(save_dir):
+    """Return the records of the directories of a save tree by path relative
+    to save_dir.
+    """
+    session = get_session()
+
+    index = {}
+    for directory in session.query(SavesDirectory).filter_by(
+        save_dir=save_dir):
+        index[directory.path] = {
+            'mtime': directory.mtime,
+            'size': directory.size,
+            'files': directory.files,
+            'sav_files': directory.sav_files,
+            'world_files': directory.world_files,
+            'subdirs': json.loads(directory.subdirs),
+            'categories': (json.loads(directory.categories)
+                if directory.categories is not None else None)
+        }
+
+    return index
+
+
+def update_saves_index(save_dir, updated, removed):
+    session = get_session()
+
+    paths = list(updated) + list(removed)
+    existing = {}
+    # Stay below the maximum number of SQLite query parameters
+    for start in range(0, len(paths), 500):
+        for directory in (session
+                          .query(SavesDirectory)
+                          .filter(SavesDirectory.save_dir == save_dir,
+                                  SavesDirectory.path.in_(
+                                      paths[start:start + 500]))):
+            existing[directory.path] = directory
+
+    for path in removed:
+        directory = existing.get(path)
+        # A directory can be removed and created again between two updates
+        if directory is not None and path not in updated:
+            session.delete(directory)
+
+    for path, record in updated.items():
+        directory = existing.get(path)
+        if directory is None:
+            directory = SavesDirectory()
+            directory.save_dir = save_dir
+            directory.path = path
+            directory.world = path.split(os.sep, 1)[0]
+
+        directory.mtime = record['mtime']
+        directory.size = record['size']
+        directory.files = record['files']
+        directory.sav_files = record['sav_files']
+        directory.world_files = record['world_files']
+        directory.subdirs = json.dumps(record['subdirs'])
+        directory.categories = json.dumps(record['categories'])
+
+        session.add(directory)
+
+    session.commit()
+
+
+def build_archive_dict(archive):
+    return {
+        'id': archive.id,
+        'build': archive.build,
+        'asset_name': archive.asset_name,
+        'sha256': archive.sha256,
+        'path': archive.path,
+        'size': archive.size
+    }
+
+
+def get_build_archive(build, asset_name, sha256=None):
+    """Return the most recently used stored archive of a build asset,
+    optionally with a given sha256.
+    """
+    session = get_session()
+
+    query = session.query(BuildArchive).filter_by(build=build,
+        asset_name=asset_name)
+    if sha256 is not None:
+        query = query.filter_by(sha256=sha256)
+
+    archive = query.order_by(BuildArchive.last_used_on.desc()).first()
+
+    if archive is not None:
+        return build_archive_dict(archive)
+
+    return None
+
+
+def get_build_archives():
+    """Return all the stored archives from the least recently used."""
+    session = get_session()
+
+    return [build_archive_dict(archive) for archive in (session
+        .query(BuildArchive)
+        .order_by(BuildArchive.last_used_on))]
+
+
+def add_build_archive(build, asset_name, sha256, path, size):
+    session = get_session()
+
+    archive = (session
+               .query(BuildArchive)
+               .filter_by(build=build, asset_name=asset_name, sha256=sha256)
+               .first())
+
+    if archive is None:
+        archive = BuildArchive()
+        archive.build = build
+        archive.asset_name = asset_name
+        archive.sha256 = sha256
+        archive.stored_on = datetime.utcnow()
+
+    archive.path = path
+    archive.size = size
+    archive.last_used_on = datetime.utcnow()
+
+    session.add(archive)
+    session.commit()
+
+
+def touch_build_archive(archive_id):
+    session = get_session()
+
+    archive = session.query(BuildArchive).get(archive_id)
+    if archive is not None:
+        archive.last_used_on = datetime.utcnow()
+        session.commit()
+
+
+def remove_build_archive(archive_id):
+    session = get_session()
+
+    archive = session.query(BuildArchive).get(archive_id)
+    if archive is not None:
+        session.delete(archive)
+        session.commit()
+
+
 def config_true(value):
     return value == 'True' or value == '1'
@@ -43,3 +43,50 @@ class GameBuild(Base):
     released_on = sa.Column(sa.DateTime, nullable=False)
     discovered_on = sa.Column(sa.DateTime, nullable=False,
         default=datetime.utcnow)
+
+
+class ExeFingerprint(Base):
+    __tablename__ = 'exe_fingerprint'
+
+    id = sa.Column(sa.Integer, primary_key=True)
+    path = sa.Column(sa.Text(), nullable=False, index=True, unique=True)
+    size = sa.Column(sa.BigInteger, nullable=False)
+    mtime = sa.Column(sa.BigInteger, nullable=False)
+    file_id = sa.Column(sa.String(64), nullable=False)
+    sha256 = sa.Column(sa.String(64), nullable=False)
+    version = sa.Column(sa.String(32), nullable=False)
+    updated_on = sa.Column(sa.DateTime, nullable=False,
+        default=datetime.utcnow)
+
+
+class SavesDirectory(Base):
+    __tablename__ = 'saves_directory'
+    __table_args__ = (sa.UniqueConstraint('save_dir', 'path'),)
+
+    id = sa.Column(sa.Integer, primary_key=True)
+    save_dir = sa.Column(sa.Text(), nullable=False, index=True)
+    path = sa.Column(sa.Text(), nullable=False)
+    world = sa.Column(sa.Text(), nullable=False)
+    mtime = sa.Column(sa.BigInteger, nullable=False)
+    size = sa.Column(sa.BigInteger, nullable=False)
+    files = sa.Column(sa.Integer, nullable=False)
+    sav_files = sa.Column(sa.Integer, nullable=False)
+    world_files = sa.Column(sa.Integer, nullable=False)
+    subdirs = sa.Column(sa.Text(), nullable=False)
+    categories = sa.Column(sa.Text(), nullable=True)
+
+
+class BuildArchive(Base):
+    __tablename__ = 'build_archive'
+    __table_args__ = (sa.UniqueConstraint('build', 'asset_name', 'sha256'),)
+
+    id = sa.Column(sa.Integer, primary_key=True)
+    build = sa.Column(sa.String(16), nullable=False)
+    asset_name = sa.Column(sa.Text(), nullable=False)
+    sha256 = sa.Column(sa.String(64), nullable=False)
+    path = sa.Column(sa.Text(), nullable=False)
+    size = sa.Column(sa.BigInteger, nullable=False)
+    stored_on = sa.Column(sa.DateTime, nullable=False,
+        default=datetime.utcnow)
+    last_used_on = sa.Column(sa.DateTime, nullable=False,
+        default=datetime.utcnow)
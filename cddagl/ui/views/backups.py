@@ -19,6 +19,7 @@ from babel.dates import format_datetime
 from babel.numbers import format_percent
 
 import cddagl.constants as cons
+from cddagl.backups import prune_auto_backups, unique_backup_name
 from cddagl.functions import sizeof_fmt, safe_filename, alphanum_key, delete_path
 from cddagl.i18n import proxy_gettext as _
 from cddagl.sql.functions import get_config_value, set_config_value, config_true
@@ -757,39 +758,10 @@ class BackupsTab(QTabWidget):
     def prune_auto_backups(self):
         if self.game_dir is None:
             return
-        
-        max_auto_backups = max(int(get_config_value('max_auto_backups', '6'))
-            , 1)
 
-        search_start = (_('auto') + '_').lower()
-
-        backup_dir = os.path.join(self.game_dir, 'save_backups')
-        if not os.path.isdir(backup_dir):
-            return
-
-        auto_backups = []
-
-        for entry in scandir(backup_dir):
-            filename, ext = os.path.splitext(entry.name)
-            if entry.is_file() and ext.lower() == '.zip':
-                filename_lower = filename.lower()
-
-                if filename_lower.startswith(search_start):
-                    auto_backups.append({
-                        'path': entry.path,
-                        'modified': datetime.fromtimestamp(
-                            entry.stat().st_mtime)
-                    })
-
-        if len(auto_backups) >= max_auto_backups:
-            # Remove backups to have a total of max_auto_backups - 1
-            auto_backups.sort(key=lambda x: x['modified'])
-            remove_count = len(auto_backups) - max_auto_backups + 1
-
-            to_remove = auto_backups[:remove_count]
-
-            for backup in to_remove:
-                delete_path(backup['path'])
+        prune_auto_backups(os.path.join(self.game_dir, 'save_backups'),
+            _('auto'), int(get_config_value('max_auto_backups', '6')),
+            delete_path)
 
     def backup_saves(self, name, single=False):
         main_window = self.get_main_window()
@@ -827,52 +799,7 @@ class BackupsTab(QTabWidget):
                         'backup archive'))
                     return
         else:
-            '''
-            Finding a backup filename which does not already exists or is the
-            next backup name based on an incremental counter placed at the end
-            of the filename without the extension.
-            '''
-
-            name_lower = name.lower()
-            name_key = alphanum_key(name_lower)
-            if len(name_key) > 1 and isinstance(name_key[-1:][0], int):
-                name_key = name_key[:-1]
-
-            duplicate_name = False
-            duplicate_basename = False
-            max_counter = 0
-
-            for entry in scandir(backup_dir):
-                filename, ext = os.path.splitext(entry.name)
-                if entry.is_file() and ext.lower() == '.zip':
-                    filename_lower = filename.lower()
-
-                    if filename_lower == name_lower:
-                        duplicate_name = True
-                    else:
-                        filename_key = alphanum_key(filename_lower)
-
-                        counter = filename_key[-1:][0]
-                        if len(filename_key) > 1 and isinstance(counter, int):
-                            filename_key = filename_key[:-1]
-
-                            if name_key == filename_key:
-                                duplicate_basename = True
-                                max_counter = max(max_counter, counter)
-
-            if duplicate_basename:
-                name_key = alphanum_key(name)
-                if len(name_key) > 1 and isinstance(name_key[-1:][0], int):
-                    name_key = name_key[:-1]
-
-                name_key.append(max_counter + 1)
-                backup_filename = ''.join(map(lambda x: str(x), name_key))
-            elif duplicate_name:
-                backup_filename = name + '2'
-            else:
-                backup_filename = name
-
-            backup_filename = backup_filename + '.zip'
+            backup_filename = unique_backup_name(backup_dir, name) + '.zip'
 
             self.backup_path = os.path.join(backup_dir, backup_filename)
 
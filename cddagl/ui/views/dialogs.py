@@ -9,13 +9,14 @@ from urllib.parse import urlencode
 from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import (
     QWidget, QGridLayout, QLabel, QLineEdit, QPushButton, QFileDialog, QToolButton,
-    QDialog, QTextBrowser, QMessageBox, QHBoxLayout, QTextEdit
+    QDialog, QTextBrowser, QMessageBox, QHBoxLayout, QTextEdit, QTreeWidget,
+    QTreeWidgetItem, QHeaderView
 )
 
 import cddagl.constants as cons
 from cddagl import __version__ as version
 from cddagl.constants import get_resource_path
-from cddagl.functions import clean_qt_path, bitness
+from cddagl.functions import clean_qt_path, bitness, sizeof_fmt
 from cddagl.i18n import proxy_gettext as _
 from cddagl.win32 import get_downloads_directory
 
@@ -315,6 +316,90 @@ class AboutDialog(QDialog):
         self.text_content.setHtml(m)
 
 
+class SavesBreakdownDialog(QDialog):
+    def __init__(self, breakdown, heavy_dirs, parent=0, f=0):
+        super(SavesBreakdownDialog, self).__init__(parent, f)
+
+        self.breakdown = breakdown
+        self.heavy_dirs = heavy_dirs
+
+        layout = QGridLayout()
+
+        worlds_label = QLabel()
+        layout.addWidget(worlds_label, 0, 0)
+        self.worlds_label = worlds_label
+
+        worlds_tree = QTreeWidget()
+        worlds_tree.setColumnCount(2)
+        worlds_tree.header().setSectionResizeMode(0, QHeaderView.Stretch)
+        worlds_tree.header().setStretchLastSection(False)
+        layout.addWidget(worlds_tree, 1, 0)
+        self.worlds_tree = worlds_tree
+
+        heavy_label = QLabel()
+        layout.addWidget(heavy_label, 2, 0)
+        self.heavy_label = heavy_label
+
+        heavy_tree = QTreeWidget()
+        heavy_tree.setColumnCount(2)
+        heavy_tree.setRootIsDecorated(False)
+        heavy_tree.header().setSectionResizeMode(0, QHeaderView.Stretch)
+        heavy_tree.header().setStretchLastSection(False)
+        layout.addWidget(heavy_tree, 3, 0)
+        self.heavy_tree = heavy_tree
+
+        ok_button = QPushButton()
+        ok_button.clicked.connect(self.done)
+        layout.addWidget(ok_button, 4, 0, Qt.AlignRight)
+        self.ok_button = ok_button
+
+        layout.setRowStretch(1, 100)
+        layout.setRowStretch(3, 50)
+
+        self.setMinimumSize(640, 450)
+
+        self.setLayout(layout)
+        self.set_text()
+
+    def set_text(self):
+        self.setWindowTitle(_('Saves details'))
+        self.worlds_label.setText(_('Size by world:'))
+        self.heavy_label.setText(_('Largest directories:'))
+        self.ok_button.setText(_('OK'))
+
+        self.worlds_tree.setHeaderLabels((_('Name'), _('Size')))
+        self.heavy_tree.setHeaderLabels((_('Path'), _('Size')))
+
+        category_names = {
+            'characters': _('Character files'),
+            'maps': _('Maps'),
+            'overmaps': _('Overmaps'),
+            'memorial': _('Memorial'),
+            'other': _('Other files')
+        }
+
+        self.worlds_tree.clear()
+        worlds = sorted(self.breakdown.items(), key=lambda item: item[1]['size'],
+            reverse=True)
+        for world, world_info in worlds:
+            if world_info['size'] == 0:
+                continue
+
+            world_item = QTreeWidgetItem((world or _('Save directory'),
+                sizeof_fmt(world_info['size'])))
+            categories = sorted(world_info['categories'].items(),
+                key=lambda item: item[1], reverse=True)
+            for category, size in categories:
+                world_item.addChild(QTreeWidgetItem((
+                    category_names.get(category, category), sizeof_fmt(size))))
+            self.worlds_tree.addTopLevelItem(world_item)
+
+        self.heavy_tree.clear()
+        for path, size in self.heavy_dirs:
+            self.heavy_tree.addTopLevelItem(QTreeWidgetItem((path,
+                sizeof_fmt(size))))
+
+
 class ExceptionWindow(QWidget):
     def __init__(self, app, extype, value, tb):
         super(ExceptionWindow, self).__init__()
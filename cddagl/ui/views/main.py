@@ -1,26 +1,27 @@
-import hashlib
 import html
 import json
 import logging
 import os
 import re
 import shutil
-import stat
 import subprocess
 import sys
-import tempfile
+import time
 import xml.etree.ElementTree
 import zipfile
 import random
 
-from collections import deque
-from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
 from io import BytesIO, StringIO, TextIOWrapper
 from os import scandir
 from urllib.parse import urljoin
 
 import arrow
-from PyQt5.QtCore import Qt, QTimer, QUrl, QFileInfo, pyqtSignal, QStringListModel, QThread
+from PyQt5.QtCore import (
+    Qt, QTimer, QUrl, QFileInfo, pyqtSignal, QStringListModel, QThread,
+    QObject, QFileSystemWatcher
+)
 from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkRequest
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QGridLayout, QGroupBox, QVBoxLayout, QLabel, QLineEdit,
@@ -34,16 +35,53 @@ import cddagl.constants as cons
 from cddagl.constants import get_cddagl_path, get_cdda_uld_path
 from cddagl import __version__ as version
 from cddagl.functions import (
-    tryint, move_path, is_64_windows, sizeof_fmt, delete_path,
+    tryint, is_64_windows, sizeof_fmt, delete_path,
     clean_qt_path, unique, log_exception, ensure_slash
 )
+from cddagl.archives import get_build_store, sha256_file
+from cddagl.builds import parse_releases, stable_builds
+from cddagl.download import (
+    download_dir_for, RangedDownload, DownloadCancelled, DownloadError
+)
+from cddagl.assets import tree_size
+from cddagl.backups import auto_backup_name
+from cddagl.analysis import (
+    analysis_cache, analyse_game_dir, directory_signature, find_executable
+)
+from cddagl.extraction import (
+    ArchiveExtractor, staging_dir_for, swap_entries, ARCHIVE_ERRORS,
+    ExtractionCancelled
+)
+from cddagl.fileops import (
+    carry_over, trash_dir_for, move_to_trash, remove_file, TreeRemover,
+    TreeCopier, OperationCancelled
+)
+from cddagl.fingerprint import (
+    fingerprint_file, fingerprint_key, FingerprintCancelled
+)
 from cddagl.i18n import proxy_ngettext as ngettext, proxy_gettext as _
+from cddagl.planner import plan_update, PlanningError
+from cddagl.prefetch import (
+    prefetch_dir_for, prefetched_build, Prefetcher, PrefetchError
+)
+from cddagl.spans import SpanRecorder, write_record
+from cddagl.updater import (
+    carried_over_dirs, carry_over_skips, custom_assets, planned_carry_over,
+    swap_exclusions
+)
+from cddagl.saves import (
+    indexed_saves_summary, refresh_save_directories, saves_breakdown,
+    heavy_directories, SavesScanCancelled
+)
 from cddagl.sql.functions import (
     get_config_value, set_config_value, new_version, get_build_from_sha256,
-    new_build, config_true
+    new_build, config_true, get_exe_fingerprint, set_exe_fingerprint,
+    get_saves_index, update_saves_index
 )
+from cddagl.ui.views.dialogs import SavesBreakdownDialog
 from cddagl.win32 import (
-    find_process_with_file_handle, activate_window, process_id_from_path, wait_for_pid
+    find_process_with_file_handle, activate_window, process_id_from_path, wait_for_pid,
+    begin_background_mode
 )
 
 logger = logging.getLogger('cddagl')
@@ -59,6 +97,9 @@ class MainTab(QWidget):
         update_group_box = UpdateGroupBox()
         self.update_group_box = update_group_box
 
+        self.trash_reaper_thread = None
+        self.pending_trash_dirs = []
+
         layout = QVBoxLayout()
         layout.addWidget(game_dir_group_box)
         layout.addWidget(update_group_box)
@@ -91,6 +132,38 @@ class MainTab(QWidget):
         self.game_dir_group_box.enable_controls()
         self.update_group_box.enable_controls()
 
+    def reap_trash(self, game_dirs):
+        """Delete the trash of game directories in the background, after the
+        trash already being deleted.
+        """
+        for game_dir in game_dirs:
+            trash_dir = trash_dir_for(game_dir)
+            if (os.path.isdir(trash_dir) and
+                trash_dir not in self.pending_trash_dirs):
+                self.pending_trash_dirs.append(trash_dir)
+
+        if (self.trash_reaper_thread is None and
+            len(self.pending_trash_dirs) > 0):
+            trash_reaper_thread = TrashReaperThread(self.pending_trash_dirs)
+            self.pending_trash_dirs = []
+
+            trash_reaper_thread.finished.connect(self.trash_reaped)
+            trash_reaper_thread.start(QThread.IdlePriority)
+
+            self.trash_reaper_thread = trash_reaper_thread
+
+    def trash_reaped(self):
+        self.trash_reaper_thread = None
+        self.reap_trash(())
+
+    def stop_trash_reaper(self):
+        trash_reaper_thread = self.trash_reaper_thread
+        if trash_reaper_thread is not None:
+            trash_reaper_thread.finished.disconnect()
+            trash_reaper_thread.cancel()
+            trash_reaper_thread.wait()
+            self.trash_reaper_thread = None
+
 
 class GameDirGroupBox(QGroupBox):
     def __init__(self):
@@ -101,10 +174,14 @@ class GameDirGroupBox(QGroupBox):
         self.restored_previous = False
         self.current_build = None
 
-        self.exe_reading_timer = None
-        self.update_saves_timer = None
+        self.exe_reading_thread = None
+        self.game_dirs_analysis_thread = None
+        self.saves_census_thread = None
         self.saves_size = 0
 
+        self.saves_watcher = SavesWatcher(self)
+        self.saves_watcher.changed.connect(self.saves_watcher_changed)
+
         self.dir_combo_inserting = False
 
         self.game_process = None
@@ -150,6 +227,12 @@ class GameDirGroupBox(QGroupBox):
         layout.addWidget(version_value_label, 1, 1)
         self.version_value_label = version_value_label
 
+        verify_button = QToolButton()
+        verify_button.setEnabled(False)
+        verify_button.clicked.connect(self.verify_version)
+        layout.addWidget(verify_button, 1, 2)
+        self.verify_button = verify_button
+
         build_label = QLabel()
         layout.addWidget(build_label, 2, 0, Qt.AlignRight)
         self.build_label = build_label
@@ -170,13 +253,22 @@ class GameDirGroupBox(QGroupBox):
         layout.addWidget(saves_value_edit, 3, 1)
         self.saves_value_edit = saves_value_edit
 
+        saves_layout = QHBoxLayout()
+        layout.addLayout(saves_layout, 3, 2)
+
         saves_warning_label = QLabel()
         icon = QApplication.style().standardIcon(QStyle.SP_MessageBoxWarning)
         saves_warning_label.setPixmap(icon.pixmap(16, 16))
         saves_warning_label.hide()
-        layout.addWidget(saves_warning_label, 3, 2)
+        saves_layout.addWidget(saves_warning_label)
         self.saves_warning_label = saves_warning_label
 
+        saves_details_button = QToolButton()
+        saves_details_button.setEnabled(False)
+        saves_details_button.clicked.connect(self.show_saves_details)
+        saves_layout.addWidget(saves_details_button)
+        self.saves_details_button = saves_details_button
+
         buttons_container = QWidget()
         buttons_layout = QGridLayout()
         buttons_layout.setContentsMargins(0, 0, 0, 0)
@@ -212,6 +304,12 @@ class GameDirGroupBox(QGroupBox):
             'enough to cause significant delays during the update process.\n'
             'You might want to enable the "Do not copy or move the save '
             'directory" option in the settings tab.'))
+        self.saves_details_button.setText(_('Details'))
+        self.saves_details_button.setToolTip(_('Show which worlds and '
+            'directories take the most space in the save directory'))
+        self.verify_button.setText(_('Verify'))
+        self.verify_button.setToolTip(_('Read the game executable again to '
+            'verify its version and build'))
         self.launch_game_button.setText(_('Launch game'))
         self.restore_button.setText(_('Restore previous version'))
         self.setTitle(_('Game'))
@@ -248,8 +346,49 @@ class GameDirGroupBox(QGroupBox):
 
             self.game_directory_changed()
 
+            self.preanalyse_game_dirs()
+
+            # Resume deleting what was left in the trash by the last launch
+            main_tab = self.get_main_tab()
+            main_tab.reap_trash(
+                json.loads(get_config_value('game_directories', '[]')))
+
         self.shown = True
 
+    def preanalyse_game_dirs(self):
+        """Warm the analysis and fingerprint caches of the other remembered
+        game directories in the background.
+        """
+        current_dir = self.dir_combo.currentText()
+        game_dirs = [game_dir for game_dir in
+            json.loads(get_config_value('game_directories', '[]'))
+            if game_dir != current_dir and os.path.isdir(game_dir)]
+        if len(game_dirs) == 0:
+            return
+
+        fingerprint_dirs = set()
+        for game_dir in game_dirs:
+            exe_path = find_executable(game_dir)
+            if exe_path is None:
+                continue
+            try:
+                key = fingerprint_key(exe_path)
+            except OSError:
+                # The executable went away since it was found
+                continue
+            if get_exe_fingerprint(*key) is None:
+                fingerprint_dirs.add(game_dir)
+
+        analysis_thread = GameDirsAnalysisThread(game_dirs, fingerprint_dirs)
+        analysis_thread.analysed.connect(self.game_dir_analysed)
+        analysis_thread.start()
+
+        self.game_dirs_analysis_thread = analysis_thread
+
+    def game_dir_analysed(self, game_dir, fingerprint):
+        if fingerprint is not None:
+            set_exe_fingerprint(*fingerprint)
+
     def set_dir_combo_value(self, value):
         dir_model = self.dir_combo.model()
 
@@ -268,6 +407,7 @@ class GameDirGroupBox(QGroupBox):
         self.dir_combo.setEnabled(False)
         self.dir_change_button.setEnabled(False)
 
+        self.verify_button.setEnabled(False)
         self.launch_game_button.setEnabled(False)
         self.restore_button.setEnabled(False)
 
@@ -275,8 +415,9 @@ class GameDirGroupBox(QGroupBox):
         self.dir_combo.setEnabled(True)
         self.dir_change_button.setEnabled(True)
 
-        self.launch_game_button.setEnabled(
-            self.exe_path is not None and os.path.isfile(self.exe_path))
+        exe_found = self.exe_path is not None and os.path.isfile(self.exe_path)
+        self.verify_button.setEnabled(exe_found)
+        self.launch_game_button.setEnabled(exe_found)
 
         directory = self.dir_combo.currentText()
         previous_version_dir = os.path.join(directory, 'previous_version')
@@ -296,38 +437,24 @@ class GameDirGroupBox(QGroupBox):
             previous_version_dir = os.path.join(game_dir, 'previous_version')
 
             if os.path.isdir(previous_version_dir) and os.path.isdir(game_dir):
+                # Swap the current game and previous_version with renames
+                # through the staging directory
+                swap_dir = staging_dir_for(game_dir)
+                if os.path.exists(swap_dir):
+                    delete_path(swap_dir)
+                os.makedirs(swap_dir)
 
-                with tempfile.TemporaryDirectory(prefix=cons.TEMP_PREFIX
-                    ) as temp_move_dir:
-
-                    excluded_entries = set(['previous_version'])
-                    if config_true(get_config_value('prevent_save_move',
-                        'False')):
-                        excluded_entries.add('save')
-
-                    # Prevent moving the launcher if it's in the game directory
-                    if getattr(sys, 'frozen', False):
-                        launcher_exe = os.path.abspath(sys.executable)
-                        launcher_dir = os.path.dirname(launcher_exe)
-                        if os.path.abspath(game_dir) == launcher_dir:
-                            excluded_entries.add(os.path.basename(launcher_exe))
-
-                    for entry in os.listdir(game_dir):
-                        if entry not in excluded_entries:
-                            entry_path = os.path.join(game_dir, entry)
-                            shutil.move(entry_path, temp_move_dir)
-
-                    excluded_entries = set()
-                    if config_true(get_config_value('prevent_save_move', 'False')):
-                        excluded_entries.add('save')
-                    for entry in os.listdir(previous_version_dir):
-                        if entry not in excluded_entries:
-                            entry_path = os.path.join(previous_version_dir, entry)
-                            shutil.move(entry_path, game_dir)
-
-                    for entry in os.listdir(temp_move_dir):
-                        entry_path = os.path.join(temp_move_dir, entry)
-                        shutil.move(entry_path, previous_version_dir)
+                self.release_saves()
+
+                swap_entries(game_dir, previous_version_dir, swap_dir,
+                    swap_exclusions(game_dir))
+
+                # Entries kept in previous_version stay there
+                for entry in os.listdir(previous_version_dir):
+                    os.rename(os.path.join(previous_version_dir, entry),
+                        os.path.join(swap_dir, entry))
+                os.rmdir(previous_version_dir)
+                os.rename(swap_dir, previous_version_dir)
 
                 self.restored_previous = True
         except OSError as e:
@@ -366,8 +493,7 @@ class GameDirGroupBox(QGroupBox):
 
             backups_tab.prune_auto_backups()
 
-            name = '{auto}_{name}'.format(auto=_('auto'),
-                name=_('before_launch'))
+            name = auto_backup_name(_('auto'), _('before_launch'))
 
             backups_tab.after_backup = self.launch_game_process
             backups_tab.backup_saves(name)
@@ -510,13 +636,12 @@ antivirus whitelist or select the action to trust this binary when detected.</p>
 
         self.get_main_window().setWindowState(Qt.WindowActive)
 
-        self.update_saves()
+        self.update_saves(use_cache=False)
 
         if config_true(get_config_value('backup_on_end', 'False')):
             backups_tab.prune_auto_backups()
 
-            name = '{auto}_{name}'.format(auto=_('auto'),
-                name=_('after_end'))
+            name = auto_backup_name(_('auto'), _('after_end'))
 
             backups_tab.backup_saves(name)
 
@@ -593,6 +718,12 @@ antivirus whitelist or select the action to trust this binary when detected.</p>
 
         self.exe_path = None
 
+        if self.last_game_directory != directory:
+            # Do not let a scan of the previous directory finish in this one
+            self.stop_exe_reading()
+            self.saves_watcher.stop()
+            self.saves_details_button.setEnabled(False)
+
         main_tab = self.get_main_tab()
         update_group_box = main_tab.update_group_box
 
@@ -658,6 +789,7 @@ antivirus whitelist or select the action to trust this binary when detected.</p>
                     self.update_backups()
 
         if self.exe_path is None:
+            self.verify_button.setEnabled(False)
             self.launch_game_button.setEnabled(False)
             update_group_box.update_button.setText(_('Install game'))
             update_group_box.update_button.setEnabled(dir_state != 'critical')
@@ -671,6 +803,7 @@ antivirus whitelist or select the action to trust this binary when detected.</p>
             self.clear_mods()
             self.clear_backups()
         else:
+            self.verify_button.setEnabled(True)
             self.launch_game_button.setEnabled(True)
             update_group_box.update_button.setText(_('Update game'))
             update_group_box.update_button.setEnabled(dir_state == 'ok')
@@ -685,141 +818,169 @@ antivirus whitelist or select the action to trust this binary when detected.</p>
     def app_locale(self):
         return QApplication.instance().app_locale
 
-    def update_version(self):
+    def update_version(self, verify=False):
+        fingerprint = None
+        if not verify:
+            try:
+                fingerprint = get_exe_fingerprint(*fingerprint_key(
+                    self.exe_path))
+            except OSError:
+                fingerprint = None
+
+        if fingerprint is not None:
+            self.stop_exe_reading()
+            self.show_version(fingerprint['sha256'], fingerprint['version'])
+        else:
+            self.start_exe_reading(self.update_version_completed,
+                self.update_version_failed)
+
+    def verify_version(self):
+        if self.exe_path is not None and os.path.isfile(self.exe_path):
+            self.version_value_label.setText(_('Analyzing...'))
+            self.update_version(verify=True)
+
+    def update_version_completed(self, sha256, game_version):
+        self.store_exe_fingerprint(sha256, game_version)
+        self.exe_reading_finished()
+
+        self.show_version(sha256, game_version)
+
+    def store_exe_fingerprint(self, sha256, game_version):
+        path, identity = self.exe_reading_thread.key
+        set_exe_fingerprint(path, identity, sha256, game_version)
+
+    def show_version(self, sha256, game_version):
         main_window = self.get_main_window()
         status_bar = main_window.statusBar()
 
-        if (self.exe_reading_timer is not None
-            and self.exe_reading_timer.isActive()):
-            self.exe_reading_timer.stop()
+        if status_bar.busy == 0 and not self.game_started:
+            if self.restored_previous:
+                status_bar.showMessage(
+                    _('Previous version restored'))
+            else:
+                status_bar.showMessage(_('Ready'))
 
-            status_bar = main_window.statusBar()
-            status_bar.removeWidget(self.reading_label)
-            status_bar.removeWidget(self.reading_progress_bar)
+        if status_bar.busy == 0 and self.game_started:
+            status_bar.showMessage(_('Game process is running'))
 
-            status_bar.busy -= 1
+        self.game_version = game_version
 
-        status_bar.clearMessage()
-        status_bar.busy += 1
+        stable_version = cons.STABLE_SHA256.get(sha256, None)
+        is_stable = stable_version is not None
 
-        reading_label = QLabel()
-        reading_label.setText(_('Reading: {0}').format(self.exe_path))
-        status_bar.addWidget(reading_label, 100)
-        self.reading_label = reading_label
+        if is_stable:
+            self.game_version = stable_version
 
-        progress_bar = QProgressBar()
-        status_bar.addWidget(progress_bar)
-        self.reading_progress_bar = progress_bar
+        if self.game_version == '':
+            self.game_version = _('Unknown')
+        else:
+            self.add_game_dir()
 
-        timer = QTimer(self)
-        self.exe_reading_timer = timer
+        self.version_value_label.setText(
+            '{version} ({type})'
+            .format(version=self.game_version, type=self.version_type)
+        )
 
-        exe_size = os.path.getsize(self.exe_path)
+        new_version(self.game_version, sha256, is_stable)
 
-        progress_bar.setRange(0, exe_size)
-        self.exe_total_read = 0
+        build = get_build_from_sha256(sha256)
 
-        self.exe_sha256 = hashlib.sha256()
-        self.last_bytes = None
-        self.game_version = ''
-        self.opened_exe = open(self.exe_path, 'rb')
+        if build is not None:
+            build_date = arrow.get(build['released_on'], 'UTC')
+            human_delta = build_date.humanize(arrow.utcnow(), locale=self.app_locale)
+            self.build_value_label.setText(
+                '{build} ({time_delta})'
+                .format(build=build['build'], time_delta=human_delta)
+            )
+            self.current_build = build['build']
 
-        def timeout():
-            bytes = self.opened_exe.read(cons.READ_BUFFER_SIZE)
-            if len(bytes) == 0:
-                self.opened_exe.close()
-                self.exe_reading_timer.stop()
-                main_window = self.get_main_window()
-                status_bar = main_window.statusBar()
+            main_tab = self.get_main_tab()
+            update_group_box = main_tab.update_group_box
 
-                status_bar.removeWidget(self.reading_label)
-                status_bar.removeWidget(self.reading_progress_bar)
+            if (update_group_box.builds is not None
+                    and len(update_group_box.builds) > 0
+                    and status_bar.busy == 0
+                    and not self.game_started):
+                last_build = update_group_box.builds[0]
 
-                status_bar.busy -= 1
-                if status_bar.busy == 0 and not self.game_started:
-                    if self.restored_previous:
-                        status_bar.showMessage(
-                            _('Previous version restored'))
-                    else:
-                        status_bar.showMessage(_('Ready'))
+                message = status_bar.currentMessage()
+                if message != '':
+                    message = message + ' - '
 
-                if status_bar.busy == 0 and self.game_started:
-                    status_bar.showMessage(_('Game process is running'))
+                if last_build['number'] == self.current_build:
+                    message = message + _('Your game is up to date')
+                else:
+                    message = message + _('There is a new update available')
+                status_bar.showMessage(message)
 
-                sha256 = self.exe_sha256.hexdigest()
+            update_group_box.prefetch_build()
 
-                stable_version = cons.STABLE_SHA256.get(sha256, None)
-                is_stable = stable_version is not None
+        else:
+            self.build_value_label.setText(_('Unknown'))
+            self.current_build = None
 
-                if is_stable:
-                    self.game_version = stable_version
-                
-                if self.game_version == '':
-                    self.game_version = _('Unknown')
-                else:
-                    self.add_game_dir()
+    def update_version_failed(self, error):
+        self.exe_reading_finished()
 
-                self.version_value_label.setText(
-                    '{version} ({type})'
-                    .format(version=self.game_version, type=self.version_type)
-                )
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
+
+        self.version_value_label.setText(_('Unknown'))
+        self.build_value_label.setText(_('Unknown'))
+        self.current_build = None
 
-                new_version(self.game_version, sha256, is_stable)
+        status_bar.showMessage(error)
 
-                build = get_build_from_sha256(sha256)
+    def start_exe_reading(self, completed, failed):
+        self.stop_exe_reading()
 
-                if build is not None:
-                    build_date = arrow.get(build['released_on'], 'UTC')
-                    human_delta = build_date.humanize(arrow.utcnow(), locale=self.app_locale)
-                    self.build_value_label.setText(
-                        '{build} ({time_delta})'
-                        .format(build=build['build'], time_delta=human_delta)
-                    )
-                    self.current_build = build['build']
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
+
+        status_bar.clearMessage()
+        status_bar.busy += 1
+
+        reading_label = QLabel()
+        reading_label.setText(_('Reading: {0}').format(self.exe_path))
+        status_bar.addWidget(reading_label, 100)
+        self.reading_label = reading_label
+
+        progress_bar = QProgressBar()
+        status_bar.addWidget(progress_bar)
+        self.reading_progress_bar = progress_bar
 
-                    main_tab = self.get_main_tab()
-                    update_group_box = main_tab.update_group_box
+        progress_bar.setRange(0, os.path.getsize(self.exe_path))
 
-                    if (update_group_box.builds is not None
-                            and len(update_group_box.builds) > 0
-                            and status_bar.busy == 0
-                            and not self.game_started):
-                        last_build = update_group_box.builds[0]
+        reading_thread = ExeFingerprintThread(self.exe_path)
+        reading_thread.progress.connect(self.reading_progress_bar.setValue)
+        reading_thread.completed.connect(completed)
+        reading_thread.failed.connect(failed)
+        self.exe_reading_thread = reading_thread
+        reading_thread.start()
 
-                        message = status_bar.currentMessage()
-                        if message != '':
-                            message = message + ' - '
+    def exe_reading_finished(self):
+        self.exe_reading_thread = None
+
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
 
-                        if last_build['number'] == self.current_build:
-                            message = message + _('Your game is up to date')
-                        else:
-                            message = message + _('There is a new update available')
-                        status_bar.showMessage(message)
+        status_bar.removeWidget(self.reading_label)
+        status_bar.removeWidget(self.reading_progress_bar)
 
-                else:
-                    self.build_value_label.setText(_('Unknown'))
-                    self.current_build = None
+        status_bar.busy -= 1
 
-            else:
-                last_frame = bytes
-                if self.last_bytes is not None:
-                    last_frame = self.last_bytes + last_frame
-
-                match = re.search(
-                    b'(?P<version>[01]\\.[A-F](-\\d+-g[0-9a-f]+)?)\\x00',
-                    last_frame)
-                if match is not None:
-                    game_version = match.group('version').decode('ascii')
-                    if len(game_version) > len(self.game_version):
-                        self.game_version = game_version
-
-                self.exe_total_read += len(bytes)
-                self.reading_progress_bar.setValue(self.exe_total_read)
-                self.exe_sha256.update(bytes)
-                self.last_bytes = bytes
-
-        timer.timeout.connect(timeout)
-        timer.start(0)
+    def stop_exe_reading(self):
+        reading_thread = self.exe_reading_thread
+        if reading_thread is None:
+            return
+
+        # Results from a cancelled reading must never reach the labels
+        reading_thread.progress.disconnect()
+        reading_thread.completed.disconnect()
+        reading_thread.failed.disconnect()
+        reading_thread.cancel()
+
+        self.exe_reading_finished()
 
     def check_running_process(self, exe_path):
         pid = process_id_from_path(exe_path)
@@ -888,13 +1049,12 @@ antivirus whitelist or select the action to trust this binary when detected.</p>
 
                 self.get_main_window().setWindowState(Qt.WindowActive)
 
-                self.update_saves()
+                self.update_saves(use_cache=False)
 
                 if config_true(get_config_value('backup_on_end', 'False')):
                     backups_tab.prune_auto_backups()
 
-                    name = '{auto}_{name}'.format(auto=_('auto'),
-                        name=_('after_end'))
+                    name = auto_backup_name(_('auto'), _('after_end'))
 
                     backups_tab.backup_saves(name)
 
@@ -922,99 +1082,160 @@ antivirus whitelist or select the action to trust this binary when detected.</p>
 
         set_config_value('game_directories', json.dumps(game_dirs))
 
-    def update_saves(self):
+    def update_saves(self, use_cache=True):
         self.game_dir = self.dir_combo.currentText()
 
-        if (self.update_saves_timer is not None and self.update_saves_timer.isActive()):
-            self.update_saves_timer.stop()
+        save_dir = os.path.join(self.game_dir, 'save')
+        if self.saves_watcher.is_watching(save_dir):
+            # The summary is kept current by the watcher
+            self.saves_watcher.flush()
+            return
+
+        self.saves_watcher.stop()
+        self.saves_details_button.setEnabled(False)
+
+        if self.saves_census_thread is not None:
+            self.stop_saves_census()
             self.saves_value_edit.setText(_('Unknown'))
 
-        save_dir = os.path.join(self.game_dir, 'save')
+        cached = False
+        if use_cache:
+            summary = analysis_cache.get('saves', self.game_dir)
+            if summary is not None:
+                # The census still runs to index the save tree for the
+                # watcher and the details
+                self.show_saves_summary(summary)
+                self.check_saves_size()
+                cached = True
+
         if not os.path.isdir(save_dir):
+            self.show_saves_summary({
+                'size': 0,
+                'worlds': 0,
+                'characters': 0
+            })
+            self.check_saves_size()
+            return
+
+        index_key = os.path.normcase(os.path.abspath(save_dir))
+        saves_census_thread = SavesCensusThread(self.game_dir, index_key,
+            get_saves_index(index_key), report_partial=not cached)
+        saves_census_thread.progress.connect(self.show_saves_summary)
+        saves_census_thread.completed.connect(self.saves_census_completed)
+        saves_census_thread.failed.connect(self.saves_census_failed)
+        saves_census_thread.start()
+
+        self.saves_census_thread = saves_census_thread
+
+    def release_saves(self):
+        """Stop watching and counting the save tree before it is renamed.
+        Open watches can make the rename fail and the watcher would follow
+        the renamed tree. update_saves() starts again on the tree in place.
+        """
+        self.saves_watcher.stop()
+        self.saves_details_button.setEnabled(False)
+
+        if self.saves_census_thread is not None:
+            self.stop_saves_census()
+
+    def saves_census_completed(self, summary):
+        saves_census_thread = self.saves_census_thread
+        self.saves_census_thread = None
+
+        analysis_cache.put('saves', saves_census_thread.game_dir,
+            saves_census_thread.signature, summary)
+
+        if (len(saves_census_thread.updated) > 0 or
+            len(saves_census_thread.removed) > 0):
+            update_saves_index(saves_census_thread.index_key,
+                saves_census_thread.updated, saves_census_thread.removed)
+
+        self.show_saves_summary(summary)
+        self.check_saves_size()
+
+        index = saves_census_thread.index
+        for path in saves_census_thread.removed:
+            del index[path]
+        index.update(saves_census_thread.updated)
+
+        self.saves_watcher.start(saves_census_thread.game_dir,
+            saves_census_thread.index_key, index, summary)
+        self.saves_details_button.setEnabled(True)
+
+    def show_saves_details(self):
+        index = self.saves_watcher.index
+        if len(index) == 0:
+            # The save directory was removed since the census
+            self.saves_details_button.setEnabled(False)
+            return
+
+        saves_dialog = SavesBreakdownDialog(saves_breakdown(index),
+            heavy_directories(index, cons.SAVES_HEAVY_DIRECTORIES), self,
+            Qt.WindowTitleHint | Qt.WindowCloseButtonHint)
+        saves_dialog.exec()
+
+    def saves_watcher_changed(self, summary, updated, removed):
+        saves_watcher = self.saves_watcher
+
+        update_saves_index(saves_watcher.index_key, updated, removed)
+        analysis_cache.put('saves', saves_watcher.game_dir,
+            directory_signature(saves_watcher.game_dir, 'saves'), summary)
+
+        self.show_saves_summary(summary)
+        self.check_saves_size()
+
+    def saves_census_failed(self, error):
+        self.saves_census_thread = None
+
+        logger.warning(error)
+        self.saves_value_edit.setText(_('Unknown'))
+
+    def stop_saves_census(self):
+        saves_census_thread = self.saves_census_thread
+        self.saves_census_thread = None
+
+        saves_census_thread.progress.disconnect()
+        saves_census_thread.completed.disconnect()
+        saves_census_thread.failed.disconnect()
+        saves_census_thread.cancel()
+
+    def show_saves_summary(self, summary):
+        self.saves_size = summary['size']
+        self.saves_worlds = summary['worlds']
+        self.saves_characters = summary['characters']
+
+        if self.saves_worlds == 0 and self.saves_characters == 0:
             self.saves_value_edit.setText(
                 '{world_count} {worlds} - {character_count} {characters}'
-                    .format(
+                .format(
                     world_count=0,
                     character_count=0,
                     worlds=ngettext('World', 'Worlds', 0),
                     characters=ngettext('Character', 'Characters', 0)
                 )
             )
-            return
-
-        timer = QTimer(self)
-        self.update_saves_timer = timer
-
-        self.saves_size = 0
-        self.saves_worlds = 0
-        self.saves_characters = 0
-        self.world_dirs = set()
-
-        self.saves_scan = scandir(save_dir)
-        self.next_scans = []
-        self.save_dir = save_dir
-
-        def timeout():
-            try:
-                entry = next(self.saves_scan)
-                if entry.is_dir():
-                    self.next_scans.append(entry.path)
-                elif entry.is_file():
-                    self.saves_size += entry.stat().st_size
-
-                    if entry.name.endswith('.sav'):
-                        world_dir = os.path.dirname(entry.path)
-                        if self.save_dir == os.path.dirname(world_dir):
-                            self.saves_characters += 1
-
-                    if entry.name in cons.WORLD_FILES:
-                        world_dir = os.path.dirname(entry.path)
-                        if (world_dir not in self.world_dirs
-                                and self.save_dir == os.path.dirname(world_dir)):
-                            self.world_dirs.add(world_dir)
-                            self.saves_worlds += 1
-
-                worlds_text = ngettext('World', 'Worlds', self.saves_worlds)
-                characters_text = ngettext('Character', 'Characters',self.saves_characters)
-                self.saves_value_edit.setText(
-                    '{world_count} {worlds} - {character_count} {characters} ({size})'
-                    .format(
-                        world_count=self.saves_worlds,
-                        character_count=self.saves_characters,
-                        size=sizeof_fmt(self.saves_size),
-                        worlds=worlds_text,
-                        characters=characters_text
-                    )
+        else:
+            worlds_text = ngettext('World', 'Worlds', self.saves_worlds)
+            characters_text = ngettext('Character', 'Characters',
+                self.saves_characters)
+            self.saves_value_edit.setText(
+                '{world_count} {worlds} - {character_count} {characters} ({size})'
+                .format(
+                    world_count=self.saves_worlds,
+                    character_count=self.saves_characters,
+                    size=sizeof_fmt(self.saves_size),
+                    worlds=worlds_text,
+                    characters=characters_text
                 )
-            except StopIteration:
-                if len(self.next_scans) > 0:
-                    self.saves_scan = scandir(self.next_scans.pop())
-                else:
-                    # End of the tree
-                    self.update_saves_timer.stop()
-                    self.update_saves_timer = None
-
-                    # no more path to scan but still 0 chars/worlds
-                    if self.saves_worlds == 0 and self.saves_characters == 0:
-                        self.saves_value_edit.setText(
-                            '{world_count} {worlds} - {character_count} {characters}'
-                            .format(
-                                world_count=0,
-                                character_count=0,
-                                worlds=ngettext('World', 'Worlds', 0),
-                                characters=ngettext('Character', 'Characters', 0)
-                            )
-                        )
-
-                    # Warning about saves size
-                    if (self.saves_size > cons.SAVES_WARNING_SIZE and
-                        not config_true(get_config_value('prevent_save_move', 'False'))):
-                        self.saves_warning_label.show()
-                    else:
-                        self.saves_warning_label.hide()
+            )
 
-        timer.timeout.connect(timeout)
-        timer.start(0)
+    def check_saves_size(self):
+        # Warning about saves size
+        if (self.saves_size > cons.SAVES_WARNING_SIZE and
+            not config_true(get_config_value('prevent_save_move', 'False'))):
+            self.saves_warning_label.show()
+        else:
+            self.saves_warning_label.hide()
 
     def analyse_new_build(self, build):
         game_dir = self.dir_combo.currentText()
@@ -1051,115 +1272,86 @@ antivirus whitelist or select the action to trust this binary when detected.</p>
                 'archive. You might want to restore your previous version.'))
 
         else:
-            if (self.exe_reading_timer is not None
-                and self.exe_reading_timer.isActive()):
-                self.exe_reading_timer.stop()
-
-                main_window = self.get_main_window()
-                status_bar = main_window.statusBar()
-                status_bar.removeWidget(self.reading_label)
-                status_bar.removeWidget(self.reading_progress_bar)
-
-                status_bar.busy -= 1
-
             self.exe_path = exe_path
             self.version_type = version_type
             self.build_number = build['number']
             self.build_date = build['date']
 
-            main_window = self.get_main_window()
-
-            status_bar = main_window.statusBar()
-            status_bar.clearMessage()
-
-            status_bar.busy += 1
+            main_tab = self.get_main_tab()
+            update_group_box = main_tab.update_group_box
 
-            reading_label = QLabel()
-            reading_label.setText(_('Reading: {0}').format(self.exe_path))
-            status_bar.addWidget(reading_label, 100)
-            self.reading_label = reading_label
+            fingerprint = update_group_box.extracted_fingerprints.get(
+                os.path.basename(exe_path))
+            if fingerprint is None:
+                # An executable reused from the previous version keeps its
+                # cached fingerprint
+                cached = get_exe_fingerprint(*fingerprint_key(exe_path))
+                if cached is not None:
+                    fingerprint = cached['sha256'], cached['version']
+            if fingerprint is not None:
+                self.stop_exe_reading()
+
+                sha256, game_version = fingerprint
+                set_exe_fingerprint(*fingerprint_key(exe_path), sha256,
+                    game_version)
+                self.show_new_build(sha256, game_version)
+            else:
+                self.start_exe_reading(self.analyse_new_build_completed,
+                    self.analyse_new_build_failed)
 
-            progress_bar = QProgressBar()
-            status_bar.addWidget(progress_bar)
-            self.reading_progress_bar = progress_bar
-
-            timer = QTimer(self)
-            self.exe_reading_timer = timer
-
-            exe_size = os.path.getsize(self.exe_path)
-
-            progress_bar.setRange(0, exe_size)
-            self.exe_total_read = 0
-
-            self.exe_sha256 = hashlib.sha256()
-            self.last_bytes = None
-            self.game_version = ''
-            self.opened_exe = open(self.exe_path, 'rb')
-
-            def timeout():
-                bytes = self.opened_exe.read(cons.READ_BUFFER_SIZE)
-                if len(bytes) == 0:
-                    self.opened_exe.close()
-                    self.exe_reading_timer.stop()
-                    main_window = self.get_main_window()
-                    status_bar = main_window.statusBar()
-
-                    build_date = arrow.get(self.build_date, 'UTC')
-                    human_delta = build_date.humanize(arrow.utcnow(), locale=self.app_locale)
-                    self.build_value_label.setText(
-                        '{build} ({time_delta})'
-                        .format(build=self.build_number, time_delta=human_delta)
-                    )
-                    self.current_build = self.build_number
+    def analyse_new_build_completed(self, sha256, game_version):
+        self.store_exe_fingerprint(sha256, game_version)
+        self.exe_reading_finished()
 
-                    status_bar.removeWidget(self.reading_label)
-                    status_bar.removeWidget(self.reading_progress_bar)
+        self.show_new_build(sha256, game_version)
 
-                    status_bar.busy -= 1
+    def show_new_build(self, sha256, game_version):
+        build_date = arrow.get(self.build_date, 'UTC')
+        human_delta = build_date.humanize(arrow.utcnow(), locale=self.app_locale)
+        self.build_value_label.setText(
+            '{build} ({time_delta})'
+            .format(build=self.build_number, time_delta=human_delta)
+        )
+        self.current_build = self.build_number
 
-                    sha256 = self.exe_sha256.hexdigest()
+        self.game_version = game_version
 
-                    stable_version = cons.STABLE_SHA256.get(sha256, None)
-                    is_stable = stable_version is not None
+        stable_version = cons.STABLE_SHA256.get(sha256, None)
+        is_stable = stable_version is not None
 
-                    if is_stable:
-                        self.game_version = stable_version
+        if is_stable:
+            self.game_version = stable_version
 
-                    if self.game_version == '':
-                        self.game_version = _('Unknown')
-                    self.version_value_label.setText(
-                        '{version} ({type})'
-                        .format(version=self.game_version, type=self.version_type)
-                    )
+        if self.game_version == '':
+            self.game_version = _('Unknown')
+        self.version_value_label.setText(
+            '{version} ({type})'
+            .format(version=self.game_version, type=self.version_type)
+        )
 
-                    new_build(self.game_version, sha256, is_stable, self.build_number,
-                        self.build_date)
+        new_build(self.game_version, sha256, is_stable, self.build_number,
+            self.build_date)
 
-                    main_tab = self.get_main_tab()
-                    update_group_box = main_tab.update_group_box
+        main_tab = self.get_main_tab()
+        update_group_box = main_tab.update_group_box
 
-                    update_group_box.post_extraction()
+        update_group_box.post_extraction()
 
-                else:
-                    last_frame = bytes
-                    if self.last_bytes is not None:
-                        last_frame = self.last_bytes + last_frame
+    def analyse_new_build_failed(self, error):
+        self.exe_reading_finished()
 
-                    match = re.search(
-                        b'(?P<version>[01]\\.[A-F](-\\d+-g[0-9a-f]+)?)\\x00',
-                        last_frame)
-                    if match is not None:
-                        game_version = match.group('version').decode('ascii')
-                        if len(game_version) > len(self.game_version):
-                            self.game_version = game_version
+        self.version_value_label.setText(_('Unknown'))
+        self.build_value_label.setText(_('Unknown'))
+        self.current_build = None
 
-                    self.exe_total_read += len(bytes)
-                    self.reading_progress_bar.setValue(self.exe_total_read)
-                    self.exe_sha256.update(bytes)
-                    self.last_bytes = bytes
+        main_tab = self.get_main_tab()
+        update_group_box = main_tab.update_group_box
+        update_group_box.analysing_new_build = False
+        update_group_box.finish_updating()
 
-            timer.timeout.connect(timeout)
-            timer.start(0)
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
+        status_bar.showMessage(error)
 
 
 class UpdateGroupBox(QGroupBox):
@@ -1172,6 +1364,20 @@ class UpdateGroupBox(QGroupBox):
         self.builds = []
         self.progress_rmtree = None
         self.progress_copy = None
+        self.carry_over_thread = None
+        self.carried_over_dirs = []
+        self.update_spans = None
+        self.update_outcome = None
+        self.extracted_fingerprints = {}
+        self.plan_update_thread = None
+        self.prefetch_thread = None
+        self.download_thread = None
+        self.stopped_download_thread = None
+        self.download_dir = None
+        self.build_store = None
+        self.stored_archive = None
+        self.staging_dir = None
+        self.extracting_thread = None
 
         self.qnam = QNetworkAccessManager()
         self.http_reply = None
@@ -1387,29 +1593,21 @@ class UpdateGroupBox(QGroupBox):
                     game_dir = subdir
                     game_dir_group_box.set_dir_combo_value(subdir)
 
-            if config_true(get_config_value('backup_before_update', 'False')):
-                backups_tab = main_tab.get_backups_tab()
-
-                backups_tab.prune_auto_backups()
+            # The update downloads where the build is being prefetched
+            self.stop_prefetch()
 
-                name = '{auto}_{name}'.format(auto=_('auto'),
-                    name=_('before_update'))
-
-                backups_tab.after_backup = self.update_game_process
-                backups_tab.backup_saves(name)
-            else:
-                self.update_game_process()
+            self.plan_update(game_dir)
 
         else:
             # We are currently updating, try to cancel
+            self.update_outcome = 'cancelled'
 
             main_tab = self.get_main_tab()
             game_dir_group_box = main_tab.game_dir_group_box
 
             # Are we downloading the file?
-            if self.download_http_reply.isRunning():
-                self.download_aborted = True
-                self.download_http_reply.abort()
+            if self.download_thread is not None:
+                self.stop_download()
 
                 main_window = self.get_main_window()
 
@@ -1424,48 +1622,13 @@ class UpdateGroupBox(QGroupBox):
             elif self.clearing_previous_dir:
                 if self.progress_rmtree is not None:
                     self.progress_rmtree.stop()
-            elif self.backing_up_game:
-                self.backup_timer.stop()
-
-                main_window = self.get_main_window()
-                status_bar = main_window.statusBar()
-
-                status_bar.removeWidget(self.backup_label)
-                status_bar.removeWidget(self.backup_progress_bar)
-
-                status_bar.busy -= 1
-
-                self.restore_backup()
-
-                if game_dir_group_box.exe_path is not None:
-                    if status_bar.busy == 0:
-                        status_bar.showMessage(_('Update cancelled'))
-                else:
-                    if status_bar.busy == 0:
-                        status_bar.showMessage(_('Installation cancelled'))
-
             elif self.extracting_new_build:
-                self.extracting_timer.stop()
+                self.stop_extraction()
 
                 main_window = self.get_main_window()
                 status_bar = main_window.statusBar()
 
-                status_bar.removeWidget(self.extracting_label)
-                status_bar.removeWidget(self.extracting_progress_bar)
-
-                status_bar.busy -= 1
-
-                self.extracting_zipfile.close()
-
-                download_dir = os.path.dirname(self.downloaded_file)
-                delete_path(download_dir)
-
-                path = self.clean_game_dir()
-                self.restore_backup()
-                self.restore_previous_content(path)
-
-                if path is not None:
-                    delete_path(path)
+                self.delete_download_dir()
 
                 if game_dir_group_box.exe_path is not None:
                     if status_bar.busy == 0:
@@ -1474,23 +1637,12 @@ class UpdateGroupBox(QGroupBox):
                     if status_bar.busy == 0:
                         status_bar.showMessage(_('Installation cancelled'))
             elif self.analysing_new_build:
-                game_dir_group_box.opened_exe.close()
-                game_dir_group_box.exe_reading_timer.stop()
+                game_dir_group_box.stop_exe_reading()
 
                 main_window = self.get_main_window()
                 status_bar = main_window.statusBar()
 
-                status_bar.removeWidget(game_dir_group_box.reading_label)
-                status_bar.removeWidget(game_dir_group_box.reading_progress_bar)
-
-                status_bar.busy -= 1
-
-                path = self.clean_game_dir()
-                self.restore_backup()
-                self.restore_previous_content(path)
-
-                if path is not None:
-                    delete_path(path)
+                self.rollback_new_build()
 
                 if game_dir_group_box.exe_path is not None:
                     if status_bar.busy == 0:
@@ -1501,6 +1653,8 @@ class UpdateGroupBox(QGroupBox):
             elif self.in_post_extraction:
                 self.in_post_extraction = False
 
+                if self.carry_over_thread is not None:
+                    self.stop_carry_over()
                 if self.progress_copy is not None:
                     self.progress_copy.stop()
 
@@ -1508,12 +1662,8 @@ class UpdateGroupBox(QGroupBox):
                 status_bar = main_window.statusBar()
                 status_bar.clearMessage()
 
-                path = self.clean_game_dir()
-                self.restore_backup()
-                self.restore_previous_content(path)
-
-                if path is not None:
-                    delete_path(path)
+                self.restore_carried_over_dirs()
+                self.rollback_new_build()
 
                 if game_dir_group_box.exe_path is not None:
                     if status_bar.busy == 0:
@@ -1524,148 +1674,360 @@ class UpdateGroupBox(QGroupBox):
 
             self.finish_updating()
 
-    def update_game_process(self):
+    def plan_update(self, game_dir):
+        """Check the disk space needed by the update on a thread before
+        anything is written. The update starts when the plan allows it.
+        """
         main_tab = self.get_main_tab()
         game_dir_group_box = main_tab.game_dir_group_box
-        game_dir = game_dir_group_box.dir_combo.currentText()
-        
-        logger.info(
-            'Updating CDDA...\n'
-            'CDDAGL Directory: {}\n'
-            'CDDA Directory: {}'
-            .format(get_cddagl_path(), game_dir)
-        )
-
-        self.updating = True
-        self.download_aborted = False
-        self.clearing_previous_dir = False
-        self.backing_up_game = False
-        self.extracting_new_build = False
-        self.analysing_new_build = False
-        self.in_post_extraction = False
 
-        self.selected_build = self.builds[self.builds_combo.currentIndex()]
+        build = self.builds[self.builds_combo.currentIndex()]
+        url = build['url']
+        file_name = QFileInfo(QUrl(url).path()).fileName()
 
-        selected_branch = self.branch_button_group.checkedButton()
-        experimental_selected = selected_branch is self.experimental_radio_button
+        # Only renames are left when the build was extracted in advance
+        prefetched = prefetched_build(game_dir, build)
+        if prefetched is not None and prefetched['staged_dir'] is not None:
+            self.start_update()
+            return
 
-        latest_build = self.builds[0]
-        if experimental_selected and game_dir_group_box.current_build == latest_build['number']:
-            confirm_msgbox = QMessageBox()
-            confirm_msgbox.setWindowTitle(_('Game is up to date'))
-            confirm_msgbox.setText(_('You already have the latest version.'
-                ))
-            confirm_msgbox.setInformativeText(_('Are you sure you want to '
-                'update your game?'))
-            confirm_msgbox.addButton(_('Update the game again'),
-                QMessageBox.YesRole)
-            confirm_msgbox.addButton(_('I do not need to update the '
-                'game again'), QMessageBox.NoRole)
-            confirm_msgbox.setIcon(QMessageBox.Question)
+        archive_path = None
+        store_dir = None
+        build_store = get_build_store()
+        if prefetched is not None:
+            archive_path = prefetched['archive']
+        elif build_store is not None:
+            stored_archive = build_store.find(str(build['number']), file_name,
+                build.get('sha256'))
+            if stored_archive is not None:
+                archive_path = stored_archive['path']
+            else:
+                store_dir = build_store.store_dir
 
-            if confirm_msgbox.exec() == 1:
-                self.updating = False
-                return
+        exe_path = game_dir_group_box.exe_path
+        if exe_path is not None:
+            kind = 'update'
+        else:
+            kind = 'install'
+        # Reused files only take no space when they are linked
+        reuse = (exe_path is not None and
+            config_true(get_config_value('delta_update', 'True')) and
+            config_true(get_config_value('remove_previous_version', 'False')))
+        backup = config_true(get_config_value('backup_before_update',
+            'False'))
+        carried_dirs, skips = [], set()
+        if exe_path is not None:
+            carried_dirs, skips = planned_carry_over(game_dir)
 
         game_dir_group_box.disable_controls()
-        self.disable_controls()
+        self.disable_controls(True)
 
-        soundpacks_tab = main_tab.get_soundpacks_tab()
-        mods_tab = main_tab.get_mods_tab()
-        settings_tab = main_tab.get_settings_tab()
-        backups_tab = main_tab.get_backups_tab()
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
+        status_bar.clearMessage()
 
-        soundpacks_tab.disable_tab()
-        mods_tab.disable_tab()
-        settings_tab.disable_tab()
-        backups_tab.disable_tab()
+        status_bar.busy += 1
 
-        try:
-            if not os.path.exists(game_dir):
-                os.makedirs(game_dir)
-            elif os.path.isfile(game_dir):
-                main_window = self.get_main_window()
-                status_bar = main_window.statusBar()
+        planning_label = QLabel()
+        planning_label.setText(_('Checking the disk space needed by the '
+            'update'))
+        status_bar.addWidget(planning_label, 100)
+        self.planning_label = planning_label
 
-                status_bar.showMessage(_('Cannot install game on a file'))
+        progress_bar = QProgressBar()
+        progress_bar.setRange(0, 0)
+        status_bar.addWidget(progress_bar)
+        self.planning_progress_bar = progress_bar
 
-                self.finish_updating()
-                return
+        plan_update_thread = PlanUpdateThread(game_dir, url, archive_path,
+            download_dir_for(url), store_dir, reuse, backup, kind,
+            carried_dirs, skips)
+        plan_update_thread.completed.connect(self.plan_update_completed)
+        plan_update_thread.failed.connect(self.plan_update_failed)
+        plan_update_thread.start()
 
-            download_dir = tempfile.mkdtemp(prefix=cons.TEMP_PREFIX)
+        self.plan_update_thread = plan_update_thread
 
-            download_url = self.selected_build['url']
+    def plan_update_finished(self):
+        self.plan_update_thread = None
 
-            url = QUrl(download_url)
-            file_info = QFileInfo(url.path())
-            file_name = file_info.fileName()
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
+        status_bar.removeWidget(self.planning_label)
+        status_bar.removeWidget(self.planning_progress_bar)
 
-            self.downloaded_file = os.path.join(download_dir, file_name)
-            self.downloading_file = open(self.downloaded_file, 'wb')
+        status_bar.busy -= 1
 
-            self.download_game_update(download_url)
+        main_tab = self.get_main_tab()
+        game_dir_group_box = main_tab.game_dir_group_box
 
-        except OSError as e:
-            main_window = self.get_main_window()
-            status_bar = main_window.statusBar()
+        game_dir_group_box.enable_controls()
+        self.enable_controls()
 
-            self.finish_updating()
+    def plan_update_completed(self, plan):
+        self.plan_update_finished()
 
-            status_bar.showMessage(str(e))
+        logger.info('Update plan: {archive} archive, {extracted} extracted '
+            'in {files} files, {reused} likely reused, {carried} carried '
+            'over, {duration} s estimated'.format(archive=plan.archive_bytes,
+                extracted=plan.extracted_bytes, files=plan.file_count,
+                reused=plan.reused_bytes, carried=plan.carried_bytes,
+                duration=plan.estimated_seconds))
 
-    def clean_game_dir(self):
-        game_dir = self.game_dir
-        dir_list = os.listdir(game_dir)
-        if len(dir_list) == 0 or (
-            len(dir_list) == 1 and dir_list[0] == 'previous_version'):
-            return None
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
+
+        volumes_text = '\n'.join(_('{path}: {required} needed, {free} '
+            'free').format(path=volume['path'],
+                required=sizeof_fmt(volume['required']),
+                free=sizeof_fmt(volume['free']))
+            for volume in plan.shortages() + plan.warnings())
+
+        if len(plan.shortages()) > 0:
+            error_msgbox = QMessageBox()
+            error_msgbox.setWindowTitle(_('Not enough disk space'))
+            error_msgbox.setText(_('The update needs more disk space than '
+                'what is available. Nothing was changed.'))
+            error_msgbox.setInformativeText(volumes_text)
+            error_msgbox.addButton(_('OK'), QMessageBox.YesRole)
+            error_msgbox.setIcon(QMessageBox.Critical)
+
+            error_msgbox.exec()
 
-        temp_move_dir = tempfile.mkdtemp(prefix=cons.TEMP_PREFIX)
-
-        excluded_entries = set(['previous_version'])
-        if config_true(get_config_value('prevent_save_move', 'False')):
-            excluded_entries.add('save')
-        # Prevent moving the launcher if it's in the game directory
-        if getattr(sys, 'frozen', False):
-            launcher_exe = os.path.abspath(sys.executable)
-            launcher_dir = os.path.dirname(launcher_exe)
-            if os.path.abspath(game_dir) == launcher_dir:
-                excluded_entries.add(os.path.basename(launcher_exe))
-        for entry in dir_list:
-            if entry not in excluded_entries:
-                entry_path = os.path.join(game_dir, entry)
-                shutil.move(entry_path, temp_move_dir)
-
-        return temp_move_dir
-
-    def restore_previous_content(self, path):
-        if path is None:
+            status_bar.showMessage(_('Update cancelled - Not enough disk '
+                'space'))
             return
 
-        game_dir = self.game_dir
-        previous_version_dir = os.path.join(game_dir, 'previous_version')
-        if not os.path.exists(previous_version_dir):
-            os.makedirs(previous_version_dir)
+        if len(plan.warnings()) > 0:
+            confirm_msgbox = QMessageBox()
+            confirm_msgbox.setWindowTitle(_('Low disk space'))
+            confirm_msgbox.setText(_('Little disk space will be left after '
+                'the update and it could run out if fewer files than '
+                'expected can be reused.'))
+            confirm_msgbox.setInformativeText(volumes_text + '\n\n' +
+                _('Do you want to update the game anyway?'))
+            confirm_msgbox.addButton(_('Update the game anyway'),
+                QMessageBox.YesRole)
+            confirm_msgbox.addButton(_('Do not update the game'),
+                QMessageBox.NoRole)
+            confirm_msgbox.setIcon(QMessageBox.Warning)
+
+            if confirm_msgbox.exec() == 1:
+                return
+
+        if plan.estimated_seconds is not None:
+            minutes = max(1, round(plan.estimated_seconds / 60))
+            status_bar.showMessage(ngettext(
+                'The update should take about {count} minute',
+                'The update should take about {count} minutes',
+                minutes).format(count=minutes))
+
+        self.start_update()
+
+    def plan_update_failed(self, error):
+        self.plan_update_finished()
+
+        # The update can still be done without knowing what it needs
+        logger.warning('Could not plan the update: {0}'.format(error))
+
+        self.start_update()
+
+    def start_update(self):
+        main_tab = self.get_main_tab()
+
+        if config_true(get_config_value('backup_before_update', 'False')):
+            backups_tab = main_tab.get_backups_tab()
+
+            backups_tab.prune_auto_backups()
+
+            name = auto_backup_name(_('auto'), _('before_update'))
+
+            backups_tab.after_backup = self.update_game_process
+            backups_tab.backup_saves(name)
+        else:
+            self.update_game_process()
+
+    def update_game_process(self):
+        main_tab = self.get_main_tab()
+        game_dir_group_box = main_tab.game_dir_group_box
+        game_dir = game_dir_group_box.dir_combo.currentText()
+        
+        logger.info(
+            'Updating CDDA...\n'
+            'CDDAGL Directory: {}\n'
+            'CDDA Directory: {}'
+            .format(get_cddagl_path(), game_dir)
+        )
+
+        self.updating = True
+        self.clearing_previous_dir = False
+        self.extracting_new_build = False
+        self.analysing_new_build = False
+        self.in_post_extraction = False
+
+        self.selected_build = self.builds[self.builds_combo.currentIndex()]
+
+        selected_branch = self.branch_button_group.checkedButton()
+        experimental_selected = selected_branch is self.experimental_radio_button
+
+        latest_build = self.builds[0]
+        if experimental_selected and game_dir_group_box.current_build == latest_build['number']:
+            confirm_msgbox = QMessageBox()
+            confirm_msgbox.setWindowTitle(_('Game is up to date'))
+            confirm_msgbox.setText(_('You already have the latest version.'
+                ))
+            confirm_msgbox.setInformativeText(_('Are you sure you want to '
+                'update your game?'))
+            confirm_msgbox.addButton(_('Update the game again'),
+                QMessageBox.YesRole)
+            confirm_msgbox.addButton(_('I do not need to update the '
+                'game again'), QMessageBox.NoRole)
+            confirm_msgbox.setIcon(QMessageBox.Question)
+
+            if confirm_msgbox.exec() == 1:
+                self.updating = False
+                return
+
+        game_dir_group_box.disable_controls()
+        self.disable_controls()
+
+        soundpacks_tab = main_tab.get_soundpacks_tab()
+        mods_tab = main_tab.get_mods_tab()
+        settings_tab = main_tab.get_settings_tab()
+        backups_tab = main_tab.get_backups_tab()
+
+        soundpacks_tab.disable_tab()
+        mods_tab.disable_tab()
+        settings_tab.disable_tab()
+        backups_tab.disable_tab()
+
+        # Time spent in each phase, written in the log directory at the end
+        if game_dir_group_box.exe_path is not None:
+            update_kind = 'update'
+        else:
+            update_kind = 'install'
+        if experimental_selected:
+            branch = cons.CONFIG_BRANCH_EXPERIMENTAL
+        else:
+            branch = cons.CONFIG_BRANCH_STABLE
+        self.update_spans = SpanRecorder(kind=update_kind, branch=branch,
+            build=str(self.selected_build['number']),
+            launcher_version=version)
+        self.update_outcome = 'failed'
+
+        try:
+            if not os.path.exists(game_dir):
+                os.makedirs(game_dir)
+            elif os.path.isfile(game_dir):
+                main_window = self.get_main_window()
+                status_bar = main_window.statusBar()
+
+                status_bar.showMessage(_('Cannot install game on a file'))
+
+                self.finish_updating()
+                return
+
+            download_url = self.selected_build['url']
+
+            url = QUrl(download_url)
+            file_info = QFileInfo(url.path())
+            file_name = file_info.fileName()
+
+            self.archive_name = file_name
+            self.downloaded_sha256 = self.selected_build.get('sha256')
+
+            self.build_store = get_build_store()
+            self.stored_archive = None
+            if self.build_store is not None:
+                self.stored_archive = self.build_store.find(
+                    str(self.selected_build['number']), file_name,
+                    self.downloaded_sha256)
+
+            prefetched = prefetched_build(game_dir, self.selected_build)
+            if prefetched is None or prefetched['staged_dir'] is None:
+                self.discard_prefetch(game_dir)
+
+            if prefetched is not None and prefetched['staged_dir'] is not None:
+                # The build was extracted while the game was played
+                self.update_spans.set(archive='prestaged')
+                self.download_dir = None
+                self.downloaded_file = prefetched['archive']
+                if prefetched['archive'] is not None:
+                    self.download_dir = os.path.dirname(prefetched['archive'])
+                    self.downloaded_sha256 = prefetched['sha256']
+
+                if game_dir_group_box.exe_path is not None:
+                    self.update_button.setText(_('Cancel update'))
+                else:
+                    self.update_button.setText(_('Cancel installation'))
+
+                self.install_prestaged_build(prefetched)
+            elif self.stored_archive is not None:
+                # Extract the archive kept from a previous download
+                self.update_spans.set(archive='store')
+                self.download_dir = None
+                self.downloaded_file = self.stored_archive['path']
+                self.downloaded_sha256 = self.stored_archive['sha256']
+
+                if game_dir_group_box.exe_path is not None:
+                    self.update_button.setText(_('Cancel update'))
+                else:
+                    self.update_button.setText(_('Cancel installation'))
+
+                self.extract_new_build()
+            elif prefetched is not None:
+                # Extract the archive downloaded in the background
+                self.update_spans.set(archive='prefetched')
+                self.download_dir = download_dir_for(download_url)
+                self.downloaded_file = prefetched['archive']
+                self.downloaded_sha256 = prefetched['sha256']
+
+                if game_dir_group_box.exe_path is not None:
+                    self.update_button.setText(_('Cancel update'))
+                else:
+                    self.update_button.setText(_('Cancel installation'))
+
+                self.extract_new_build()
+            else:
+                self.update_spans.set(archive='download')
+                self.download_dir = download_dir_for(download_url)
+                os.makedirs(self.download_dir, exist_ok=True)
+
+                self.downloaded_file = os.path.join(self.download_dir,
+                    file_name)
+
+                self.download_game_update(download_url)
+
+        except OSError as e:
+            main_window = self.get_main_window()
+            status_bar = main_window.statusBar()
+
+            self.finish_updating()
 
-        for entry in os.listdir(path):
-            entry_path = os.path.join(path, entry)
-            shutil.move(entry_path, previous_version_dir)
+            status_bar.showMessage(str(e))
 
-    def restore_backup(self):
+    def rollback_new_build(self):
+        """Put the former game back from previous_version with renames. The
+        new build goes back to the staging directory, which is deleted when
+        the update finishes.
+        """
         game_dir = self.game_dir
         previous_version_dir = os.path.join(game_dir, 'previous_version')
 
-        if os.path.isdir(previous_version_dir) and os.path.isdir(game_dir):
+        main_tab = self.get_main_tab()
+        main_tab.game_dir_group_box.release_saves()
 
-            for entry in os.listdir(previous_version_dir):
-                if (entry == 'save' and
-                    config_true(get_config_value('prevent_save_move',
-                        'False'))):
-                    continue
-                entry_path = os.path.join(previous_version_dir, entry)
-                shutil.move(entry_path, game_dir)
+        try:
+            swap_entries(game_dir, previous_version_dir, self.staging_dir,
+                swap_exclusions(game_dir))
+            if os.path.isdir(previous_version_dir):
+                os.rmdir(previous_version_dir)
+        except OSError as e:
+            logger.exception('Could not restore %s', previous_version_dir)
 
-            delete_path(previous_version_dir)
+            main_window = self.get_main_window()
+            status_bar = main_window.statusBar()
+            status_bar.showMessage(str(e))
 
     def get_main_tab(self):
         return self.parentWidget()
@@ -1732,19 +2094,20 @@ class UpdateGroupBox(QGroupBox):
         progress_bar.setMinimum(0)
 
         self.download_last_read = datetime.utcnow()
-        self.download_last_bytes_read = 0
+        self.download_last_bytes_read = None
         self.download_speed_count = 0
 
-        request = QNetworkRequest(QUrl(url))
-        request.setRawHeader(b'User-Agent',
-            b'CDDA-Game-Launcher/' + version.encode('utf8'))
+        self.update_spans.begin('download')
 
-        self.download_http_reply = self.qnam.get(request)
-        self.download_http_reply.finished.connect(self.download_http_finished)
-        self.download_http_reply.readyRead.connect(
-            self.download_http_ready_read)
-        self.download_http_reply.downloadProgress.connect(
-            self.download_dl_progress)
+        # The hash identifies the archive in the build store
+        download_thread = DownloadThread(url, self.downloaded_file,
+            self.downloaded_sha256, self.build_store is not None)
+        download_thread.progress.connect(self.download_dl_progress)
+        download_thread.completed.connect(self.download_completed)
+        download_thread.failed.connect(self.download_failed)
+        download_thread.start()
+
+        self.download_thread = download_thread
 
         main_tab = self.get_main_tab()
         game_dir_group_box = main_tab.game_dir_group_box
@@ -1754,8 +2117,8 @@ class UpdateGroupBox(QGroupBox):
         else:
             self.update_button.setText(_('Cancel installation'))
 
-    def download_http_finished(self):
-        self.downloading_file.close()
+    def download_finished(self):
+        self.download_thread = None
 
         main_window = self.get_main_window()
 
@@ -1767,120 +2130,63 @@ class UpdateGroupBox(QGroupBox):
 
         status_bar.busy -= 1
 
-        if self.download_aborted:
-            download_dir = os.path.dirname(self.downloaded_file)
-            delete_path(download_dir)
-        else:
-            redirect = self.download_http_reply.attribute(
-                QNetworkRequest.RedirectionTargetAttribute)
-            if redirect is not None:
-                redirected_url = urljoin(
-                    self.download_http_reply.request().url().toString(),
-                    redirect.toString())
-
-                downloading_label = QLabel()
-                downloading_label.setText(_('Downloading: {0}').format(
-                    redirected_url))
-                status_bar.addWidget(downloading_label, 100)
-                self.downloading_label = downloading_label
-
-                dowloading_speed_label = QLabel()
-                status_bar.addWidget(dowloading_speed_label)
-                self.dowloading_speed_label = dowloading_speed_label
-
-                downloading_size_label = QLabel()
-                status_bar.addWidget(downloading_size_label)
-                self.downloading_size_label = downloading_size_label
-
-                progress_bar = QProgressBar()
-                status_bar.addWidget(progress_bar)
-                self.downloading_progress_bar = progress_bar
-                progress_bar.setMinimum(0)
-
-                self.download_last_read = datetime.utcnow()
-                self.download_last_bytes_read = 0
-                self.download_speed_count = 0
-
-                request = QNetworkRequest(QUrl(redirected_url))
-                request.setRawHeader(b'User-Agent',
-                    b'CDDA-Game-Launcher/' + version.encode('utf8'))
-
-                self.downloading_file = open(self.downloaded_file, 'wb')
-
-                self.download_http_reply = self.qnam.get(request)
-                self.download_http_reply.finished.connect(
-                    self.download_http_finished)
-                self.download_http_reply.readyRead.connect(
-                    self.download_http_ready_read)
-                self.download_http_reply.downloadProgress.connect(
-                    self.download_dl_progress)
-
-                return
-
-            # Test downloaded file
-            status_bar.showMessage(_('Testing downloaded file archive'))
-
-            class TestingZipThread(QThread):
-                completed = pyqtSignal()
-                invalid = pyqtSignal()
-                not_downloaded = pyqtSignal()
-
-                def __init__(self, downloaded_file):
-                    super(TestingZipThread, self).__init__()
-
-                    self.downloaded_file = downloaded_file
-
-                def __del__(self):
-                    self.wait()
-
-                def run(self):
-                    try:
-                        with zipfile.ZipFile(self.downloaded_file) as z:
-                            if z.testzip() is not None:
-                                self.invalid.emit()
-                                return
-                    except zipfile.BadZipFile:
-                        self.not_downloaded.emit()
-                        return
-
-                    self.completed.emit()
+    def stop_download(self):
+        download_thread = self.download_thread
 
-            def completed_test():
-                self.test_thread = None
+        download_thread.progress.disconnect()
+        download_thread.completed.disconnect()
+        download_thread.failed.disconnect()
+        download_thread.cancel()
 
-                status_bar.clearMessage()
-                self.clear_previous_dir()
+        # Keep the thread until its connections are closed. What was
+        # downloaded is kept to resume the download on the next update.
+        self.stopped_download_thread = download_thread
 
-            def invalid():
-                self.test_thread = None
+        self.download_finished()
 
-                status_bar.clearMessage()
-                status_bar.showMessage(_('Downloaded archive is invalid'))
+    def download_failed(self, error):
+        self.download_finished()
 
-                download_dir = os.path.dirname(self.downloaded_file)
-                delete_path(download_dir)
-                self.finish_updating()
+        logger.warning(error)
 
-            def not_downloaded():
-                self.test_thread = None
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
+        status_bar.showMessage(_('Could not download game'))
 
-                status_bar.clearMessage()
-                status_bar.showMessage(_('Could not download game'))
+        self.finish_updating()
 
-                download_dir = os.path.dirname(self.downloaded_file)
-                delete_path(download_dir)
-                self.finish_updating()
+    def download_completed(self, sha256):
+        self.download_finished()
 
-            test_thread = TestingZipThread(self.downloaded_file)
-            test_thread.completed.connect(completed_test)
-            test_thread.invalid.connect(invalid)
-            test_thread.not_downloaded.connect(not_downloaded)
-            test_thread.start()
+        try:
+            self.update_spans.end(os.path.getsize(self.downloaded_file), 1)
+        except OSError:
+            self.update_spans.end()
+
+        self.downloaded_sha256 = sha256
+        self.extract_new_build()
+
+    def delete_download_dir(self):
+        # An archive from the build store is not deleted
+        if self.download_dir is not None:
+            delete_path(self.download_dir)
+
+    def extraction_failed(self, message):
+        """Stop the update when the archive is corrupted. Nothing was moved in
+        the game directory at this point.
+        """
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
+        status_bar.showMessage(message)
 
-            self.test_thread = test_thread
+        if self.stored_archive is not None:
+            self.build_store.remove(self.stored_archive)
+        self.delete_download_dir()
+        self.finish_updating()
 
     def clear_previous_dir(self):
         self.clearing_previous_dir = True
+        self.update_spans.begin('clear_previous')
 
         main_tab = self.get_main_tab()
         game_dir_group_box = main_tab.game_dir_group_box
@@ -1897,292 +2203,429 @@ class UpdateGroupBox(QGroupBox):
                 name=_('previous_version directory')))
 
             if delete_path(backup_dir):
-                self.backup_current_game()
+                self.install_new_build()
             else:
                 status_bar.showMessage(_('Update cancelled - Could not delete '
                 'the {name}.').format(name=_('previous_version directory')))
                 self.finish_updating()
         else:
-            self.backup_current_game()
+            self.install_new_build()
 
-    def backup_current_game(self):
+    def install_new_build(self):
+        """Swap the new build from the staging directory with the current
+        game, which goes to previous_version. Only the top-level entries are
+        renamed so the game directory is incomplete for a constant time.
+        """
         self.clearing_previous_dir = False
         self.progress_rmtree = None
+        self.update_spans.begin('install')
 
-        self.backing_up_game = True
+        game_dir = self.game_dir
+        previous_version_dir = os.path.join(game_dir, 'previous_version')
 
+        # The save directory moves to previous_version and back
         main_tab = self.get_main_tab()
-        game_dir_group_box = main_tab.game_dir_group_box
+        main_tab.game_dir_group_box.release_saves()
 
-        game_dir = game_dir_group_box.dir_combo.currentText()
-        self.game_dir = game_dir
+        try:
+            swap_entries(game_dir, self.staging_dir, previous_version_dir,
+                swap_exclusions(game_dir))
+        except OSError as e:
+            main_window = self.get_main_window()
+            status_bar = main_window.statusBar()
 
-        main_window = self.get_main_window()
-        status_bar = main_window.statusBar()
+            status_bar.showMessage(_('Could not install the new build: '
+                '{error}').format(error=str(e)))
+            self.finish_updating()
+            return
 
-        backup_dir = os.path.join(game_dir, 'previous_version')
+        main_tab = self.get_main_tab()
+        game_dir_group_box = main_tab.game_dir_group_box
 
-        dir_list = os.listdir(game_dir)
-        self.backup_dir_list = dir_list
+        self.analysing_new_build = True
+        self.update_spans.begin('analysis')
+        game_dir_group_box.analyse_new_build(self.selected_build)
 
-        if (config_true(get_config_value('prevent_save_move', 'False'))
-            and 'save' in dir_list):
-            dir_list.remove('save')
+    def extract_new_build(self):
+        """Extract the new build in a staging directory of the game directory.
+        The CRC of each member is checked while it is extracted so the current
+        game is only replaced by a complete build.
+        """
+        main_tab = self.get_main_tab()
+        game_dir_group_box = main_tab.game_dir_group_box
 
-        if getattr(sys, 'frozen', False):
-            launcher_exe = os.path.abspath(sys.executable)
-            launcher_dir = os.path.dirname(launcher_exe)
-            if os.path.abspath(game_dir) == launcher_dir:
-                launcher_name = os.path.basename(launcher_exe)
-                if launcher_name in dir_list:
-                    dir_list.remove(launcher_name)
+        self.game_dir = game_dir_group_box.dir_combo.currentText()
+        self.staging_dir = staging_dir_for(self.game_dir)
 
-        if len(dir_list) > 0:
-            status_bar.showMessage(_('Backing up current game'))
+        # Remove what an interrupted update left
+        if (os.path.exists(self.staging_dir) and
+            not delete_path(self.staging_dir)):
+            self.extraction_failed(_('Update cancelled - Could not delete '
+                'the {name}.').format(name=_('staging directory')))
+            return
 
-            status_bar.busy += 1
+        try:
+            os.makedirs(self.staging_dir)
+            # The central directory is enough to plan the extraction
+            with zipfile.ZipFile(self.downloaded_file) as z:
+                infolist = z.infolist()
+        except ARCHIVE_ERRORS:
+            self.extraction_failed(_('Could not download game'))
+            return
+        except OSError as e:
+            self.extraction_failed(str(e))
+            return
 
-            backup_label = QLabel()
-            status_bar.addWidget(backup_label, 100)
-            self.backup_label = backup_label
+        self.extracting_new_build = True
+        self.extracted_fingerprints = {}
 
-            progress_bar = QProgressBar()
-            status_bar.addWidget(progress_bar)
-            self.backup_progress_bar = progress_bar
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
 
-            timer = QTimer(self)
-            self.backup_timer = timer
+        status_bar.busy += 1
 
-            progress_bar.setRange(0, len(dir_list))
+        extracting_label = QLabel()
+        status_bar.addWidget(extracting_label, 100)
+        self.extracting_label = extracting_label
 
-            os.makedirs(backup_dir)
-            self.backup_dir = backup_dir
-            self.backup_index = 0
-            self.backup_current_display = True
+        progress_bar = QProgressBar()
+        status_bar.addWidget(progress_bar)
+        self.extracting_progress_bar = progress_bar
 
-            def timeout():
-                self.backup_progress_bar.setValue(self.backup_index)
+        # The progress is counted in KiB to stay in the range of the bar
+        total_bytes = sum(member.file_size for member in infolist)
+        progress_bar.setRange(0, max(1, total_bytes // 1024))
+
+        self.extraction_bytes = total_bytes
+        self.extraction_files = len(infolist)
+        self.update_spans.begin('extraction')
+
+        # Unchanged files of the current version are copied instead of
+        # being extracted again. They are only linked when the previous
+        # version is deleted after the update, so no file is shared with it.
+        reuse_dir = None
+        if (game_dir_group_box.exe_path is not None and
+            config_true(get_config_value('delta_update', 'True'))):
+            reuse_dir = self.game_dir
+        link_reused = config_true(get_config_value('remove_previous_version',
+            'False'))
+
+        extracting_thread = ExtractionThread(self.downloaded_file, infolist,
+            self.staging_dir, reuse_dir, link_reused)
+        extracting_thread.progress.connect(self.extraction_progress)
+        extracting_thread.completed.connect(self.extraction_completed)
+        extracting_thread.invalid.connect(self.extraction_invalid)
+        extracting_thread.failed.connect(self.extraction_error)
+        extracting_thread.start()
+
+        self.extracting_thread = extracting_thread
+
+    def extraction_progress(self, bytes_written, member_name):
+        self.extracting_label.setText(_('Extracting {0}').format(member_name))
+        self.extracting_progress_bar.setValue(bytes_written // 1024)
+
+    def extraction_finished(self):
+        self.extracting_thread = None
+        self.extracting_new_build = False
 
-                if self.backup_index == len(self.backup_dir_list):
-                    self.backup_timer.stop()
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
 
-                    main_window = self.get_main_window()
-                    status_bar = main_window.statusBar()
+        status_bar.removeWidget(self.extracting_label)
+        status_bar.removeWidget(self.extracting_progress_bar)
 
-                    status_bar.removeWidget(self.backup_label)
-                    status_bar.removeWidget(self.backup_progress_bar)
+        status_bar.busy -= 1
 
-                    status_bar.busy -= 1
-                    status_bar.clearMessage()
+    def stop_extraction(self):
+        extracting_thread = self.extracting_thread
 
-                    self.backing_up_game = False
-                    self.extract_new_build()
+        extracting_thread.progress.disconnect()
+        extracting_thread.completed.disconnect()
+        extracting_thread.invalid.disconnect()
+        extracting_thread.failed.disconnect()
+        extracting_thread.cancel()
 
-                else:
-                    backup_element = self.backup_dir_list[self.backup_index]
+        # The workers stop after their current chunk and remove the file they
+        # were writing. Wait for them before the staging directory is deleted.
+        extracting_thread.wait()
 
-                    if self.backup_current_display:
-                        self.backup_label.setText(_('Backing up {0}').format(
-                            backup_element))
-                        self.backup_current_display = False
-                    else:
-                        srcpath = os.path.join(self.game_dir, backup_element)
-                        if not move_path(srcpath, self.backup_dir):
-                            self.backup_timer.stop()
+        self.extraction_finished()
 
-                            main_window = self.get_main_window()
-                            status_bar = main_window.statusBar()
+    def extraction_completed(self, fingerprints):
+        extractor = self.extracting_thread.extractor
+        self.update_spans.end(self.extraction_bytes, self.extraction_files,
+            reused_bytes=extractor.reused_bytes,
+            reused_files=extractor.reused_files)
 
-                            status_bar.removeWidget(self.backup_label)
-                            status_bar.removeWidget(self.backup_progress_bar)
+        self.extraction_finished()
 
-                            status_bar.busy -= 1
-                            status_bar.clearMessage()
+        self.extracted_fingerprints = fingerprints
 
-                            self.finish_updating()
+        self.store_downloaded_archive()
+        self.delete_download_dir()
 
-                            msg = (_('Could not move {srcpath} in {dstpath} .')
-                                ).format(
-                                    srcpath=srcpath,
-                                    dstpath=self.backup_dir
-                                )
+        self.clear_previous_dir()
 
-                            status_bar.showMessage(msg)
+    def store_downloaded_archive(self):
+        # Keep the archive in the build store if selected in the settings
+        if (self.build_store is not None and self.stored_archive is None and
+            self.downloaded_file is not None):
+            try:
+                self.build_store.add(str(self.selected_build['number']),
+                    self.archive_name, self.downloaded_sha256,
+                    self.downloaded_file)
+            except OSError:
+                logger.exception('Could not store %s', self.downloaded_file)
+
+    def install_prestaged_build(self, prefetched):
+        """Use the build extracted in the background as the staging
+        directory and go on with the update as if it was just extracted.
+        """
+        main_tab = self.get_main_tab()
+        game_dir_group_box = main_tab.game_dir_group_box
 
-                        self.backup_index += 1
-                        self.backup_current_display = True
+        self.game_dir = game_dir_group_box.dir_combo.currentText()
+        self.staging_dir = staging_dir_for(self.game_dir)
 
-            timer.timeout.connect(timeout)
-            timer.start(0)
-        else:
-            self.backing_up_game = False
-            self.extract_new_build()
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
 
-    def extract_new_build(self):
-        self.extracting_new_build = True
+        # Remove what an interrupted update left
+        if (os.path.exists(self.staging_dir) and
+            not delete_path(self.staging_dir)):
+            status_bar.showMessage(_('Update cancelled - Could not delete '
+                'the {name}.').format(name=_('staging directory')))
+            self.finish_updating()
+            return
 
-        z = zipfile.ZipFile(self.downloaded_file)
-        self.extracting_zipfile = z
+        try:
+            os.rename(prefetched['staged_dir'], self.staging_dir)
+        except OSError as e:
+            status_bar.showMessage(str(e))
+            self.finish_updating()
+            return
 
-        self.extracting_infolist = z.infolist()
-        self.extracting_index = 0
+        self.extracted_fingerprints = prefetched['fingerprints']
+        self.discard_prefetch(self.game_dir)
 
-        main_window = self.get_main_window()
-        status_bar = main_window.statusBar()
+        self.store_downloaded_archive()
+        self.delete_download_dir()
 
-        status_bar.busy += 1
+        self.clear_previous_dir()
 
-        extracting_label = QLabel()
-        status_bar.addWidget(extracting_label, 100)
-        self.extracting_label = extracting_label
+    def discard_prefetch(self, game_dir):
+        prefetch_dir = prefetch_dir_for(game_dir)
+        if not os.path.isdir(prefetch_dir):
+            return
 
-        progress_bar = QProgressBar()
-        status_bar.addWidget(progress_bar)
-        self.extracting_progress_bar = progress_bar
+        try:
+            move_to_trash(prefetch_dir, trash_dir_for(game_dir))
+        except OSError as e:
+            logger.warning('Could not delete {0}: {1}'.format(prefetch_dir,
+                e))
+            return
 
-        timer = QTimer(self)
-        self.extracting_timer = timer
+        main_tab = self.get_main_tab()
+        main_tab.reap_trash((game_dir, ))
+
+    def prefetch_build(self):
+        """Download the newest build in the background, and extract it when
+        selected in the settings, so the next update is quicker.
+        """
+        if (not config_true(get_config_value('prefetch_builds', 'False')) or
+            self.updating or self.prefetch_thread is not None or
+            self.builds is None):
+            return
 
-        progress_bar.setRange(0, len(self.extracting_infolist))
+        main_tab = self.get_main_tab()
+        game_dir_group_box = main_tab.game_dir_group_box
 
-        def timeout():
-            self.extracting_progress_bar.setValue(self.extracting_index)
+        # The installed build is unknown while its executable is read,
+        # show_version() prefetches again once it is known
+        if (game_dir_group_box.exe_path is None or
+            game_dir_group_box.current_build is None):
+            return
 
-            if self.extracting_index == len(self.extracting_infolist):
-                self.extracting_timer.stop()
+        build = next((build for build in self.builds
+            if build['url'] is not None), None)
+        if build is None or build['number'] == game_dir_group_box.current_build:
+            return
 
-                main_window = self.get_main_window()
-                status_bar = main_window.statusBar()
+        game_dir = game_dir_group_box.dir_combo.currentText()
+        stage = config_true(get_config_value('prestage_builds', 'False'))
+        reuse = config_true(get_config_value('delta_update', 'True'))
 
-                status_bar.removeWidget(self.extracting_label)
-                status_bar.removeWidget(self.extracting_progress_bar)
+        prefetch_thread = PrefetchThread(game_dir, build, stage, reuse)
+        prefetch_thread.completed.connect(self.prefetch_completed)
+        prefetch_thread.failed.connect(self.prefetch_failed)
+        prefetch_thread.start(QThread.IdlePriority)
 
-                status_bar.busy -= 1
+        self.prefetch_thread = prefetch_thread
 
-                self.extracting_new_build = False
+    def prefetch_completed(self, prefetched):
+        self.prefetch_thread = None
 
-                self.extracting_zipfile.close()
+        logger.info('Build {number} was prefetched'.format(
+            number=prefetched['number']))
 
-                # Keep a copy of the archive if selected in the settings
-                if config_true(get_config_value('keep_archive_copy', 'False')):
-                    archive_dir = get_config_value('archive_directory', '')
-                    archive_name = os.path.basename(self.downloaded_file)
-                    move_target = os.path.join(archive_dir, archive_name)
-                    if (os.path.isdir(archive_dir)
-                        and not os.path.exists(move_target)):
-                        shutil.move(self.downloaded_file, archive_dir)
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
 
-                download_dir = os.path.dirname(self.downloaded_file)
-                delete_path(download_dir)
+        if not self.updating and status_bar.busy == 0:
+            status_bar.showMessage(_('Build {number} is ready to be '
+                'installed').format(number=prefetched['number']))
 
-                main_tab = self.get_main_tab()
-                game_dir_group_box = main_tab.game_dir_group_box
+    def prefetch_failed(self, error):
+        self.prefetch_thread = None
 
-                self.analysing_new_build = True
-                game_dir_group_box.analyse_new_build(self.selected_build)
+        logger.warning('Could not prefetch the newest build: {0}'.format(
+            error))
 
-            else:
-                extracting_element = self.extracting_infolist[
-                    self.extracting_index]
-                self.extracting_label.setText(_('Extracting {0}').format(
-                    extracting_element.filename))
+    def stop_prefetch(self):
+        prefetch_thread = self.prefetch_thread
+        if prefetch_thread is None:
+            return
 
-                try:
-                    self.extracting_zipfile.extract(extracting_element,
-                        self.game_dir)
-                except OSError as e:
-                    # Display the error and stop the update process
-                    error_msgbox = QMessageBox()
-                    error_msgbox.setWindowTitle(
-                        _('Cannot extract game archive'))
+        prefetch_thread.completed.disconnect()
+        prefetch_thread.failed.disconnect()
+        prefetch_thread.cancel()
+
+        # What was downloaded is kept for the update
+        prefetch_thread.wait()
+
+        self.prefetch_thread = None
+
+    def extraction_invalid(self):
+        self.extraction_finished()
 
-                    text = _('''
+        self.extraction_failed(_('Downloaded archive is invalid'))
+
+    def extraction_error(self, error):
+        self.extraction_finished()
+
+        # Display the error and stop the update process
+        error_msgbox = QMessageBox()
+        error_msgbox.setWindowTitle(_('Cannot extract game archive'))
+
+        text = _('''
 <p>The launcher failed to extract the game archive.</p>
 <p>It received the following error from the operating system: {error}</p>'''
-                        ).format(error=html.escape(e.strerror))
+            ).format(error=html.escape(error))
 
-                    error_msgbox.setText(text)
-                    error_msgbox.addButton(_('OK'), QMessageBox.YesRole)
-                    error_msgbox.setIcon(QMessageBox.Critical)
+        error_msgbox.setText(text)
+        error_msgbox.addButton(_('OK'), QMessageBox.YesRole)
+        error_msgbox.setIcon(QMessageBox.Critical)
 
-                    error_msgbox.exec()
+        error_msgbox.exec()
 
-                    self.update_game()
+        self.delete_download_dir()
+        self.finish_updating()
 
-                self.extracting_index += 1
+    def carry_over_previous_dirs(self):
+        carried_dirs = carried_over_dirs(self.game_dir)
+        if len(carried_dirs) == 0:
+            self.post_extraction_step2()
+            return
 
-        timer.timeout.connect(timeout)
-        timer.start(0)
+        self.update_spans.begin('carry_over')
 
-    def asset_name(self, path, filename):
-        asset_file = os.path.join(path, filename)
+        # The previous version is deleted after the update when this is
+        # enabled, so its directories can be moved instead of copied
+        move = config_true(get_config_value('remove_previous_version',
+            'False'))
 
-        if not os.path.isfile(asset_file):
-            disabled_asset_file = os.path.join(path, filename + '.disabled')
-            if not os.path.isfile(disabled_asset_file):
-                return None
-            else:
-                asset_file_path = disabled_asset_file
-        else:
-            asset_file_path = asset_file
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
 
-        try:
-            with open(asset_file_path, 'r', encoding='latin1') as f:
-                for line in f:
-                    if line.startswith('NAME'):
-                        space_index = line.find(' ')
-                        name = line[space_index:].strip().replace(
-                            ',', '')
-                        return name
-        except FileNotFoundError:
-            return None
-        return None
+        status_bar.busy += 1
 
-    def mod_ident(self, path):
-        json_file = os.path.join(path, 'modinfo.json')
-        if not os.path.isfile(json_file):
-            json_file = os.path.join(path, 'modinfo.json.disabled')
-        if os.path.isfile(json_file):
-            try:
-                with open(json_file, 'r', encoding='utf8') as f:
-                    try:
-                        values = json.load(f)
-                        if isinstance(values, dict):
-                            if values.get('type', '') == 'MOD_INFO':
-                                return values.get('ident', None)
-                        elif isinstance(values, list):
-                            for item in values:
-                                if (isinstance(item, dict)
-                                    and item.get('type', '') == 'MOD_INFO'):
-                                        return item.get('ident', None)
-                    except ValueError:
-                        pass
-            except FileNotFoundError:
-                return None
-
-        return None
-
-    def copy_next_dir(self):
-        if self.in_post_extraction and len(self.previous_dirs) > 0:
-            next_dir = self.previous_dirs.pop()
-            src_path = os.path.join(self.previous_version_dir, next_dir)
-            dst_path = os.path.join(self.game_dir, next_dir)
-            if os.path.isdir(src_path) and not os.path.exists(dst_path):
-                main_window = self.get_main_window()
-                status_bar = main_window.statusBar()
+        carry_over_label = QLabel()
+        carry_over_label.setText(_('Restoring previous version directories'))
+        status_bar.addWidget(carry_over_label, 100)
+        self.carry_over_label = carry_over_label
 
-                progress_copy = ProgressCopyTree(src_path, dst_path,
-                    self.previous_dirs_skips, status_bar,
-                    _('{0} directory').format(next_dir))
-                progress_copy.completed.connect(self.copy_next_dir)
-                self.progress_copy = progress_copy
-                progress_copy.start()
-            else:
-                self.copy_next_dir()
-        elif self.in_post_extraction:
-            self.progress_copy = None
+        progress_bar = QProgressBar()
+        progress_bar.setRange(0, 0)
+        status_bar.addWidget(progress_bar)
+        self.carry_over_progress_bar = progress_bar
+
+        carry_over_thread = CarryOverThread(carried_dirs, move,
+            carry_over_skips(self.game_dir))
+        carry_over_thread.progress.connect(self.carry_over_progress)
+        carry_over_thread.completed.connect(self.carry_over_completed)
+        carry_over_thread.failed.connect(self.carry_over_failed)
+        carry_over_thread.start()
+
+        self.carry_over_thread = carry_over_thread
+
+    def carry_over_progress(self, bytes_done, total_bytes, name):
+        self.carry_over_label.setText(_('Restoring {0}').format(name))
+        # The progress is counted in KiB to stay in the range of the bar
+        self.carry_over_progress_bar.setRange(0, max(1, total_bytes // 1024))
+        self.carry_over_progress_bar.setValue(bytes_done // 1024)
+
+    def carry_over_finished(self):
+        self.carried_over_dirs = self.carry_over_thread.moved_dirs
+        self.carry_over_thread = None
+
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
+
+        status_bar.removeWidget(self.carry_over_label)
+        status_bar.removeWidget(self.carry_over_progress_bar)
+
+        status_bar.busy -= 1
+
+    def stop_carry_over(self):
+        carry_over_thread = self.carry_over_thread
+
+        carry_over_thread.progress.disconnect()
+        carry_over_thread.completed.disconnect()
+        carry_over_thread.failed.disconnect()
+        carry_over_thread.cancel()
+
+        # Wait for the thread to know every directory it moved
+        carry_over_thread.wait()
+
+        self.carry_over_finished()
+
+    def carry_over_completed(self):
+        carry_over_thread = self.carry_over_thread
+        self.update_spans.end(carry_over_thread.bytes_done,
+            moved_dirs=len(carry_over_thread.moved_dirs))
+
+        self.carry_over_finished()
+
+        if self.in_post_extraction:
             self.post_extraction_step2()
 
+    def carry_over_failed(self, error):
+        self.carry_over_finished()
+
+        main_window = self.get_main_window()
+        status_bar = main_window.statusBar()
+
+        msg = _('Could not restore the previous version directories: '
+            '{error}').format(error=error)
+        logger.warning(msg)
+        status_bar.showMessage(msg)
+
+        self.in_post_extraction = False
+        self.restore_carried_over_dirs()
+        self.rollback_new_build()
+        self.finish_updating()
+
+    def restore_carried_over_dirs(self):
+        # Moved directories go back to previous_version before the rollback
+        # sends the new build content away
+        for src_path, dst_path in reversed(self.carried_over_dirs):
+            try:
+                os.rename(dst_path, src_path)
+            except OSError as e:
+                logger.warning('Could not move {0} back to {1}: {2}'.format(
+                    dst_path, src_path, e))
+        self.carried_over_dirs = []
+
     def post_extraction(self):
         self.analysing_new_build = False
         self.in_post_extraction = True
@@ -2190,29 +2633,12 @@ class UpdateGroupBox(QGroupBox):
         main_window = self.get_main_window()
         status_bar = main_window.statusBar()
 
-        # Copy config, save, templates and memorial directory from previous
+        # Bring config, save, templates and memorial directory from previous
         # version
         previous_version_dir = os.path.join(self.game_dir, 'previous_version')
         if os.path.isdir(previous_version_dir) and self.in_post_extraction:
-
-            previous_dirs = ['config', 'save', 'templates', 'memorial',
-                'graveyard', 'save_backups']
-            if (config_true(get_config_value('prevent_save_move', 'False')) and
-                'save' in previous_dirs):
-                previous_dirs.remove('save')
-
-            self.previous_dirs = previous_dirs
-            self.previous_version_dir = previous_version_dir
-
-            # Skip debug files
-            self.previous_dirs_skips = set()
-            self.previous_dirs_skips.update((
-                 os.path.join(previous_version_dir, 'config', 'debug.log'),
-                 os.path.join(previous_version_dir, 'config', 'debug.log.prev')
-            ))
-
-            self.progress_copy = None
-            self.copy_next_dir()
+            self.carried_over_dirs = []
+            self.carry_over_previous_dirs()
         elif self.in_post_extraction:
             # New install
             self.in_post_extraction = False
@@ -2222,6 +2648,8 @@ class UpdateGroupBox(QGroupBox):
         main_window = self.get_main_window()
         status_bar = main_window.statusBar()
 
+        self.update_spans.begin('custom_assets')
+
         # Copy custom tilesets and soundpack from previous version
         # tilesets
         tilesets_dir = os.path.join(self.game_dir, 'gfx')
@@ -2232,37 +2660,15 @@ class UpdateGroupBox(QGroupBox):
             and self.in_post_extraction):
             status_bar.showMessage(_('Restoring custom tilesets'))
 
-            official_set = {}
-            for entry in os.listdir(tilesets_dir):
-                if not self.in_post_extraction:
-                    break
-
-                entry_path = os.path.join(tilesets_dir, entry)
-                if os.path.isdir(entry_path):
-                    name = self.asset_name(entry_path, 'tileset.txt')
-                    if name is not None and name not in official_set:
-                        official_set[name] = entry_path
-
-            previous_set = {}
-            for entry in os.listdir(previous_tilesets_dir):
-                if not self.in_post_extraction:
-                    break
-
-                entry_path = os.path.join(previous_tilesets_dir, entry)
-                if os.path.isdir(entry_path):
-                    name = self.asset_name(entry_path, 'tileset.txt')
-                    if name is not None and name not in previous_set:
-                        previous_set[name] = entry_path
-
-            custom_set = set(previous_set.keys()) - set(official_set.keys())
-            for item in custom_set:
+            for tileset_dir in custom_assets(tilesets_dir,
+                previous_tilesets_dir, 'tilesets'):
                 if not self.in_post_extraction:
                     break
 
                 target_dir = os.path.join(tilesets_dir, os.path.basename(
-                    previous_set[item]))
+                    tileset_dir))
                 if not os.path.exists(target_dir):
-                    shutil.copytree(previous_set[item], target_dir)
+                    shutil.copytree(tileset_dir, target_dir)
 
             status_bar.clearMessage()
 
@@ -2275,33 +2681,11 @@ class UpdateGroupBox(QGroupBox):
             previous_soundpack_dir) and self.in_post_extraction):
             status_bar.showMessage(_('Restoring custom soundpacks'))
 
-            official_set = {}
-            for entry in os.listdir(soundpack_dir):
-                if not self.in_post_extraction:
-                    break
-
-                entry_path = os.path.join(soundpack_dir, entry)
-                if os.path.isdir(entry_path):
-                    name = self.asset_name(entry_path, 'soundpack.txt')
-                    if name is not None and name not in official_set:
-                        official_set[name] = entry_path
-
-            previous_set = {}
-            for entry in os.listdir(previous_soundpack_dir):
-                if not self.in_post_extraction:
-                    break
-
-                entry_path = os.path.join(previous_soundpack_dir, entry)
-                if os.path.isdir(entry_path):
-                    name = self.asset_name(entry_path, 'soundpack.txt')
-                    if name is not None and name not in previous_set:
-                        previous_set[name] = entry_path
-
-            custom_set = set(previous_set.keys()) - set(official_set.keys())
-            if len(custom_set) > 0:
+            custom_soundpacks = custom_assets(soundpack_dir,
+                previous_soundpack_dir, 'soundpacks')
+            if len(custom_soundpacks) > 0:
                 self.soundpack_dir = soundpack_dir
-                self.previous_soundpack_set = previous_set
-                self.custom_soundpacks = list(custom_set)
+                self.custom_soundpacks = custom_soundpacks
 
                 self.copy_next_soundpack()
             else:
@@ -2313,10 +2697,9 @@ class UpdateGroupBox(QGroupBox):
 
     def copy_next_soundpack(self):
         if self.in_post_extraction and len(self.custom_soundpacks) > 0:
-            next_item = self.custom_soundpacks.pop()
-            dst_path = os.path.join(self.soundpack_dir, os.path.basename(
-                self.previous_soundpack_set[next_item]))
-            src_path = self.previous_soundpack_set[next_item]
+            src_path = self.custom_soundpacks.pop()
+            next_item = os.path.basename(src_path)
+            dst_path = os.path.join(self.soundpack_dir, next_item)
             if os.path.isdir(src_path) and not os.path.exists(dst_path):
                 main_window = self.get_main_window()
                 status_bar = main_window.statusBar()
@@ -2324,6 +2707,7 @@ class UpdateGroupBox(QGroupBox):
                 progress_copy = ProgressCopyTree(src_path, dst_path, None,
                     status_bar, _('{name} soundpack').format(name=next_item))
                 progress_copy.completed.connect(self.copy_next_soundpack)
+                progress_copy.aborted.connect(self.copy_next_soundpack)
                 self.progress_copy = progress_copy
                 progress_copy.start()
             else:
@@ -2354,27 +2738,10 @@ class UpdateGroupBox(QGroupBox):
             self.in_post_extraction):
             status_bar.showMessage(_('Restoring custom mods'))
 
-            official_set = {}
-            for entry in os.listdir(mods_dir):
-                entry_path = os.path.join(mods_dir, entry)
-                if os.path.isdir(entry_path):
-                    name = self.mod_ident(entry_path)
-                    if name is not None and name not in official_set:
-                        official_set[name] = entry_path
-            previous_set = {}
-            for entry in os.listdir(previous_mods_dir):
-                entry_path = os.path.join(previous_mods_dir, entry)
-                if os.path.isdir(entry_path):
-                    name = self.mod_ident(entry_path)
-                    if name is not None and name not in previous_set:
-                        previous_set[name] = entry_path
-
-            custom_set = set(previous_set.keys()) - set(official_set.keys())
-            for item in custom_set:
-                target_dir = os.path.join(mods_dir, os.path.basename(
-                    previous_set[item]))
+            for mod_dir in custom_assets(mods_dir, previous_mods_dir, 'mods'):
+                target_dir = os.path.join(mods_dir, os.path.basename(mod_dir))
                 if not os.path.exists(target_dir):
-                    shutil.copytree(previous_set[item], target_dir)
+                    shutil.copytree(mod_dir, target_dir)
 
             status_bar.clearMessage()
 
@@ -2392,27 +2759,12 @@ class UpdateGroupBox(QGroupBox):
             if not os.path.exists(user_mods_dir):
                 os.makedirs(user_mods_dir)
 
-            official_set = {}
-            for entry in os.listdir(user_mods_dir):
-                entry_path = os.path.join(user_mods_dir, entry)
-                if os.path.isdir(entry_path):
-                    name = self.mod_ident(entry_path)
-                    if name is not None and name not in official_set:
-                        official_set[name] = entry_path
-            previous_set = {}
-            for entry in os.listdir(previous_user_mods_dir):
-                entry_path = os.path.join(previous_user_mods_dir, entry)
-                if os.path.isdir(entry_path):
-                    name = self.mod_ident(entry_path)
-                    if name is not None and name not in previous_set:
-                        previous_set[name] = entry_path
-
-            custom_set = set(previous_set.keys()) - set(official_set.keys())
-            for item in custom_set:
-                target_dir = os.path.join(user_mods_dir, os.path.basename(
-                    previous_set[item]))
+            for mod_dir in custom_assets(user_mods_dir,
+                previous_user_mods_dir, 'mods'):
+                target_dir = os.path.join(user_mods_dir,
+                    os.path.basename(mod_dir))
                 if not os.path.exists(target_dir):
-                    shutil.copytree(previous_set[item], target_dir)
+                    shutil.copytree(mod_dir, target_dir)
 
             status_bar.clearMessage()
 
@@ -2469,6 +2821,23 @@ class UpdateGroupBox(QGroupBox):
     def remove_previous_version(self):
         previous_version_dir = os.path.join(self.game_dir, 'previous_version')
 
+        self.update_spans.begin('remove_previous')
+
+        # The previous version is deleted in the background while the game
+        # can already be played
+        try:
+            move_to_trash(previous_version_dir, trash_dir_for(self.game_dir))
+        except OSError as e:
+            logger.warning('Could not move {0} to the trash: {1}'.format(
+                previous_version_dir, e))
+        else:
+            main_tab = self.get_main_tab()
+            main_tab.reap_trash((self.game_dir, ))
+
+            self.after_updating_message()
+            self.finish_updating()
+            return
+
         main_window = self.get_main_window()
         status_bar = main_window.statusBar()
 
@@ -2487,6 +2856,8 @@ class UpdateGroupBox(QGroupBox):
         progress_rmtree.start()
 
     def after_updating_message(self):
+        self.update_outcome = 'completed'
+
         main_window = self.get_main_window()
         status_bar = main_window.statusBar()
 
@@ -2514,6 +2885,19 @@ class UpdateGroupBox(QGroupBox):
 
     def finish_updating(self):
         self.updating = False
+
+        if self.update_spans is not None:
+            record = self.update_spans.finish(self.update_outcome)
+            self.update_spans = None
+            try:
+                write_record(record)
+            except OSError:
+                logger.exception('Could not write the update timings')
+
+        if self.staging_dir is not None:
+            if os.path.exists(self.staging_dir):
+                delete_path(self.staging_dir)
+            self.staging_dir = None
         main_tab = self.get_main_tab()
         game_dir_group_box = main_tab.game_dir_group_box
 
@@ -2523,6 +2907,7 @@ class UpdateGroupBox(QGroupBox):
         game_dir_group_box.update_soundpacks()
         game_dir_group_box.update_mods()
         game_dir_group_box.update_backups()
+        game_dir_group_box.update_saves(use_cache=False)
 
         soundpacks_tab = main_tab.get_soundpacks_tab()
         mods_tab = main_tab.get_mods_tab()
@@ -2542,9 +2927,6 @@ class UpdateGroupBox(QGroupBox):
         if self.close_after_update:
             self.get_main_window().close()
 
-    def download_http_ready_read(self):
-        self.downloading_file.write(self.download_http_reply.readAll())
-
     def download_dl_progress(self, bytes_read, total_bytes):
         self.downloading_progress_bar.setMaximum(total_bytes)
         self.downloading_progress_bar.setValue(bytes_read)
@@ -2556,7 +2938,11 @@ class UpdateGroupBox(QGroupBox):
             .format(bytes_read=sizeof_fmt(bytes_read), total_bytes=sizeof_fmt(total_bytes))
         )
 
-        if self.download_speed_count % 5 == 0:
+        if self.download_last_bytes_read is None:
+            # Start measuring the speed from what a resumed download had
+            self.download_last_bytes_read = bytes_read
+            self.download_last_read = datetime.utcnow()
+        elif self.download_speed_count % 5 == 0:
             delta_bytes = bytes_read - self.download_last_bytes_read
             delta_time = datetime.utcnow() - self.download_last_read
 
@@ -2728,46 +3114,9 @@ class UpdateGroupBox(QGroupBox):
             releases = []
         self.lb_html = None
 
-        builds = []
-
-        asset_platform = self.base_asset['Platform']
-        asset_graphics = self.base_asset['Graphics']
-
-        target_regex = re.compile(r'cataclysmdda-(?P<major>.+)-' +
-            re.escape(asset_platform) + r'-' +
-            re.escape(asset_graphics) + r'-' +
-            r'(?P<build>\d+)\.zip'
-            )
-
-        build_regex = re.compile(r'build #(?P<build>\d+)')
-
-        for release in releases:
-            if any(x not in release for x in ('name', 'created_at')):
-                continue
-
-            build_match = build_regex.search(release['name'])
-            if build_match is not None:
-                asset = None
-                if 'assets' in release:
-                    asset_iter = (
-                        x for x in release['assets']
-                        if 'browser_download_url' in x
-                           and 'name' in x
-                           and target_regex.search(x['name']) is not None
-                    )
-                    asset = next(asset_iter, None)
-
-                build = {
-                    'url': asset['browser_download_url'] if asset is not None
-                                                         else None,
-                    'name': asset['name'] if asset is not None else None,
-                    'number': build_match.group('build'),
-                    'date': arrow.get(release['created_at']).datetime
-                }
-                builds.append(build)
+        builds = parse_releases(releases, self.base_asset)
 
         if len(builds) > 0:
-            builds.sort(key=lambda x: (int(x['number']), x['date']), reverse=True)
             self.builds = builds
 
             self.builds_combo.clear()
@@ -2805,209 +3154,847 @@ class UpdateGroupBox(QGroupBox):
             if game_dir_group_box.exe_path is not None:
                 self.update_button.setText(_('Update game'))
 
-                if (game_dir_group_box.current_build is not None
-                    and status_bar.busy == 0
-                    and not game_dir_group_box.game_started):
-                    last_build = self.builds[0]
+                if (game_dir_group_box.current_build is not None
+                    and status_bar.busy == 0
+                    and not game_dir_group_box.game_started):
+                    last_build = self.builds[0]
+
+                    message = status_bar.currentMessage()
+                    if message != '':
+                        message = message + ' - '
+
+                    if last_build['number'] == game_dir_group_box.current_build:
+                        message = message + _('Your game is up to date')
+                    else:
+                        message = message + _('There is a new update available')
+                    status_bar.showMessage(message)
+            else:
+                self.update_button.setText(_('Install game'))
+
+            self.prefetch_build()
+
+        else:
+            self.builds = None
+
+            self.builds_combo.clear()
+            self.builds_combo.addItem(_('Could not find remote builds'))
+            self.builds_combo.setEnabled(False)
+
+    def lb_http_ready_read(self):
+        self.lb_html.write(self.http_reply.readAll())
+
+    def lb_dl_progress(self, bytes_read, total_bytes):
+        self.fetching_progress_bar.setMaximum(total_bytes)
+        self.fetching_progress_bar.setValue(bytes_read)
+
+    def refresh_builds(self):
+        selected_branch = self.branch_button_group.checkedButton()
+
+        selected_platform = self.platform_button_group.checkedButton()
+
+        if selected_platform is self.x64_radio_button:
+            selected_platform = 'x64'
+        elif selected_platform is self.x86_radio_button:
+            selected_platform = 'x86'
+
+        if selected_branch is self.stable_radio_button:
+            # Populate stable builds and stable changelog
+
+            # Add stable builds
+
+            builds = stable_builds(selected_platform)
+            self.builds = builds
+
+            self.builds_combo.clear()
+
+            for build in builds:
+                if build['date'] is not None:
+                    build_date = arrow.get(build['date'], 'UTC')
+                    human_delta = build_date.humanize(arrow.utcnow(),
+                        locale=self.app_locale)
+                else:
+                    human_delta = _('Unknown')
+
+                self.builds_combo.addItem(
+                    '{name} ({delta}) [{number}]'.format(name=build['name'], delta=human_delta,
+                        number=build['number']), userData=build)
+            
+            main_tab = self.get_main_tab()
+            game_dir_group_box = main_tab.game_dir_group_box
+
+            if not game_dir_group_box.game_started:
+                self.builds_combo.setEnabled(True)
+            else:
+                self.previous_bc_enabled = True
+
+            if game_dir_group_box.exe_path is not None:
+                self.update_button.setText(_('Update game'))
+            else:
+                self.update_button.setText(_('Install game'))
+
+            # Populate stable changelog
+
+            self.changelog_content.setHtml(cons.STABLE_CHANGELOG)
+
+            
+        elif selected_branch is self.experimental_radio_button:
+            release_asset = cons.BASE_ASSETS['Tiles'][selected_platform]
+
+            self.start_lb_request(release_asset)
+            self.refresh_changelog()
+
+    def refresh_changelog(self):
+        if self.changelog_http_reply is not None:
+            self.changelog_http_data = None
+            self.changelog_http_reply.abort()
+            self.changelog_http_reply = None
+
+        main_window = self.get_main_window()
+
+        status_bar = main_window.statusBar()
+        status_bar.clearMessage()
+        self.changelog_content.setHtml(_('<h3>Loading changelog...</h3>'))
+
+        status_bar.busy += 1
+
+        changelog_label = QLabel()
+        changelog_label.setText(_('Fetching latest build changelogs'))
+        status_bar.addWidget(changelog_label, 100)
+        self.changelog_label = changelog_label
+
+        progress_bar = QProgressBar()
+        status_bar.addWidget(progress_bar)
+        self.changelog_progress_bar = progress_bar
+
+        progress_bar.setMinimum(0)
+
+        self.changelog_http_data = BytesIO()
+
+        request = QNetworkRequest(QUrl(cons.CHANGELOG_URL))
+        request.setRawHeader(b'User-Agent',
+            b'CDDA-Game-Launcher/' + version.encode('utf8'))
+
+        self.changelog_http_reply = self.qnam.get(request)
+        self.changelog_http_reply.finished.connect(self.changelog_http_finished)
+        self.changelog_http_reply.readyRead.connect(
+            self.changelog_http_ready_read)
+        self.changelog_http_reply.downloadProgress.connect(
+            self.changelog_dl_progress)
+
+    def changelog_http_finished(self):
+        main_window = self.get_main_window()
+
+        status_bar = main_window.statusBar()
+        status_bar.removeWidget(self.changelog_label)
+        status_bar.removeWidget(self.changelog_progress_bar)
+
+        main_tab = self.get_main_tab()
+        game_dir_group_box = main_tab.game_dir_group_box
+
+        status_bar.busy -= 1
+
+        if not game_dir_group_box.game_started:
+            if status_bar.busy == 0:
+                status_bar.showMessage(_('Ready'))
+        else:
+            if status_bar.busy == 0:
+                status_bar.showMessage(_('Game process is running'))
+
+        if self.changelog_http_data is not None:
+            self.changelog_content.setHtml(_('<h3>Parsing changelog...</h3>'))
+
+            # Use thread to avoid blocking UI during parsing
+            parsing_thread = ChangelogParsingThread(self.changelog_http_data)
+            parsing_thread.completed.connect(
+                lambda x: self.changelog_content.setHtml(x.getvalue()))
+            parsing_thread.start()
+
+        self.changelog_http_data = None
+        self.changelog_http_reply = None
+
+    def changelog_http_ready_read(self):
+        self.changelog_http_data.write(self.changelog_http_reply.readAll())
+
+    def changelog_dl_progress(self, bytes_read, total_bytes):
+        if total_bytes == -1:
+            total_bytes = bytes_read * 2
+        self.changelog_progress_bar.setMaximum(total_bytes)
+        self.changelog_progress_bar.setValue(bytes_read)
+
+    def branch_clicked(self, button):
+        if button is self.stable_radio_button:
+            config_value = cons.CONFIG_BRANCH_STABLE
+        if button is self.experimental_radio_button:
+            config_value = cons.CONFIG_BRANCH_EXPERIMENTAL
+        
+        set_config_value(cons.CONFIG_BRANCH_KEY, config_value)
+
+        self.branch_changed()
+    
+    def branch_changed(self):
+        # Perform branch change
+        # Change available builds and changelog
+
+        self.refresh_builds()
+
+    def platform_clicked(self, button):
+        if button is self.x64_radio_button:
+            config_value = 'x64'
+        elif button is self.x86_radio_button:
+            config_value = 'x86'
+
+        set_config_value('platform', config_value)
+
+        self.refresh_builds()
+
+
+class ExeFingerprintThread(QThread):
+    progress = pyqtSignal(int)
+    completed = pyqtSignal(str, str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, exe_path):
+        super(ExeFingerprintThread, self).__init__()
+
+        self.exe_path = exe_path
+        self.key = None
+        self.cancelled = False
+        self.last_progress = 0
+
+    def __del__(self):
+        self.wait()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def report_progress(self, bytes_read, total_bytes):
+        now = time.monotonic()
+        if (bytes_read == total_bytes or
+            now - self.last_progress >= cons.PROGRESS_UPDATE_INTERVAL):
+            self.last_progress = now
+            self.progress.emit(bytes_read)
+
+    def run(self):
+        try:
+            # Identify the file before reading it so that a change made
+            # during the reading invalidates the cached result
+            self.key = fingerprint_key(self.exe_path)
+            sha256, game_version = fingerprint_file(self.exe_path,
+                self.report_progress, lambda: self.cancelled)
+        except FingerprintCancelled:
+            return
+        except (OSError, ValueError) as e:
+            self.failed.emit(_('Could not read {path}: {error}').format(
+                path=self.exe_path, error=str(e)))
+            return
+
+        self.completed.emit(sha256, game_version)
+
+
+class SavesCensusThread(QThread):
+    progress = pyqtSignal(object)
+    completed = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, game_dir, index_key, index, report_partial=True):
+        super(SavesCensusThread, self).__init__()
+
+        self.game_dir = game_dir
+        self.index_key = index_key
+        self.index = index
+        self.report_partial = report_partial
+        self.updated = {}
+        self.removed = []
+        self.signature = None
+        self.cancelled = False
+        self.last_progress = 0
+
+    def __del__(self):
+        self.wait()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def report_progress(self, summary):
+        now = time.monotonic()
+        if (self.report_partial and
+            now - self.last_progress >= cons.LABEL_UPDATE_INTERVAL):
+            self.last_progress = now
+            self.progress.emit(dict(summary))
+
+    def run(self):
+        save_dir = os.path.join(self.game_dir, 'save')
+        try:
+            self.signature = directory_signature(self.game_dir, 'saves')
+            summary, self.updated, self.removed = indexed_saves_summary(
+                save_dir, self.index, self.report_progress,
+                lambda: self.cancelled)
+        except SavesScanCancelled:
+            return
+        except OSError as e:
+            self.failed.emit(_('Could not read {path}: {error}').format(
+                path=save_dir, error=str(e)))
+            return
+
+        self.completed.emit(summary)
+
+
+class SavesWatcher(QObject):
+    """Keep the summary of a save tree current by rescanning the
+    directories reported by a QFileSystemWatcher. Changes are coalesced
+    for SAVES_WATCH_DELAY seconds. Directories that cannot be watched are
+    polled every SAVES_POLL_INTERVAL seconds instead.
+    """
+
+    changed = pyqtSignal(object, object, object)
+
+    def __init__(self, parent=None):
+        super(SavesWatcher, self).__init__(parent)
+
+        self.game_dir = None
+        self.save_dir = None
+        self.index_key = None
+        self.index = {}
+        self.summary = None
+
+        self.watched = {}
+        self.polled = set()
+        self.pending = set()
+
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.directory_changed)
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(int(cons.SAVES_WATCH_DELAY * 1000))
+        self.flush_timer.timeout.connect(self.flush)
+
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(int(cons.SAVES_POLL_INTERVAL * 1000))
+        self.poll_timer.timeout.connect(self.poll)
+
+    def is_watching(self, save_dir):
+        return (self.save_dir is not None and
+            os.path.normcase(os.path.abspath(save_dir)) == self.index_key)
+
+    def start(self, game_dir, index_key, index, summary):
+        self.stop()
+
+        self.game_dir = game_dir
+        self.save_dir = os.path.join(game_dir, 'save')
+        self.index_key = index_key
+        self.index = index
+        self.summary = dict(summary)
+
+        self.watch(list(index))
+
+        # Catch the changes made since the index was built
+        self.pending.update(index)
+        self.flush_timer.start()
+
+    def stop(self):
+        self.flush_timer.stop()
+        self.poll_timer.stop()
+
+        if len(self.watched) > 0:
+            self.watcher.removePaths(list(self.watched))
+
+        self.game_dir = None
+        self.save_dir = None
+        self.index_key = None
+        self.index = {}
+        self.summary = None
+
+        self.watched = {}
+        self.polled = set()
+        self.pending = set()
+
+    def watch(self, relative_paths):
+        full_paths = {}
+        for relative_path in relative_paths:
+            full_paths[os.path.join(self.save_dir, relative_path)] = (
+                relative_path)
+
+        if len(full_paths) == 0:
+            return
+
+        failed = set(self.watcher.addPaths(list(full_paths)))
+        for full_path, relative_path in full_paths.items():
+            if full_path in failed:
+                self.polled.add(relative_path)
+            else:
+                self.watched[full_path] = relative_path
+
+        if len(self.polled) > 0 and not self.poll_timer.isActive():
+            self.poll_timer.start()
+
+    def unwatch(self, relative_paths):
+        for relative_path in relative_paths:
+            full_path = os.path.join(self.save_dir, relative_path)
+            if self.watched.pop(full_path, None) is not None:
+                self.watcher.removePath(full_path)
+            self.polled.discard(relative_path)
+
+        if len(self.polled) == 0:
+            self.poll_timer.stop()
+
+    def directory_changed(self, path):
+        relative_path = self.watched.get(path)
+        if relative_path is None:
+            return
+
+        self.pending.add(relative_path)
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def poll(self):
+        self.pending.update(self.polled)
+        self.flush()
+
+    def flush(self):
+        self.flush_timer.stop()
+
+        if self.save_dir is None or len(self.pending) == 0:
+            return
+
+        paths = self.pending
+        self.pending = set()
+
+        try:
+            updated, removed = refresh_save_directories(self.save_dir,
+                self.index, self.summary, paths)
+        except OSError as e:
+            logger.warning(_('Could not read {path}: {error}').format(
+                path=self.save_dir, error=str(e)))
+            return
+
+        self.unwatch(removed)
+
+        # New directories and directories removed and created again are not
+        # watched yet
+        watched_dirs = set(self.watcher.directories())
+        new_paths = []
+        for path in updated:
+            full_path = os.path.join(self.save_dir, path)
+            if full_path not in watched_dirs and path not in self.polled:
+                self.watched.pop(full_path, None)
+                new_paths.append(path)
+        self.watch(new_paths)
+
+        if len(updated) > 0 or len(removed) > 0:
+            self.changed.emit(dict(self.summary), updated, removed)
+
+        if '' not in self.index:
+            # The save directory itself is gone, a new census is needed once
+            # it is created again
+            self.stop()
+
+
+class GameDirsAnalysisThread(QThread):
+    analysed = pyqtSignal(str, object)
+
+    def __init__(self, game_dirs, fingerprint_dirs):
+        super(GameDirsAnalysisThread, self).__init__()
+
+        self.game_dirs = game_dirs
+        self.fingerprint_dirs = fingerprint_dirs
+
+    def __del__(self):
+        self.wait()
+
+    def analyse(self, game_dir):
+        try:
+            return analyse_game_dir(game_dir,
+                game_dir in self.fingerprint_dirs)
+        except OSError:
+            logger.exception('Could not pre-analyse %s', game_dir)
+            return None
+
+    def run(self):
+        with ThreadPoolExecutor(max_workers=cons.ANALYSIS_WORKERS) as executor:
+            futures = {executor.submit(self.analyse, game_dir): game_dir
+                for game_dir in self.game_dirs}
+            for future in as_completed(futures):
+                self.analysed.emit(futures[future], future.result())
+
+
+class PlanUpdateThread(QThread):
+    completed = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, game_dir, url, archive_path, download_dir, store_dir,
+        reuse, backup, kind, carried_dirs=(), skips=()):
+        super(PlanUpdateThread, self).__init__()
+
+        self.game_dir = game_dir
+        self.url = url
+        self.archive_path = archive_path
+        self.download_dir = download_dir
+        self.store_dir = store_dir
+        self.reuse = reuse
+        self.backup = backup
+        self.kind = kind
+        self.carried_dirs = carried_dirs
+        self.skips = skips
+
+    def __del__(self):
+        self.wait()
+
+    def run(self):
+        try:
+            plan = plan_update(self.game_dir, self.url, self.archive_path,
+                self.download_dir, self.store_dir, self.reuse, self.backup,
+                self.kind, 'CDDA-Game-Launcher/' + version,
+                carried_dirs=self.carried_dirs, skips=self.skips)
+        except (PlanningError, OSError) as e:
+            self.failed.emit(str(e))
+            return
+
+        self.completed.emit(plan)
+
+
+class PrefetchThread(QThread):
+    completed = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, game_dir, build, stage, reuse):
+        super(PrefetchThread, self).__init__()
+
+        self.prefetcher = Prefetcher(game_dir, build, stage, reuse,
+            'CDDA-Game-Launcher/' + version)
+
+    def __del__(self):
+        self.wait()
+
+    def cancel(self):
+        self.prefetcher.cancel()
+
+    def run(self):
+        # The game keeps the disk while the build is prepared
+        try:
+            begin_background_mode()
+        except PyWinError:
+            pass
+
+        try:
+            prefetched = self.prefetcher.run()
+        except OperationCancelled:
+            return
+        except (PrefetchError, DownloadError, OSError) as e:
+            self.failed.emit(str(e))
+            return
+
+        self.completed.emit(prefetched)
+
+
+class DownloadThread(QThread):
+    progress = pyqtSignal(int, int)
+    completed = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, url, downloaded_file, expected_sha256=None,
+        hash_archive=False):
+        super(DownloadThread, self).__init__()
+
+        self.download = RangedDownload(url, downloaded_file,
+            self.report_progress, 'CDDA-Game-Launcher/' + version)
+        self.expected_sha256 = expected_sha256
+        # Reading the archive again is only needed to check or store it
+        self.hash_archive = hash_archive or expected_sha256 is not None
+        self.last_progress = 0
+
+    def __del__(self):
+        self.wait()
+
+    def cancel(self):
+        self.download.cancel()
+
+    def report_progress(self, bytes_read, total_bytes):
+        now = time.monotonic()
+        if (bytes_read == total_bytes or
+            now - self.last_progress >= cons.PROGRESS_UPDATE_INTERVAL):
+            self.last_progress = now
+            self.progress.emit(bytes_read, total_bytes)
+
+    def run(self):
+        try:
+            self.download.run()
+            sha256 = None
+            if self.hash_archive:
+                sha256 = sha256_file(self.download.target_path)
+        except DownloadCancelled:
+            return
+        except (DownloadError, OSError) as e:
+            self.failed.emit(_('Could not download {url}: {error}').format(
+                url=self.download.url, error=str(e)))
+            return
+
+        if self.expected_sha256 is not None and sha256 != self.expected_sha256:
+            # A corrupted archive must not be resumed
+            try:
+                os.remove(self.download.target_path)
+            except OSError:
+                pass
+            self.failed.emit(_('Could not download {url}: {error}').format(
+                url=self.download.url, error=_('Checksum mismatch')))
+            return
+
+        self.completed.emit(sha256)
+
+
+class ExtractionThread(QThread):
+    progress = pyqtSignal(object, str)
+    completed = pyqtSignal(object)
+    invalid = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, archive_path, infolist, target_dir, reuse_dir=None,
+        link_reused=False):
+        super(ExtractionThread, self).__init__()
+
+        self.extractor = ArchiveExtractor(archive_path, infolist, target_dir,
+            self.report_progress, cons.GAME_EXECUTABLES, reuse_dir,
+            link_reused=link_reused)
+        self.last_progress = 0
 
-                    message = status_bar.currentMessage()
-                    if message != '':
-                        message = message + ' - '
+    def __del__(self):
+        self.wait()
 
-                    if last_build['number'] == game_dir_group_box.current_build:
-                        message = message + _('Your game is up to date')
-                    else:
-                        message = message + _('There is a new update available')
-                    status_bar.showMessage(message)
-            else:
-                self.update_button.setText(_('Install game'))
+    def cancel(self):
+        self.extractor.cancel()
 
-        else:
-            self.builds = None
+    def report_progress(self, bytes_written, total_bytes, member_name):
+        now = time.monotonic()
+        if (bytes_written == total_bytes or
+            now - self.last_progress >= cons.PROGRESS_UPDATE_INTERVAL):
+            self.last_progress = now
+            self.progress.emit(bytes_written, member_name)
 
-            self.builds_combo.clear()
-            self.builds_combo.addItem(_('Could not find remote builds'))
-            self.builds_combo.setEnabled(False)
+    def run(self):
+        try:
+            fingerprints = self.extractor.run()
+        except ExtractionCancelled:
+            return
+        except ARCHIVE_ERRORS:
+            self.invalid.emit()
+            return
+        except OSError as e:
+            self.failed.emit(e.strerror or str(e))
+            return
 
-    def lb_http_ready_read(self):
-        self.lb_html.write(self.http_reply.readAll())
+        if self.extractor.reuse_dir is not None:
+            logger.info('Reused {files} unchanged files ({size}) from {path}'
+                .format(files=self.extractor.reused_files,
+                    size=sizeof_fmt(self.extractor.reused_bytes),
+                    path=self.extractor.reuse_dir))
 
-    def lb_dl_progress(self, bytes_read, total_bytes):
-        self.fetching_progress_bar.setMaximum(total_bytes)
-        self.fetching_progress_bar.setValue(bytes_read)
+        self.completed.emit(fingerprints)
 
-    def refresh_builds(self):
-        selected_branch = self.branch_button_group.checkedButton()
 
-        selected_platform = self.platform_button_group.checkedButton()
+class CarryOverThread(QThread):
+    progress = pyqtSignal(object, object, str)
+    completed = pyqtSignal()
+    failed = pyqtSignal(str)
 
-        if selected_platform is self.x64_radio_button:
-            selected_platform = 'x64'
-        elif selected_platform is self.x86_radio_button:
-            selected_platform = 'x86'
+    def __init__(self, carried_dirs, move, skips):
+        super(CarryOverThread, self).__init__()
 
-        if selected_branch is self.stable_radio_button:
-            # Populate stable builds and stable changelog
+        self.carried_dirs = carried_dirs
+        self.move = move
+        self.skips = skips
+        self.moved_dirs = []
+        self.cancelled = False
+        self.copier = None
 
-            # Add stable builds
+        self.bytes_done = 0
+        self.total_bytes = 0
+        self.last_progress = 0
 
-            builds = []
+    def __del__(self):
+        self.wait()
 
-            for stable_version in cons.STABLE_ASSETS:
-                version_details = cons.STABLE_ASSETS[stable_version]
+    def cancel(self):
+        self.cancelled = True
+        copier = self.copier
+        if copier is not None:
+            copier.cancel()
 
-                build = {
-                    'url': version_details['Tiles'][selected_platform],
-                    'name': version_details['name'],
-                    'number': version_details['number'],
-                    'date': arrow.get(version_details['released_on']).datetime
-                }
-                builds.append(build)
-            
-            builds.sort(key=lambda x: (x['number'], x['date']), reverse=True)
-            self.builds = builds
+    def is_cancelled(self):
+        return self.cancelled
 
-            self.builds_combo.clear()
+    def emit_progress(self, name):
+        now = time.monotonic()
+        if now - self.last_progress >= cons.PROGRESS_UPDATE_INTERVAL:
+            self.last_progress = now
+            self.progress.emit(self.bytes_done, self.total_bytes, name)
 
-            for build in builds:
-                if build['date'] is not None:
-                    build_date = arrow.get(build['date'], 'UTC')
-                    human_delta = build_date.humanize(arrow.utcnow(),
-                        locale=self.app_locale)
-                else:
-                    human_delta = _('Unknown')
+    def report_progress(self, byte_count, name):
+        self.bytes_done += byte_count
+        self.emit_progress(name)
 
-                self.builds_combo.addItem(
-                    '{name} ({delta}) [{number}]'.format(name=build['name'], delta=human_delta,
-                        number=build['number']), userData=build)
-            
-            main_tab = self.get_main_tab()
-            game_dir_group_box = main_tab.game_dir_group_box
+    def copy_dir(self, src_path, dst_path):
+        copied_before = self.bytes_done
 
-            if not game_dir_group_box.game_started:
-                self.builds_combo.setEnabled(True)
-            else:
-                self.previous_bc_enabled = True
+        def report_copy(copied_bytes, total_bytes, relative_path):
+            self.bytes_done = copied_before + copied_bytes
+            self.emit_progress(relative_path)
 
-            if game_dir_group_box.exe_path is not None:
-                self.update_button.setText(_('Update game'))
-            else:
-                self.update_button.setText(_('Install game'))
+        self.copier = TreeCopier(src_path, dst_path, self.skips, report_copy)
+        if self.cancelled:
+            raise OperationCancelled()
+        self.copier.run()
 
-            # Populate stable changelog
+    def run(self):
+        try:
+            if not self.move:
+                # Renames are immediate, only copies are measured
+                self.total_bytes = sum(tree_size(src_path)
+                    for src_path, dst_path in self.carried_dirs)
+
+            for src_path, dst_path in self.carried_dirs:
+                if self.cancelled:
+                    return
+                # The previous version stays, so its directories are copied
+                # and no file is shared with it
+                if not self.move:
+                    self.copy_dir(src_path, dst_path)
+                elif carry_over(src_path, dst_path, self.skips,
+                    self.report_progress, self.is_cancelled):
+                    self.moved_dirs.append((src_path, dst_path))
+        except OperationCancelled:
+            return
+        except OSError as e:
+            self.failed.emit(str(e))
+            return
 
-            self.changelog_content.setHtml(cons.STABLE_CHANGELOG)
+        self.completed.emit()
 
-            
-        elif selected_branch is self.experimental_radio_button:
-            release_asset = cons.BASE_ASSETS['Tiles'][selected_platform]
 
-            self.start_lb_request(release_asset)
-            self.refresh_changelog()
+class RemoveTreeThread(QThread):
+    progress = pyqtSignal(int, int, str)
+    completed = pyqtSignal()
+    failed = pyqtSignal(object)
 
-    def refresh_changelog(self):
-        if self.changelog_http_reply is not None:
-            self.changelog_http_data = None
-            self.changelog_http_reply.abort()
-            self.changelog_http_reply = None
+    def __init__(self, path):
+        super(RemoveTreeThread, self).__init__()
 
-        main_window = self.get_main_window()
+        self.remover = TreeRemover(path, self.report_progress)
+        self.last_progress = 0
 
-        status_bar = main_window.statusBar()
-        status_bar.clearMessage()
-        self.changelog_content.setHtml(_('<h3>Loading changelog...</h3>'))
+    def __del__(self):
+        self.wait()
 
-        status_bar.busy += 1
+    def cancel(self):
+        self.remover.cancel()
 
-        changelog_label = QLabel()
-        changelog_label.setText(_('Fetching latest build changelogs'))
-        status_bar.addWidget(changelog_label, 100)
-        self.changelog_label = changelog_label
+    def report_progress(self, deleted_files, total_files, path):
+        now = time.monotonic()
+        if (deleted_files == total_files or
+            now - self.last_progress >= cons.PROGRESS_UPDATE_INTERVAL):
+            self.last_progress = now
+            self.progress.emit(deleted_files, total_files, path)
 
-        progress_bar = QProgressBar()
-        status_bar.addWidget(progress_bar)
-        self.changelog_progress_bar = progress_bar
+    def run(self):
+        try:
+            self.remover.run()
+        except OperationCancelled:
+            return
+        except OSError as e:
+            self.failed.emit(e)
+            return
 
-        progress_bar.setMinimum(0)
+        self.completed.emit()
 
-        self.changelog_http_data = BytesIO()
 
-        request = QNetworkRequest(QUrl(cons.CHANGELOG_URL))
-        request.setRawHeader(b'User-Agent',
-            b'CDDA-Game-Launcher/' + version.encode('utf8'))
+class TrashReaperThread(QThread):
+    def __init__(self, trash_dirs):
+        super(TrashReaperThread, self).__init__()
 
-        self.changelog_http_reply = self.qnam.get(request)
-        self.changelog_http_reply.finished.connect(self.changelog_http_finished)
-        self.changelog_http_reply.readyRead.connect(
-            self.changelog_http_ready_read)
-        self.changelog_http_reply.downloadProgress.connect(
-            self.changelog_dl_progress)
+        self.trash_dirs = trash_dirs
+        self.remover = None
+        self.cancelled = False
 
-    def changelog_http_finished(self):
-        main_window = self.get_main_window()
+    def __del__(self):
+        self.wait()
 
-        status_bar = main_window.statusBar()
-        status_bar.removeWidget(self.changelog_label)
-        status_bar.removeWidget(self.changelog_progress_bar)
+    def cancel(self):
+        self.cancelled = True
+        remover = self.remover
+        if remover is not None:
+            remover.cancel()
 
-        main_tab = self.get_main_tab()
-        game_dir_group_box = main_tab.game_dir_group_box
+    def run(self):
+        # The game keeps the disk while the trash is slowly emptied
+        try:
+            begin_background_mode()
+        except PyWinError:
+            pass
 
-        status_bar.busy -= 1
+        for trash_dir in self.trash_dirs:
+            try:
+                names = os.listdir(trash_dir)
+            except OSError:
+                continue
 
-        if not game_dir_group_box.game_started:
-            if status_bar.busy == 0:
-                status_bar.showMessage(_('Ready'))
-        else:
-            if status_bar.busy == 0:
-                status_bar.showMessage(_('Game process is running'))
+            for name in names:
+                path = os.path.join(trash_dir, name)
+                self.remover = TreeRemover(path, workers=1,
+                    rate=cons.TRASH_DELETE_RATE)
+                if self.cancelled:
+                    return
 
-        if self.changelog_http_data is not None:
-            self.changelog_content.setHtml(_('<h3>Parsing changelog...</h3>'))
+                try:
+                    if os.path.isdir(path) and not os.path.islink(path):
+                        self.remover.run()
+                    else:
+                        remove_file(path)
+                except OperationCancelled:
+                    return
+                except OSError as e:
+                    # What is left is deleted after the next launch
+                    logger.warning('Could not delete {0}: {1}'.format(path,
+                        e))
 
-            # Use thread to avoid blocking UI during parsing
-            parsing_thread = ChangelogParsingThread(self.changelog_http_data)
-            parsing_thread.completed.connect(
-                lambda x: self.changelog_content.setHtml(x.getvalue()))
-            parsing_thread.start()
+            try:
+                os.rmdir(trash_dir)
+            except OSError:
+                pass
 
-        self.changelog_http_data = None
-        self.changelog_http_reply = None
 
-    def changelog_http_ready_read(self):
-        self.changelog_http_data.write(self.changelog_http_reply.readAll())
+class CopyTreeThread(QThread):
+    progress = pyqtSignal(object, object, str)
+    completed = pyqtSignal()
+    failed = pyqtSignal(str)
 
-    def changelog_dl_progress(self, bytes_read, total_bytes):
-        if total_bytes == -1:
-            total_bytes = bytes_read * 2
-        self.changelog_progress_bar.setMaximum(total_bytes)
-        self.changelog_progress_bar.setValue(bytes_read)
+    def __init__(self, src, dst, skips):
+        super(CopyTreeThread, self).__init__()
 
-    def branch_clicked(self, button):
-        if button is self.stable_radio_button:
-            config_value = cons.CONFIG_BRANCH_STABLE
-        if button is self.experimental_radio_button:
-            config_value = cons.CONFIG_BRANCH_EXPERIMENTAL
-        
-        set_config_value(cons.CONFIG_BRANCH_KEY, config_value)
+        self.copier = TreeCopier(src, dst, skips, self.report_progress)
+        self.last_progress = 0
 
-        self.branch_changed()
-    
-    def branch_changed(self):
-        # Perform branch change
-        # Change available builds and changelog
+    def __del__(self):
+        self.wait()
 
-        self.refresh_builds()
+    def cancel(self):
+        self.copier.cancel()
 
-    def platform_clicked(self, button):
-        if button is self.x64_radio_button:
-            config_value = 'x64'
-        elif button is self.x86_radio_button:
-            config_value = 'x86'
+    def report_progress(self, copied_bytes, total_bytes, relative_path):
+        now = time.monotonic()
+        if (copied_bytes == 0 or copied_bytes == total_bytes or
+            now - self.last_progress >= cons.PROGRESS_UPDATE_INTERVAL):
+            self.last_progress = now
+            self.progress.emit(copied_bytes, total_bytes, relative_path)
 
-        set_config_value('platform', config_value)
+    def run(self):
+        try:
+            self.copier.run()
+        except OperationCancelled:
+            return
+        except OSError as e:
+            self.failed.emit(str(e))
+            return
 
-        self.refresh_builds()
+        self.completed.emit()
 
 
 class ChangelogParsingThread(QThread):
@@ -3142,7 +4129,7 @@ class ChangelogParsingThread(QThread):
 
 # Recursively delete an entire directory tree while showing progress in a
 # status bar. Also display a dialog to retry the delete if there is a problem.
-class ProgressRmTree(QTimer):
+class ProgressRmTree(QObject):
     completed = pyqtSignal()
     aborted = pyqtSignal()
 
@@ -3162,209 +4149,107 @@ class ProgressRmTree(QTimer):
         self.status_label = None
         self.progress_bar = None
 
-        self.analysing = False
-        self.deleting = False
+        self.remove_thread = None
         self.delete_completed = False
 
-    def step(self):
-        if self.analysing:
-            if self.current_scan is None:
-                self.current_scan = scandir(self.src)
-            else:
-                try:
-                    entry = next(self.current_scan)
-                    self.source_entries.append(entry)
-                    if entry.is_dir():
-                        self.next_scans.append(entry.path)
-                    elif entry.is_file():
-                        self.total_files += 1
-
-                        files_text = ngettext('file', 'files', self.total_files)
-
-                        self.status_label.setText(_('Analysing {name} - Found '
-                            '{file_count} {files}').format(
-                                name=self.name,
-                                file_count=self.total_files,
-                                files=files_text))
-
-                except StopIteration:
-                    if len(self.next_scans) > 0:
-                        self.current_scan = scandir(self.next_scans.popleft())
-                    else:
-                        self.analysing = False
-
-                        if len(self.source_entries) > 0:
-                            self.deleting = True
-
-                            progress_bar = QProgressBar()
-                            progress_bar.setRange(0, self.total_files)
-                            progress_bar.setValue(0)
-                            self.status_bar.addWidget(progress_bar)
-                            self.progress_bar = progress_bar
-
-                            self.deleted_files = 0
-                            self.current_entry = None
-                        else:
-                            self.delete_completed = True
-                            self.stop()
-
-        elif self.deleting:
-            if self.current_entry is None:
-                if len(self.source_entries) > 0:
-                    self.current_entry = self.source_entries.pop()
-                    self.display_entry(self.current_entry)
-                else:
-                    # Remove the source directory
-                    while os.path.exists(self.src):
-                        try:
-                            try:
-                                os.rmdir(self.src)
-                            except OSError:
-                                # Remove read-only and try again
-                                os.chmod(self.src, stat.S_IWRITE)
-                                os.rmdir(self.src)
-                        except OSError as e:
-                            retry_msgbox = QMessageBox()
-                            retry_msgbox.setWindowTitle(
-                                _('Cannot remove directory'))
-
-                            process = None
-                            if e.filename is not None:
-                                process = find_process_with_file_handle(
-                                    e.filename)
-
-                            text = _('''
-<p>The launcher failed to remove the following directory: {directory}</p>
-<p>When trying to remove or access {filename}, the launcher raised the
-following error: {error}</p>''').format(
-                                directory=html.escape(self.src),
-                                filename=html.escape(e.filename),
-                                error=html.escape(e.strerror))
-
-                            if process is None:
-                                text = text + _('''
-<p>No process seems to be using that file or directory.</p>''')
-                            else:
-                                text = text + _('''
-<p>The process <strong>{image_file_name} ({pid})</strong> is currently using
-that file or directory. You might need to end it if you want to retry.</p>'''
-                                ).format(
-                                    image_file_name=process['image_file_name'],
-                                    pid=process['pid'])
-
-                            retry_msgbox.setText(text)
-                            retry_msgbox.setInformativeText(_('Do you want to '
-                                'retry removing this directory?'))
-                            retry_msgbox.addButton(
-                                _('Retry removing the directory'),
-                                QMessageBox.YesRole)
-                            retry_msgbox.addButton(_('Cancel the operation'),
-                                QMessageBox.NoRole)
-                            retry_msgbox.setIcon(QMessageBox.Critical)
-
-                            if retry_msgbox.exec() == 1:
-                                self.deleting = False
-                                self.stop()
-                                break
-
-                    self.deleting = False
-                    self.delete_completed = True
-                    self.stop()
-            else:
-                while os.path.exists(self.current_entry.path):
-                    try:
-                        if self.current_entry.is_dir():
-                            try:
-                                os.rmdir(self.current_entry.path)
-                            except OSError:
-                                # Remove read-only and try again
-                                os.chmod(self.current_entry.path, stat.S_IWRITE)
-                                os.rmdir(self.current_entry.path)
-                        elif self.current_entry.is_file():
-                            try:
-                                os.unlink(self.current_entry.path)
-                            except OSError:
-                                # Remove read-only and try again
-                                os.chmod(self.current_entry.path, stat.S_IWRITE)
-                                os.unlink(self.current_entry.path)
-                    except OSError as e:
-                        retry_msgbox = QMessageBox()
-                        retry_msgbox.setWindowTitle(
-                            _('Cannot remove directory'))
-
-                        process = None
-                        if e.filename is not None:
-                            process = find_process_with_file_handle(e.filename)
-
-                        text = _('''
-<p>The launcher failed to remove the following directory: {directory}</p>
-<p>When trying to remove or access {filename}, the launcher raised the
-following error: {error}</p>''').format(
-                            directory=html.escape(self.src),
-                            filename=html.escape(e.filename),
-                            error=html.escape(e.strerror))
-
-                        if process is None:
-                            text = text + _('''
-<p>No process seems to be using that file or directory.</p>''')
-                        else:
-                            text = text + _('''
-<p>The process <strong>{image_file_name} ({pid})</strong> is currently using
-that file or directory. You might need to end it if you want to retry.</p>'''
-                            ).format(image_file_name=process['image_file_name'],
-                                pid=process['pid'])
-
-                        retry_msgbox.setText(text)
-                        retry_msgbox.setInformativeText(_('Do you want to '
-                            'retry removing this directory?'))
-                        retry_msgbox.addButton(
-                            _('Retry removing the directory'),
-                            QMessageBox.YesRole)
-                        retry_msgbox.addButton(_('Cancel the operation'),
-                            QMessageBox.NoRole)
-                        retry_msgbox.setIcon(QMessageBox.Critical)
-
-                        if retry_msgbox.exec() == 1:
-                            self.deleting = False
-                            self.stop()
-                            break
-
-                self.current_entry = None
-                self.deleted_files += 1
-
-                self.progress_bar.setValue(self.deleted_files)
-    def display_entry(self, entry):
-        if self.status_label is not None:
-            entry_rel_path = os.path.relpath(entry.path, self.src)
-            self.status_label.setText(
-                _('Deleting {name} - {entry}').format(name=self.name,
-                    entry=entry_rel_path))
-
     def start(self):
         self.started = True
         self.status_bar.clearMessage()
         self.status_bar.busy += 1
 
-        self.analysing = True
         status_label = QLabel()
         status_label.setText(_('Analysing {name}').format(name=self.name))
         self.status_bar.addWidget(status_label, 100)
         self.status_label = status_label
 
-        self.total_files = 0
+        progress_bar = QProgressBar()
+        progress_bar.setRange(0, 0)
+        self.status_bar.addWidget(progress_bar)
+        self.progress_bar = progress_bar
+
+        self.start_thread()
+
+    def start_thread(self):
+        remove_thread = RemoveTreeThread(self.src)
+        remove_thread.progress.connect(self.remove_progress)
+        remove_thread.completed.connect(self.remove_completed)
+        remove_thread.failed.connect(self.remove_failed)
+        remove_thread.start()
+
+        self.remove_thread = remove_thread
+
+    def remove_progress(self, deleted_files, total_files, path):
+        self.progress_bar.setRange(0, max(1, total_files))
+        self.progress_bar.setValue(deleted_files)
 
-        self.timeout.connect(self.step)
+        entry_rel_path = os.path.relpath(path, self.src)
+        self.status_label.setText(
+            _('Deleting {name} - {entry}').format(name=self.name,
+                entry=entry_rel_path))
 
-        self.current_scan = None
-        self.next_scans = deque()
-        self.source_entries = deque()
+    def remove_completed(self):
+        self.remove_thread = None
+        self.delete_completed = True
+        self.stop()
 
-        super(ProgressRmTree, self).start(0)
+    def remove_failed(self, e):
+        self.remove_thread = None
+
+        retry_msgbox = QMessageBox()
+        retry_msgbox.setWindowTitle(
+            _('Cannot remove directory'))
+
+        filename = e.filename
+        if filename is None:
+            filename = self.src
+        process = find_process_with_file_handle(filename)
+
+        text = _('''
+<p>The launcher failed to remove the following directory: {directory}</p>
+<p>When trying to remove or access {filename}, the launcher raised the
+following error: {error}</p>''').format(
+            directory=html.escape(self.src),
+            filename=html.escape(filename),
+            error=html.escape(e.strerror or str(e)))
+
+        if process is None:
+            text = text + _('''
+<p>No process seems to be using that file or directory.</p>''')
+        else:
+            text = text + _('''
+<p>The process <strong>{image_file_name} ({pid})</strong> is currently using
+that file or directory. You might need to end it if you want to retry.</p>'''
+            ).format(image_file_name=process['image_file_name'],
+                pid=process['pid'])
+
+        retry_msgbox.setText(text)
+        retry_msgbox.setInformativeText(_('Do you want to '
+            'retry removing this directory?'))
+        retry_msgbox.addButton(
+            _('Retry removing the directory'),
+            QMessageBox.YesRole)
+        retry_msgbox.addButton(_('Cancel the operation'),
+            QMessageBox.NoRole)
+        retry_msgbox.setIcon(QMessageBox.Critical)
+
+        if retry_msgbox.exec() == 1:
+            self.stop()
+        else:
+            # The files already deleted are skipped by the next scan
+            self.start_thread()
 
     def stop(self):
-        super(ProgressRmTree, self).stop()
+        remove_thread = self.remove_thread
+        if remove_thread is not None:
+            remove_thread.progress.disconnect()
+            remove_thread.completed.disconnect()
+            remove_thread.failed.disconnect()
+            remove_thread.cancel()
+            remove_thread.wait()
+            self.remove_thread = None
 
         if self.started:
+            self.started = False
             self.status_bar.busy -= 1
             if self.status_label is not None:
                 self.status_bar.removeWidget(self.status_label)
@@ -3379,7 +4264,7 @@ that file or directory. You might need to end it if you want to retry.</p>'''
 
 # Recursively copy an entire directory tree while showing progress in a
 # status bar. Optionally skip files or directories.
-class ProgressCopyTree(QTimer):
+class ProgressCopyTree(QObject):
     completed = pyqtSignal()
     aborted = pyqtSignal()
 
@@ -3399,185 +4284,104 @@ class ProgressCopyTree(QTimer):
         self.name = name
 
         self.started = False
-        self.callback = None
 
         self.status_label = None
         self.copying_speed_label = None
         self.copying_size_label = None
         self.progress_bar = None
 
-        self.source_file = None
-        self.destination_file = None
-
-        self.analysing = False
-        self.copying = False
+        self.copy_thread = None
         self.copy_completed = False
 
-    def step(self):
-        if self.analysing:
-            if self.current_scan is None:
-                self.current_scan = scandir(self.src)
-            else:
-                try:
-                    entry = next(self.current_scan)
-                    if self.skips is None or entry.path not in self.skips:
-                        self.source_entries.append(entry)
-                        if entry.is_dir():
-                            self.next_scans.append(entry.path)
-                        elif entry.is_file():
-                            self.total_files += 1
-                            self.total_copy_size += entry.stat().st_size
-
-                            files_text = ngettext('file', 'files',
-                                self.total_files)
-
-                            self.status_label.setText(_('Analysing {name} - '
-                                'Found {file_count} {files} ({size})').format(
-                                    name=self.name,
-                                    file_count=self.total_files,
-                                    files=files_text,
-                                    size=sizeof_fmt(self.total_copy_size)))
+    def start(self):
+        self.started = True
+        self.status_bar.clearMessage()
+        self.status_bar.busy += 1
 
-                except StopIteration:
-                    if len(self.next_scans) > 0:
-                        self.current_scan = scandir(self.next_scans.popleft())
-                    else:
-                        self.analysing = False
-
-                        os.makedirs(self.dst)
-
-                        if len(self.source_entries) > 0:
-                            self.copying = True
-
-                            copying_speed_label = QLabel()
-                            copying_speed_label.setText(_('{bytes_sec}/s'
-                                ).format(bytes_sec=sizeof_fmt(0)))
-                            self.status_bar.addWidget(copying_speed_label)
-                            self.copying_speed_label = copying_speed_label
-
-                            copying_size_label = QLabel()
-                            copying_size_label.setText(
-                                '{bytes_read}/{total_bytes}'
-                                .format(bytes_read=sizeof_fmt(0),
-                                        total_bytes=sizeof_fmt(self.total_copy_size))
-                            )
-                            self.status_bar.addWidget(copying_size_label)
-                            self.copying_size_label = copying_size_label
-
-                            progress_bar = QProgressBar()
-                            progress_bar.setRange(0, self.total_copy_size)
-                            progress_bar.setValue(0)
-                            self.status_bar.addWidget(progress_bar)
-                            self.progress_bar = progress_bar
-
-                            self.copied_size = 0
-                            self.copied_files = 0
-                            self.copy_speed_count = 0
-                            self.last_copied_bytes = 0
-                            self.last_copied = datetime.utcnow()
-                            self.current_entry = None
-                            self.source_file = None
-                            self.destination_file = None
-                        else:
-                            self.copy_completed = True
-                            self.stop()
-
-        elif self.copying:
-            if self.current_entry is None:
-                if len(self.source_entries) > 0:
-                    self.current_entry = self.source_entries.popleft()
-                    self.display_entry(self.current_entry)
-                else:
-                    self.copying = False
-                    self.copy_completed = True
-                    self.stop()
-            elif self.source_file is None and self.destination_file is None:
-                relpath = os.path.relpath(self.current_entry.path, self.src)
-                dstpath = os.path.join(self.dst, relpath)
-                self.dstpath = dstpath
-
-                if self.current_entry.is_dir():
-                    os.makedirs(dstpath)
-                    self.current_entry = None
-                elif self.current_entry.is_file():
-                    filedir = os.path.dirname(dstpath)
-                    if not os.path.isdir(filedir):
-                        os.makedirs(filedir)
-                    self.source_file = open(self.current_entry.path, 'rb')
-                    self.destination_file = open(dstpath, 'wb')
-            else:
-                buf = self.source_file.read(cons.READ_BUFFER_SIZE)
-                buf_len = len(buf)
-                if buf_len == 0:
-                    self.source_file.close()
-                    self.destination_file.close()
-                    shutil.copystat(self.current_entry.path, self.dstpath)
-                    self.source_file = None
-                    self.destination_file = None
-                    self.current_entry = None
-
-                    self.copied_files += 1
-                else:
-                    self.destination_file.write(buf)
+        status_label = QLabel()
+        status_label.setText(_('Analysing {name}').format(name=self.name))
+        self.status_bar.addWidget(status_label, 100)
+        self.status_label = status_label
 
-                    self.copied_size += buf_len
-                    self.progress_bar.setValue(self.copied_size)
+        copy_thread = CopyTreeThread(self.src, self.dst, self.skips)
+        copy_thread.progress.connect(self.copy_progress)
+        copy_thread.completed.connect(self.copy_finished)
+        copy_thread.failed.connect(self.copy_failed)
+        copy_thread.start()
 
-                    self.copy_speed_count += 1
+        self.copy_thread = copy_thread
 
-                    if self.copy_speed_count % 10 == 0:
-                        self.copying_size_label.setText(
-                            '{bytes_read}/{total_bytes}'
-                            .format(bytes_read=sizeof_fmt(self.copied_size),
-                                    total_bytes=sizeof_fmt(self.total_copy_size))
-                        )
+    def copy_progress(self, copied_bytes, total_bytes, relative_path):
+        if self.progress_bar is None:
+            copying_speed_label = QLabel()
+            copying_speed_label.setText(_('{bytes_sec}/s'
+                ).format(bytes_sec=sizeof_fmt(0)))
+            self.status_bar.addWidget(copying_speed_label)
+            self.copying_speed_label = copying_speed_label
 
-                        delta_bytes = self.copied_size - self.last_copied_bytes
-                        delta_time = datetime.utcnow() - self.last_copied
-                        if delta_time.total_seconds() == 0:
-                            delta_time = timedelta.resolution
+            copying_size_label = QLabel()
+            self.status_bar.addWidget(copying_size_label)
+            self.copying_size_label = copying_size_label
 
-                        bytes_secs = delta_bytes / delta_time.total_seconds()
-                        self.copying_speed_label.setText(_('{bytes_sec}/s'
-                            ).format(bytes_sec=sizeof_fmt(bytes_secs)))
+            # The progress is counted in KiB to stay in the range of the bar
+            progress_bar = QProgressBar()
+            progress_bar.setRange(0, max(1, total_bytes // 1024))
+            self.status_bar.addWidget(progress_bar)
+            self.progress_bar = progress_bar
 
-                        self.last_copied_bytes = self.copied_size
-                        self.last_copied = datetime.utcnow()
+            self.last_copied_bytes = copied_bytes
+            self.last_copied = time.monotonic()
 
+        self.progress_bar.setValue(copied_bytes // 1024)
+        self.copying_size_label.setText(
+            '{bytes_read}/{total_bytes}'
+            .format(bytes_read=sizeof_fmt(copied_bytes),
+                    total_bytes=sizeof_fmt(total_bytes))
+        )
 
-    def display_entry(self, entry):
-        if self.status_label is not None:
-            entry_rel_path = os.path.relpath(entry.path, self.src)
+        if relative_path != '':
             self.status_label.setText(
                 _('Copying {name} - {entry}').format(name=self.name,
-                    entry=entry_rel_path))
+                    entry=relative_path))
 
-    def start(self):
-        self.started = True
-        self.status_bar.clearMessage()
-        self.status_bar.busy += 1
+        now = time.monotonic()
+        delta_time = now - self.last_copied
+        if delta_time >= 1:
+            bytes_secs = (copied_bytes - self.last_copied_bytes) / delta_time
+            self.copying_speed_label.setText(_('{bytes_sec}/s'
+                ).format(bytes_sec=sizeof_fmt(bytes_secs)))
 
-        self.analysing = True
-        status_label = QLabel()
-        status_label.setText(_('Analysing {name}').format(name=self.name))
-        self.status_bar.addWidget(status_label, 100)
-        self.status_label = status_label
+            self.last_copied_bytes = copied_bytes
+            self.last_copied = now
 
-        self.total_copy_size = 0
-        self.total_files = 0
+    def copy_finished(self):
+        self.copy_thread = None
+        self.copy_completed = True
+        self.stop()
 
-        self.timeout.connect(self.step)
+    def copy_failed(self, error):
+        self.copy_thread = None
 
-        self.current_scan = None
-        self.next_scans = deque()
-        self.source_entries = deque()
+        msg = _('Could not copy {name}: {error}').format(name=self.name,
+            error=error)
+        logger.warning(msg)
 
-        super(ProgressCopyTree, self).start(0)
+        self.stop()
+        self.status_bar.showMessage(msg)
 
     def stop(self):
-        super(ProgressCopyTree, self).stop()
+        copy_thread = self.copy_thread
+        if copy_thread is not None:
+            copy_thread.progress.disconnect()
+            copy_thread.completed.disconnect()
+            copy_thread.failed.disconnect()
+            copy_thread.cancel()
+            # The workers remove the file they were writing
+            copy_thread.wait()
+            self.copy_thread = None
 
         if self.started:
+            self.started = False
             self.status_bar.busy -= 1
             if self.status_label is not None:
                 self.status_bar.removeWidget(self.status_label)
@@ -3588,11 +4392,6 @@ class ProgressCopyTree(QTimer):
             if self.copying_size_label is not None:
                 self.status_bar.removeWidget(self.copying_size_label)
 
-            if self.source_file is not None:
-                self.source_file.close()
-            if self.destination_file is not None:
-                self.destination_file.close()
-
         if self.copy_completed:
             self.completed.emit()
         else:
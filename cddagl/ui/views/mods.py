@@ -25,6 +25,7 @@ from werkzeug.utils import secure_filename
 
 import cddagl.constants as cons
 from cddagl import __version__ as version
+from cddagl.analysis import analysis_cache
 from cddagl.constants import get_data_path, get_cddagl_path
 from cddagl.functions import sizeof_fmt, delete_path
 from cddagl.i18n import proxy_gettext as _
@@ -1159,52 +1160,6 @@ class ModsTab(QTabWidget):
                 if selected_info is self.current_repo_info:
                     self.size_le.setText(_('Unknown'))
 
-    def config_info(self, config_file):
-        val = {}
-        keys = ('ident', 'name', 'author', 'authors', 'description', 'category',
-            'version')
-        try:
-            with open(config_file, 'r', encoding='utf8') as f:
-                try:
-                    values = json.load(f)
-                    if isinstance(values, dict):
-                        if values.get('type', '') == 'MOD_INFO':
-                            for key in keys:
-                                val[key] = values.get(key, None)
-                    elif isinstance(values, list):
-                        for item in values:
-                            if (isinstance(item, dict)
-                                and item.get('type', '') == 'MOD_INFO'):
-                                    for key in keys:
-                                        val[key] = item.get(key, None)
-                                    break
-                except ValueError:
-                    pass
-        except FileNotFoundError:
-            return val
-        return val
-
-    def scan_size(self, mod_info):
-        next_scans = deque()
-        current_scan = scandir(mod_info['path'])
-
-        total_size = 0
-
-        while True:
-            try:
-                entry = next(current_scan)
-                if entry.is_dir():
-                    next_scans.append(entry.path)
-                elif entry.is_file():
-                    total_size += entry.stat().st_size
-            except StopIteration:
-                if len(next_scans) > 0:
-                    current_scan = scandir(next_scans.popleft())
-                else:
-                    break
-
-        return total_size
-
     def add_mod(self, mod_info):
         index = self.mods_model.rowCount()
         self.mods_model.insertRows(self.mods_model.rowCount(), 1)
@@ -1266,99 +1221,11 @@ class ModsTab(QTabWidget):
         mods_dir = os.path.join(new_dir, 'data', 'mods')
         user_mods_dir = os.path.join(new_dir, 'mods')
 
-        if os.path.isdir(mods_dir):
-            self.mods_dir = mods_dir
-
-            dir_scan = scandir(mods_dir)
-
-            while True:
-                try:
-                    entry = next(dir_scan)
-                    if entry.is_dir():
-                        mod_path = entry.path
-                        config_file = os.path.join(mod_path,
-                            'modinfo.json')
-                        if os.path.isfile(config_file):
-                            info = self.config_info(config_file)
-                            if 'ident' in info:
-                                mod_info = {
-                                    'path': mod_path,
-                                    'enabled': True
-                                }
-                                mod_info.update(info)
-
-                                self.mods.append(mod_info)
-                                mod_info['size'] = (
-                                    self.scan_size(mod_info))
-                                continue
-                        disabled_config_file = os.path.join(mod_path,
-                            'modinfo.json.disabled')
-                        if os.path.isfile(disabled_config_file):
-                            info = self.config_info(disabled_config_file)
-                            if 'ident' in info:
-                                mod_info = {
-                                    'path': mod_path,
-                                    'enabled': False
-                                }
-                                mod_info.update(info)
-
-                                self.mods.append(mod_info)
-                                mod_info['size'] = (
-                                    self.scan_size(mod_info))
-
-                except StopIteration:
-                    break
-
-        else:
-            self.mods_dir = None
-
-        if os.path.isdir(user_mods_dir):
-            self.user_mods_dir = user_mods_dir
-
-            dir_scan = scandir(user_mods_dir)
-
-            while True:
-                try:
-                    entry = next(dir_scan)
-                    if entry.is_dir():
-                        mod_path = entry.path
-                        config_file = os.path.join(mod_path,
-                            'modinfo.json')
-                        if os.path.isfile(config_file):
-                            info = self.config_info(config_file)
-                            if 'ident' in info:
-                                mod_info = {
-                                    'path': mod_path,
-                                    'enabled': True
-                                }
-                                mod_info.update(info)
-
-                                self.mods.append(mod_info)
-                                mod_info['size'] = (
-                                    self.scan_size(mod_info))
-                                continue
-                        disabled_config_file = os.path.join(mod_path,
-                            'modinfo.json.disabled')
-                        if os.path.isfile(disabled_config_file):
-                            info = self.config_info(disabled_config_file)
-                            if 'ident' in info:
-                                mod_info = {
-                                    'path': mod_path,
-                                    'enabled': False
-                                }
-                                mod_info.update(info)
-
-                                self.mods.append(mod_info)
-                                mod_info['size'] = (
-                                    self.scan_size(mod_info))
-
-                except StopIteration:
-                    break
-
-        else:
-            self.user_mods_dir = None
+        self.mods_dir = mods_dir if os.path.isdir(mods_dir) else None
+        self.user_mods_dir = (user_mods_dir if os.path.isdir(user_mods_dir)
+            else None)
 
-        # Sort installed mods
-        self.mods.sort(key=lambda x: x['name'])
+        # Installed mods are sorted by name
+        self.mods = analysis_cache.analyse('mods', new_dir)
         for mod_info in self.mods:
             self.add_mod(mod_info)
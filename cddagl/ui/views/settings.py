@@ -272,6 +272,33 @@ class UpdateSettingsGroupBox(QGroupBox):
         layout.addWidget(ka_dir_change_button, 1, 2)
         self.ka_dir_change_button = ka_dir_change_button
 
+        ka_size_group = QWidget()
+        ka_size_group.setSizePolicy(QSizePolicy.Maximum, QSizePolicy.Maximum)
+        ka_size_layout = QHBoxLayout()
+        ka_size_layout.setContentsMargins(0, 0, 0, 0)
+
+        ka_size_label = QLabel()
+        ka_size_layout.addWidget(ka_size_label)
+        self.ka_size_label = ka_size_label
+
+        ka_size_spinbox = QSpinBox()
+        ka_size_spinbox.setRange(100, 1024 * 1024)
+        ka_size_spinbox.setSingleStep(100)
+        ka_size_spinbox.setValue(int(get_config_value('archive_store_size',
+            str(cons.ARCHIVE_STORE_SIZE))))
+        ka_size_spinbox.valueChanged.connect(self.kas_changed)
+        ka_size_layout.addWidget(ka_size_spinbox)
+        self.ka_size_spinbox = ka_size_spinbox
+
+        ka_size_mib_label = QLabel()
+        ka_size_layout.addWidget(ka_size_mib_label)
+        self.ka_size_mib_label = ka_size_mib_label
+
+        ka_size_group.setLayout(ka_size_layout)
+        layout.addWidget(ka_size_group, 2, 0, 1, 3)
+        self.ka_size_group = ka_size_group
+        self.ka_size_layout = ka_size_layout
+
         arb_timer = QTimer()
         arb_timer.setInterval(int(get_config_value(
             'auto_refresh_builds_minutes', '30')) * 1000 * 60)
@@ -306,7 +333,7 @@ class UpdateSettingsGroupBox(QGroupBox):
         self.arb_min_label = arb_min_label
 
         arb_group.setLayout(arb_layout)
-        layout.addWidget(arb_group, 2, 0, 1, 3)
+        layout.addWidget(arb_group, 3, 0, 1, 3)
         self.arb_group = arb_group
         self.arb_layout = arb_layout
 
@@ -315,7 +342,7 @@ class UpdateSettingsGroupBox(QGroupBox):
             'remove_previous_version', 'False')) else Qt.Unchecked)
         remove_previous_version_checkbox.setCheckState(check_state)
         remove_previous_version_checkbox.stateChanged.connect(self.rpvc_changed)
-        layout.addWidget(remove_previous_version_checkbox, 3, 0, 1, 3)
+        layout.addWidget(remove_previous_version_checkbox, 4, 0, 1, 3)
         self.remove_previous_version_checkbox = (
             remove_previous_version_checkbox)
 
@@ -325,10 +352,36 @@ class UpdateSettingsGroupBox(QGroupBox):
         permanently_delete_files_checkbox.setCheckState(check_state)
         permanently_delete_files_checkbox.stateChanged.connect(
                 self.prfc_changed)
-        layout.addWidget(permanently_delete_files_checkbox, 4, 0, 1, 3)
+        layout.addWidget(permanently_delete_files_checkbox, 5, 0, 1, 3)
         self.permanently_delete_files_checkbox = (
             permanently_delete_files_checkbox)
 
+        delta_update_checkbox = QCheckBox()
+        check_state = (Qt.Checked if config_true(get_config_value(
+            'delta_update', 'True')) else Qt.Unchecked)
+        delta_update_checkbox.setCheckState(check_state)
+        delta_update_checkbox.stateChanged.connect(self.duc_changed)
+        layout.addWidget(delta_update_checkbox, 6, 0, 1, 3)
+        self.delta_update_checkbox = delta_update_checkbox
+
+        prefetch_builds_checkbox = QCheckBox()
+        check_state = (Qt.Checked if config_true(get_config_value(
+            'prefetch_builds', 'False')) else Qt.Unchecked)
+        prefetch_builds_checkbox.setCheckState(check_state)
+        prefetch_builds_checkbox.stateChanged.connect(self.pbc_changed)
+        layout.addWidget(prefetch_builds_checkbox, 7, 0, 1, 3)
+        self.prefetch_builds_checkbox = prefetch_builds_checkbox
+
+        prestage_builds_checkbox = QCheckBox()
+        check_state = (Qt.Checked if config_true(get_config_value(
+            'prestage_builds', 'False')) else Qt.Unchecked)
+        prestage_builds_checkbox.setCheckState(check_state)
+        prestage_builds_checkbox.setEnabled(
+            prefetch_builds_checkbox.isChecked())
+        prestage_builds_checkbox.stateChanged.connect(self.psbc_changed)
+        layout.addWidget(prestage_builds_checkbox, 8, 0, 1, 3)
+        self.prestage_builds_checkbox = prestage_builds_checkbox
+
         self.setLayout(layout)
         self.set_text()
 
@@ -343,6 +396,11 @@ class UpdateSettingsGroupBox(QGroupBox):
         self.keep_archive_copy_checkbox.setText(
             _('Keep a copy of the downloaded '
             'archive in the following directory:'))
+        self.keep_archive_directory_line.setPlaceholderText(
+            _('Default directory'))
+        self.ka_size_label.setText(
+            _('Remove the least recently used archives above'))
+        self.ka_size_mib_label.setText(_('MiB'))
         self.auto_refresh_builds_checkbox.setText(
             _('Automatically refresh builds list every'))
         self.arb_min_label.setText(_('minutes'))
@@ -351,6 +409,25 @@ class UpdateSettingsGroupBox(QGroupBox):
         self.permanently_delete_files_checkbox.setText(_(
             'Permanently delete files instead of moving them in the recycle '
             'bin (not recommended)'))
+        self.delta_update_checkbox.setText(_(
+            'Reuse the unchanged files of the current version when updating'))
+        self.delta_update_checkbox.setToolTip(
+            _('Files which are the same in the new build are copied from '
+            'the current version instead of being extracted again.\n'
+            'They are hard linked when the previous version is removed after '
+            'the update.'))
+        self.prefetch_builds_checkbox.setText(_(
+            'Download the newest build in the background'))
+        self.prefetch_builds_checkbox.setToolTip(
+            _('The newest build is downloaded and verified at a low priority '
+            'when the builds are refreshed,\nso updating does not have to '
+            'wait for the download.'))
+        self.prestage_builds_checkbox.setText(_(
+            'Also extract it in advance in the game directory'))
+        self.prestage_builds_checkbox.setToolTip(
+            _('Updating then only has to swap the new build with the current '
+            'version.\nThis needs the disk space of the extracted build until '
+            'the update.'))
         self.setTitle(_('Update/Installation'))
 
     def get_settings_tab(self):
@@ -397,9 +474,28 @@ class UpdateSettingsGroupBox(QGroupBox):
     def prfc_changed(self, state):
         set_config_value('permanently_delete_files', str(state != Qt.Unchecked))
 
+    def duc_changed(self, state):
+        set_config_value('delta_update', str(state != Qt.Unchecked))
+
+    def pbc_changed(self, state):
+        set_config_value('prefetch_builds', str(state != Qt.Unchecked))
+        self.prestage_builds_checkbox.setEnabled(state != Qt.Unchecked)
+
+        update_group_box = self.get_main_tab().update_group_box
+        if state != Qt.Unchecked:
+            update_group_box.prefetch_build()
+        else:
+            update_group_box.stop_prefetch()
+
+    def psbc_changed(self, state):
+        set_config_value('prestage_builds', str(state != Qt.Unchecked))
+
     def kacc_changed(self, state):
         set_config_value('keep_archive_copy', str(state != Qt.Unchecked))
 
+    def kas_changed(self, value):
+        set_config_value('archive_store_size', str(value))
+
     def set_ka_directory(self):
         options = QFileDialog.DontResolveSymlinks | QFileDialog.ShowDirsOnly
         directory = QFileDialog.getExistingDirectory(self,
@@ -24,6 +24,7 @@ from py7zlib import Archive7z, NoPasswordGivenError, FormatError
 
 import cddagl.constants as cons
 from cddagl import __version__ as version
+from cddagl.analysis import analysis_cache
 from cddagl.constants import get_data_path, get_cddagl_path
 from cddagl.functions import sizeof_fmt, delete_path
 from cddagl.i18n import proxy_gettext as _
@@ -1048,48 +1049,6 @@ class SoundpacksTab(QTabWidget):
                 if selected_info is self.current_repo_info:
                     self.size_le.setText(_('Unknown'))
 
-    def config_info(self, config_file):
-        val = {}
-        try:
-            with open(config_file, 'r', encoding='latin1') as f:
-                for line in f:
-                    if line.startswith('NAME'):
-                        space_index = line.find(' ')
-                        name = line[space_index:].strip().replace(
-                            ',', '')
-                        val['NAME'] = name
-                    elif line.startswith('VIEW'):
-                        space_index = line.find(' ')
-                        view = line[space_index:].strip()
-                        val['VIEW'] = view
-
-                    if 'NAME' in val and 'VIEW' in val:
-                        break
-        except FileNotFoundError:
-            return val
-        return val
-
-    def scan_size(self, soundpack_info):
-        next_scans = deque()
-        current_scan = scandir(soundpack_info['path'])
-
-        total_size = 0
-
-        while True:
-            try:
-                entry = next(current_scan)
-                if entry.is_dir():
-                    next_scans.append(entry.path)
-                elif entry.is_file():
-                    total_size += entry.stat().st_size
-            except StopIteration:
-                if len(next_scans) > 0:
-                    current_scan = scandir(next_scans.popleft())
-                else:
-                    break
-
-        return total_size
-
     def add_soundpack(self, soundpack_info):
         index = self.soundpacks_model.rowCount()
         self.soundpacks_model.insertRows(self.soundpacks_model.rowCount(), 1)
@@ -1148,46 +1107,8 @@ class SoundpacksTab(QTabWidget):
         if os.path.isdir(soundpacks_dir):
             self.soundpacks_dir = soundpacks_dir
 
-            dir_scan = scandir(soundpacks_dir)
-
-            while True:
-                try:
-                    entry = next(dir_scan)
-                    if entry.is_dir():
-                        soundpack_path = entry.path
-                        config_file = os.path.join(soundpack_path,
-                            'soundpack.txt')
-                        if os.path.isfile(config_file):
-                            info = self.config_info(config_file)
-                            if 'NAME' in info and 'VIEW' in info:
-                                soundpack_info = {
-                                    'path': soundpack_path,
-                                    'enabled': True
-                                }
-                                soundpack_info.update(info)
-
-                                self.soundpacks.append(soundpack_info)
-                                soundpack_info['size'] = (
-                                    self.scan_size(soundpack_info))
-                                self.add_soundpack(soundpack_info)
-                                continue
-                        disabled_config_file = os.path.join(soundpack_path,
-                            'soundpack.txt.disabled')
-                        if os.path.isfile(disabled_config_file):
-                            info = self.config_info(disabled_config_file)
-                            if 'NAME' in info and 'VIEW' in info:
-                                soundpack_info = {
-                                    'path': soundpack_path,
-                                    'enabled': False
-                                }
-                                soundpack_info.update(info)
-
-                                self.soundpacks.append(soundpack_info)
-                                soundpack_info['size'] = (
-                                    self.scan_size(soundpack_info))
-                                self.add_soundpack(soundpack_info)
-
-                except StopIteration:
-                    break
+            self.soundpacks = analysis_cache.analyse('soundpacks', new_dir)
+            for soundpack_info in self.soundpacks:
+                self.add_soundpack(soundpack_info)
         else:
             self.soundpacks_dir = None
@@ -401,6 +401,12 @@ class TabbedWindow(QMainWindow):
             self.save_geometry()
             event.accept()
 
+        if event.isAccepted():
+            # The trash is deleted after the next launch
+            main_tab = self.central_widget.main_tab
+            main_tab.stop_trash_reaper()
+            main_tab.update_group_box.stop_prefetch()
+
 
 class CentralWidget(QTabWidget):
     def __init__(self):
@@ -0,0 +1,613 @@
+import argparse
+import logging
+import os
+import shutil
+import sys
+import time
+import zipfile
+from datetime import datetime
+from urllib.parse import urlparse, unquote
+
+import cddagl.constants as cons
+from cddagl import __version__ as version
+from cddagl.analysis import find_executable
+from cddagl.archives import get_build_store, sha256_file
+from cddagl.assets import asset_index
+from cddagl.backups import (
+    auto_backup_name, prune_auto_backups, unique_backup_name, write_backup
+)
+from cddagl.builds import fetch_builds, user_agent
+from cddagl.constants import get_cddagl_path, get_locale_path
+from cddagl.download import (
+    download_dir_for, RangedDownload, DownloadCancelled, DownloadError
+)
+from cddagl.extraction import (
+    ArchiveExtractor, staging_dir_for, swap_entries, excluded_game_entries,
+    ARCHIVE_ERRORS
+)
+from cddagl.fileops import carry_over, TreeCopier, TreeRemover
+from cddagl.fingerprint import fingerprint_file, fingerprint_key
+from cddagl.i18n import (
+    load_gettext_locale, load_gettext_no_locale, proxy_gettext as _
+)
+from cddagl.planner import plan_update, PlanningError
+from cddagl.spans import SpanRecorder, write_record
+from cddagl.sql.functions import (
+    init_config, get_config_value, config_true, new_build,
+    get_exe_fingerprint, set_exe_fingerprint
+)
+
+logger = logging.getLogger('cddagl')
+
+# Directories of the previous version brought to the new build
+CARRIED_OVER_DIRS = ('config', 'save', 'templates', 'memorial', 'graveyard',
+    'save_backups')
+
+
+def carried_over_names():
+    """Return the names of the directories brought from the previous
+    version to the new build."""
+    excluded = set()
+    if config_true(get_config_value('prevent_save_move', 'False')):
+        excluded.add('save')
+
+    return [name for name in CARRIED_OVER_DIRS if name not in excluded]
+
+
+def carried_over_dirs(game_dir):
+    """Return the (source, target) paths of the directories of the previous
+    version to bring to the new build in game_dir.
+    """
+    previous_version_dir = os.path.join(game_dir, 'previous_version')
+
+    carried_dirs = []
+    for next_dir in carried_over_names():
+        src_path = os.path.join(previous_version_dir, next_dir)
+        dst_path = os.path.join(game_dir, next_dir)
+        if os.path.isdir(src_path) and not os.path.exists(dst_path):
+            carried_dirs.append((src_path, dst_path))
+
+    return carried_dirs
+
+
+def swap_exclusions(game_dir):
+    return excluded_game_entries(game_dir,
+        config_true(get_config_value('prevent_save_move', 'False')))
+
+
+def carry_over_skips(game_dir, version_dir=None):
+    # Skip debug files
+    if version_dir is None:
+        version_dir = os.path.join(game_dir, 'previous_version')
+    return set((
+        os.path.join(version_dir, 'config', 'debug.log'),
+        os.path.join(version_dir, 'config', 'debug.log.prev')
+    ))
+
+
+def planned_carry_over(game_dir):
+    """Return the directories of the current version in game_dir which an
+    update copies to the new build and the files left out of them. The
+    current version becomes the previous version, nothing is copied when it
+    is removed after the update.
+    """
+    if config_true(get_config_value('remove_previous_version', 'False')):
+        return [], set()
+
+    return ([os.path.join(game_dir, name) for name in carried_over_names()],
+        carry_over_skips(game_dir, game_dir))
+
+
+def custom_assets(assets_dir, previous_assets_dir, kind):
+    """Return the asset directories of previous_assets_dir whose identity is
+    not found in assets_dir.
+    """
+    official_set = asset_index.identities(assets_dir, kind)
+    previous_set = asset_index.identities(previous_assets_dir, kind)
+
+    return [path for ident, path in previous_set.items()
+        if ident not in official_set]
+
+
+def remove_tree(path):
+    if os.path.isdir(path):
+        TreeRemover(path).run()
+
+
+class UpdateError(Exception):
+    pass
+
+
+class Updater:
+    """Update or install the game in game_dir with a build, without the user
+    interface. The steps are the ones of the update in the main tab: the
+    archive is downloaded or taken from the build store and verified, the
+    saves are backed up, the build is extracted in a staging directory and
+    swapped with the current game, then the directories, custom tilesets,
+    soundpacks, mods and fonts of the previous version are brought over.
+    """
+
+    def __init__(self, game_dir, build, branch):
+        self.game_dir = os.path.abspath(game_dir)
+        self.build = build
+        self.branch = branch
+
+        self.previous_version_dir = os.path.join(self.game_dir,
+            'previous_version')
+        self.staging_dir = staging_dir_for(self.game_dir)
+
+        self.build_store = None
+        self.stored_archive = None
+        self.download_dir = None
+        self.archive_path = None
+        self.archive_sha256 = None
+        self.moved_dirs = []
+        self.last_progress = 0
+
+        self.spans = None
+
+    def progress(self, message, done, total):
+        now = time.monotonic()
+        if done == total or now - self.last_progress >= 1:
+            self.last_progress = now
+            if total > 0:
+                logger.info('{0}: {1:.0%}'.format(message, done / total))
+
+    def run(self):
+        exe_path = find_executable(self.game_dir)
+        if exe_path is not None:
+            kind = 'update'
+        else:
+            kind = 'install'
+
+        self.spans = SpanRecorder(kind=kind, branch=self.branch,
+            build=str(self.build['number']), launcher_version=version,
+            headless=True)
+        outcome = 'failed'
+
+        try:
+            os.makedirs(self.game_dir, exist_ok=True)
+
+            self.get_archive()
+            if (exe_path is not None and
+                config_true(get_config_value('backup_before_update',
+                    'False'))):
+                self.backup_saves()
+            fingerprints = self.extract(exe_path is not None)
+            self.clear_previous_dir()
+            self.install()
+            self.analyse(fingerprints)
+
+            try:
+                self.carry_over()
+                self.restore_custom_assets()
+            except BaseException:
+                self.rollback()
+                raise
+
+            if config_true(get_config_value('remove_previous_version',
+                'False')):
+                self.spans.begin('remove_previous')
+                remove_tree(self.previous_version_dir)
+
+            outcome = 'completed'
+        except KeyboardInterrupt:
+            outcome = 'cancelled'
+            raise
+        finally:
+            try:
+                remove_tree(self.staging_dir)
+            except OSError:
+                logger.exception('Could not delete %s', self.staging_dir)
+
+            try:
+                write_record(self.spans.finish(outcome))
+            except OSError:
+                logger.exception('Could not write the update timings')
+
+    def get_archive(self):
+        url = self.build['url']
+        asset_name = unquote(os.path.basename(urlparse(url).path))
+        self.asset_name = asset_name
+        self.archive_sha256 = self.build.get('sha256')
+
+        self.build_store = get_build_store()
+        if self.build_store is not None:
+            self.stored_archive = self.build_store.find(
+                str(self.build['number']), asset_name, self.archive_sha256)
+
+        if self.stored_archive is not None:
+            logger.info('Using the stored archive {0}'.format(
+                self.stored_archive['path']))
+            self.spans.set(archive='store')
+            self.archive_path = self.stored_archive['path']
+            self.archive_sha256 = self.stored_archive['sha256']
+            return
+
+        self.spans.set(archive='download')
+        self.spans.begin('download')
+
+        self.download_dir = download_dir_for(url)
+        os.makedirs(self.download_dir, exist_ok=True)
+        self.archive_path = os.path.join(self.download_dir, asset_name)
+
+        logger.info('Downloading {0}'.format(url))
+        download = RangedDownload(url, self.archive_path,
+            lambda done, total: self.progress('Downloading', done, total),
+            user_agent())
+        try:
+            download.run()
+        except (DownloadError, DownloadCancelled) as e:
+            raise UpdateError('Could not download {url}: {error}'.format(
+                url=url, error=e))
+
+        # Reading the archive again is only needed to check or store it
+        if self.archive_sha256 is not None or self.build_store is not None:
+            sha256 = sha256_file(self.archive_path)
+            if (self.archive_sha256 is not None and
+                sha256 != self.archive_sha256):
+                # A corrupted archive must not be resumed
+                os.remove(self.archive_path)
+                raise UpdateError('Could not download {url}: Checksum '
+                    'mismatch'.format(url=url))
+            self.archive_sha256 = sha256
+
+        self.spans.end(os.path.getsize(self.archive_path), 1)
+
+    def backup_saves(self):
+        """Compress the save directory in save_backups like the automatic
+        backup before an update of the backups tab.
+        """
+        save_dir = os.path.join(self.game_dir, 'save')
+        if not os.path.isdir(save_dir):
+            return
+
+        self.spans.begin('backup')
+
+        backup_dir = os.path.join(self.game_dir, 'save_backups')
+        os.makedirs(backup_dir, exist_ok=True)
+
+        prune_auto_backups(backup_dir, _('auto'),
+            int(get_config_value('max_auto_backups', '6')))
+
+        name = unique_backup_name(backup_dir,
+            auto_backup_name(_('auto'), _('before_update')))
+        backup_path = os.path.join(backup_dir, name + '.zip')
+
+        logger.info('Backing up the saves in {0}'.format(backup_path))
+        self.spans.end(*write_backup(self.game_dir, backup_path))
+
+    def extract(self, reuse):
+        remove_tree(self.staging_dir)
+        os.makedirs(self.staging_dir)
+
+        try:
+            with zipfile.ZipFile(self.archive_path) as z:
+                infolist = z.infolist()
+        except ARCHIVE_ERRORS:
+            self.archive_invalid()
+
+        # Unchanged files of the current version are copied instead of
+        # being extracted again. They are only linked when the previous
+        # version is deleted after the update, so no file is shared with it.
+        reuse_dir = None
+        if reuse and config_true(get_config_value('delta_update', 'True')):
+            reuse_dir = self.game_dir
+        link_reused = config_true(get_config_value('remove_previous_version',
+            'False'))
+
+        self.spans.begin('extraction')
+
+        logger.info('Extracting {0}'.format(self.archive_path))
+        extractor = ArchiveExtractor(self.archive_path, infolist,
+            self.staging_dir,
+            lambda done, total, name: self.progress('Extracting', done,
+                total),
+            cons.GAME_EXECUTABLES, reuse_dir, link_reused=link_reused)
+        try:
+            fingerprints = extractor.run()
+        except ARCHIVE_ERRORS:
+            self.archive_invalid()
+
+        self.spans.end(extractor.total_bytes, len(infolist),
+            reused_bytes=extractor.reused_bytes,
+            reused_files=extractor.reused_files)
+
+        # Keep the archive in the build store if selected in the settings
+        if self.build_store is not None and self.stored_archive is None:
+            try:
+                self.build_store.add(str(self.build['number']),
+                    self.asset_name, self.archive_sha256, self.archive_path)
+            except OSError:
+                logger.exception('Could not store %s', self.archive_path)
+
+        if self.download_dir is not None:
+            remove_tree(self.download_dir)
+
+        return fingerprints
+
+    def archive_invalid(self):
+        if self.stored_archive is not None:
+            self.build_store.remove(self.stored_archive)
+        if self.download_dir is not None:
+            remove_tree(self.download_dir)
+        raise UpdateError('Downloaded archive is invalid')
+
+    def clear_previous_dir(self):
+        self.spans.begin('clear_previous')
+        remove_tree(self.previous_version_dir)
+
+    def install(self):
+        self.spans.begin('install')
+        swap_entries(self.game_dir, self.staging_dir,
+            self.previous_version_dir, swap_exclusions(self.game_dir))
+
+    def analyse(self, fingerprints):
+        self.spans.begin('analysis')
+
+        exe_path = find_executable(self.game_dir)
+        if exe_path is None:
+            raise UpdateError('No executable found in the downloaded '
+                'archive. You might want to restore your previous version.')
+
+        fingerprint = fingerprints.get(os.path.basename(exe_path))
+        if fingerprint is None:
+            # An executable reused from the previous version keeps its
+            # cached fingerprint
+            cached = get_exe_fingerprint(*fingerprint_key(exe_path))
+            if cached is not None:
+                fingerprint = cached['sha256'], cached['version']
+            else:
+                fingerprint = fingerprint_file(exe_path)
+
+        sha256, game_version = fingerprint
+        set_exe_fingerprint(*fingerprint_key(exe_path), sha256, game_version)
+
+        stable_version = cons.STABLE_SHA256.get(sha256, None)
+        is_stable = stable_version is not None
+        if is_stable:
+            game_version = stable_version
+        if game_version == '':
+            game_version = 'Unknown'
+
+        new_build(game_version, sha256, is_stable, self.build['number'],
+            self.build['date'])
+
+        logger.info('Installed {version} build {number}'.format(
+            version=game_version, number=self.build['number']))
+
+    def carry_over(self):
+        carried_dirs = carried_over_dirs(self.game_dir)
+        if len(carried_dirs) == 0:
+            return
+
+        self.spans.begin('carry_over')
+
+        # The previous version is deleted after the update when this is
+        # enabled, so its directories can be moved. Otherwise they are
+        # copied, a linked file would be shared by both versions.
+        move = config_true(get_config_value('remove_previous_version',
+            'False'))
+        skips = carry_over_skips(self.game_dir)
+
+        for src_path, dst_path in carried_dirs:
+            logger.info('Restoring {0}'.format(os.path.basename(src_path)))
+            if not move:
+                TreeCopier(src_path, dst_path, skips).run()
+            elif carry_over(src_path, dst_path, skips):
+                self.moved_dirs.append((src_path, dst_path))
+
+    def copy_custom_assets(self, assets_dir, previous_assets_dir, kind):
+        if not (os.path.isdir(assets_dir) and
+            os.path.isdir(previous_assets_dir)):
+            return
+
+        for asset_dir in custom_assets(assets_dir, previous_assets_dir, kind):
+            target_dir = os.path.join(assets_dir,
+                os.path.basename(asset_dir))
+            if not os.path.exists(target_dir):
+                logger.info('Restoring {0}'.format(asset_dir))
+                TreeCopier(asset_dir, target_dir).run()
+
+    def restore_custom_assets(self):
+        self.spans.begin('custom_assets')
+
+        previous_version_dir = self.previous_version_dir
+
+        self.copy_custom_assets(os.path.join(self.game_dir, 'gfx'),
+            os.path.join(previous_version_dir, 'gfx'), 'tilesets')
+        self.copy_custom_assets(os.path.join(self.game_dir, 'data', 'sound'),
+            os.path.join(previous_version_dir, 'data', 'sound'),
+            'soundpacks')
+
+        mods_dir = os.path.join(self.game_dir, 'data', 'mods')
+        previous_mods_dir = os.path.join(previous_version_dir, 'data', 'mods')
+        self.copy_custom_assets(mods_dir, previous_mods_dir, 'mods')
+
+        user_mods_dir = os.path.join(self.game_dir, 'mods')
+        previous_user_mods_dir = os.path.join(previous_version_dir, 'mods')
+        if os.path.isdir(previous_user_mods_dir):
+            os.makedirs(user_mods_dir, exist_ok=True)
+            self.copy_custom_assets(user_mods_dir, previous_user_mods_dir,
+                'mods')
+
+        user_default_mods_file = os.path.join(mods_dir,
+            'user-default-mods.json')
+        previous_user_default_mods_file = os.path.join(previous_mods_dir,
+            'user-default-mods.json')
+        if (not os.path.exists(user_default_mods_file)
+            and os.path.isfile(previous_user_default_mods_file)):
+            shutil.copy2(previous_user_default_mods_file,
+                user_default_mods_file)
+
+        fonts_dir = os.path.join(self.game_dir, 'data', 'font')
+        previous_fonts_dir = os.path.join(previous_version_dir, 'data',
+            'font')
+        if os.path.isdir(fonts_dir) and os.path.isdir(previous_fonts_dir):
+            custom_set = (set(os.listdir(previous_fonts_dir)) -
+                set(os.listdir(fonts_dir)))
+            for entry in custom_set:
+                source = os.path.join(previous_fonts_dir, entry)
+                target = os.path.join(fonts_dir, entry)
+                if os.path.isfile(source):
+                    shutil.copy2(source, target)
+                elif os.path.isdir(source):
+                    TreeCopier(source, target).run()
+
+    def rollback(self):
+        """Put the former game back from previous_version."""
+        logger.info('Restoring the previous version')
+
+        for src_path, dst_path in reversed(self.moved_dirs):
+            os.rename(dst_path, src_path)
+        self.moved_dirs = []
+
+        swap_entries(self.game_dir, self.previous_version_dir,
+            self.staging_dir, swap_exclusions(self.game_dir))
+        if os.path.isdir(self.previous_version_dir):
+            os.rmdir(self.previous_version_dir)
+
+
+def select_build(builds, number=None):
+    for build in builds:
+        if build['url'] is None:
+            continue
+        if number is None or build['number'] == number:
+            return build
+
+    return None
+
+
+def check_plan(game_dir, build, is_update, ignore_disk_space=False):
+    """Log the disk space and the time the update should take. Return
+    False when there is not enough disk space to start it.
+    """
+    url = build['url']
+
+    archive_path = None
+    store_dir = None
+    build_store = get_build_store()
+    if build_store is not None:
+        stored_archive = build_store.find(str(build['number']),
+            unquote(os.path.basename(urlparse(url).path)),
+            build.get('sha256'))
+        if stored_archive is not None:
+            archive_path = stored_archive['path']
+        else:
+            store_dir = build_store.store_dir
+
+    # Reused files only take no space when they are linked
+    reuse = (is_update and
+        config_true(get_config_value('delta_update', 'True')) and
+        config_true(get_config_value('remove_previous_version', 'False')))
+    backup = is_update and config_true(get_config_value(
+        'backup_before_update', 'False'))
+    carried_dirs, skips = [], set()
+    if is_update:
+        carried_dirs, skips = planned_carry_over(game_dir)
+
+    try:
+        plan = plan_update(game_dir, url, archive_path, download_dir_for(url),
+            store_dir, reuse, backup, 'update' if is_update else 'install',
+            user_agent(), carried_dirs=carried_dirs, skips=skips)
+    except (PlanningError, OSError) as e:
+        # The update can still be done without knowing what it needs
+        logger.warning('Could not plan the update: {0}'.format(e))
+        return True
+
+    if plan.estimated_seconds is not None:
+        logger.info('The update should take about {0:.0f} s'.format(
+            plan.estimated_seconds))
+
+    for volume in plan.warnings():
+        logger.warning('Low disk space on {path}: {required} bytes needed, '
+            'up to {worst} bytes, {free} bytes free'.format(**volume))
+
+    shortages = plan.shortages()
+    for volume in shortages:
+        logger.error('Not enough disk space on {path}: {required} bytes '
+            'needed, {free} bytes free'.format(**volume))
+
+    return len(shortages) == 0 or ignore_disk_space
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m cddagl update',
+        description='Update or install the game without the user '
+        'interface.')
+    parser.add_argument('--game-dir', required=True,
+        help='game directory to update or install in')
+    parser.add_argument('--build', default=None,
+        help='build number to install (default: the latest build)')
+    parser.add_argument('--branch', default=cons.CONFIG_BRANCH_EXPERIMENTAL,
+        choices=(cons.CONFIG_BRANCH_STABLE, cons.CONFIG_BRANCH_EXPERIMENTAL),
+        help='branch of the build (default: %(default)s)')
+    parser.add_argument('--platform', default='x64', choices=('x64', 'x86'),
+        help='platform of the build (default: %(default)s)')
+    parser.add_argument('--ignore-disk-space', action='store_true',
+        help='update even if the disk space looks insufficient')
+    args = parser.parse_args(argv)
+
+    logger.setLevel(logging.INFO)
+    # main() can be called more than once from the same process
+    if len(logger.handlers) == 0:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+        logger.addHandler(handler)
+
+    init_config(get_cddagl_path())
+
+    # Automatic backups are named in the locale selected in the launcher
+    locale = get_config_value('locale', None)
+    if locale is None or locale == 'None':
+        load_gettext_no_locale()
+    else:
+        load_gettext_locale(get_locale_path(), locale)
+
+    try:
+        builds = fetch_builds(args.branch, args.platform)
+    except (OSError, ValueError) as e:
+        logger.error('Could not fetch the builds: {0}'.format(e))
+        return 1
+
+    build = select_build(builds, args.build)
+    if build is None:
+        if args.build is None:
+            logger.error('No build was found')
+        else:
+            logger.error('Build {0} was not found'.format(args.build))
+        return 1
+
+    game_dir = args.game_dir
+    exe_path = find_executable(game_dir) if os.path.isdir(game_dir) else None
+    if exe_path is None and os.path.isdir(game_dir) and os.listdir(game_dir):
+        logger.error('Cannot install the game in {0}, the directory is not '
+            'empty'.format(game_dir))
+        return 1
+
+    if not check_plan(game_dir, build, exe_path is not None,
+        args.ignore_disk_space):
+        return 1
+
+    logger.info('Updating CDDA to build {number} in {game_dir}'.format(
+        number=build['number'], game_dir=game_dir))
+    started = datetime.now()
+
+    try:
+        Updater(game_dir, build, args.branch).run()
+    except UpdateError as e:
+        logger.error(str(e))
+        return 1
+    except OSError as e:
+        logger.exception('Could not update the game: {0}'.format(e))
+        return 1
+    except KeyboardInterrupt:
+        logger.error('Update cancelled')
+        return 1
+
+    logger.info('Update completed in {0}'.format(datetime.now() - started))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
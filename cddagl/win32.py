@@ -118,6 +118,8 @@ PROCESS_VM_READ = DWORD(0x0010)
 
 INFINITE = DWORD(0xFFFFFFFF)
 
+THREAD_MODE_BACKGROUND_BEGIN = 0x00010000
+
 def WinErrorFromNtStatus(status):
     last_error = ntdll.RtlNtStatusToDosError(status)
     return WinError(last_error)
@@ -687,6 +689,12 @@ def find_process_with_file_handle(path):
 def get_ui_locale():
     return locale.windows_locale.get(kernel32.GetUserDefaultUILanguage(), None)
 
+def begin_background_mode():
+    ''' Lower the scheduling, I/O and memory priorities of the current thread
+    '''
+    win32process.SetThreadPriority(win32api.GetCurrentThread(),
+        THREAD_MODE_BACKGROUND_BEGIN)
+
 def activate_window(pid):
     handles = get_hwnds_for_pid(pid)
     if len(handles) > 0:
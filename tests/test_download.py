@@ -0,0 +1,162 @@
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cddagl.download import RangedDownload, RangeBitmap
+
+RANGE_REGEX = re.compile(r'bytes=(\d+)-(\d+)')
+
+CHUNK_SIZE = 1000
+PAYLOAD = bytes(random.Random(0).getrandbits(8) for i in range(5500))
+
+
+class PayloadHandler(BaseHTTPRequestHandler):
+    """Serve the payload of the server, honoring single byte ranges unless
+    the server ignores them."""
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(self.headers.get('Range'))
+
+        payload = server.payload
+        match = RANGE_REGEX.match(self.headers.get('Range') or '')
+        if match is None or not server.honor_range:
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(payload)))
+            self.send_header('ETag', server.etag)
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        start, end = int(match.group(1)), int(match.group(2))
+        end = min(end, len(payload) - 1)
+        self.send_response(206)
+        self.send_header('Content-Range', 'bytes {start}-{end}/{size}'.format(
+            start=start, end=end, size=len(payload)))
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('ETag', server.etag)
+        self.end_headers()
+        self.wfile.write(payload[start:end + 1])
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RangedDownloadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), PayloadHandler)
+        self.server.daemon_threads = True
+        self.server.payload = PAYLOAD
+        self.server.honor_range = True
+        self.server.etag = '"v1"'
+        self.server.requests = []
+
+        self.server_thread = threading.Thread(
+            target=self.server.serve_forever)
+        self.server_thread.start()
+
+        self.url = 'http://127.0.0.1:{port}/build.zip'.format(
+            port=self.server.server_address[1])
+        self.temp_dir = tempfile.mkdtemp()
+        self.target_path = os.path.join(self.temp_dir, 'build.zip')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.server_thread.join()
+        shutil.rmtree(self.temp_dir)
+
+    def download(self, connections=4):
+        progress = []
+        download = RangedDownload(self.url, self.target_path,
+            lambda bytes_read, total_bytes: progress.append(bytes_read),
+            connections=connections, chunk_size=CHUNK_SIZE)
+        download.run()
+        return progress
+
+    def write_partial(self, chunks, validator, data):
+        """Leave an interrupted download with the chunks done."""
+        with open(self.target_path + '.part', 'wb') as part_file:
+            part_file.write(data)
+
+        bitmap = RangeBitmap((len(PAYLOAD) + CHUNK_SIZE - 1) // CHUNK_SIZE)
+        for index in chunks:
+            bitmap.add(index)
+        with open(self.target_path + '.part.json', 'w',
+            encoding='utf8') as state_file:
+            json.dump({
+                'url': self.url,
+                'size': len(PAYLOAD),
+                'validator': validator,
+                'chunk_size': CHUNK_SIZE,
+                'bitmap': bytes(bitmap.bits).hex()
+            }, state_file)
+
+    def read_target(self):
+        with open(self.target_path, 'rb') as target_file:
+            return target_file.read()
+
+    def fetched_ranges(self):
+        # The first request probes the server with a one byte range
+        return set(self.server.requests[1:])
+
+    def test_download_over_several_connections(self):
+        progress = self.download()
+
+        self.assertEqual(self.read_target(), PAYLOAD)
+        self.assertEqual(progress[-1], len(PAYLOAD))
+        self.assertEqual(len(self.fetched_ranges()), 6)
+        self.assertFalse(os.path.exists(self.target_path + '.part'))
+        self.assertFalse(os.path.exists(self.target_path + '.part.json'))
+
+    def test_resume_fetches_missing_chunks(self):
+        # Done chunks hold the payload, the others were never written
+        data = bytearray(len(PAYLOAD))
+        for index in (0, 2):
+            start = index * CHUNK_SIZE
+            data[start:start + CHUNK_SIZE] = PAYLOAD[start:start + CHUNK_SIZE]
+        self.write_partial((0, 2), '"v1"', bytes(data))
+
+        self.download()
+
+        self.assertEqual(self.read_target(), PAYLOAD)
+        self.assertEqual(self.fetched_ranges(), set((
+            'bytes=1000-1999', 'bytes=3000-3999', 'bytes=4000-4999',
+            'bytes=5000-5499')))
+
+    def test_stream_when_ranges_are_ignored(self):
+        self.server.honor_range = False
+
+        self.download()
+
+        self.assertEqual(self.read_target(), PAYLOAD)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertFalse(os.path.exists(self.target_path + '.part.json'))
+
+    def test_restart_when_the_file_changed(self):
+        # Every chunk looks done, but for another version of the file
+        self.write_partial(range(6), '"v0"', bytes(len(PAYLOAD)))
+
+        self.download()
+
+        self.assertEqual(self.read_target(), PAYLOAD)
+        self.assertEqual(len(self.fetched_ranges()), 6)
+
+    def test_restart_when_the_size_changed(self):
+        self.write_partial(range(6), '"v1"', bytes(len(PAYLOAD)))
+        self.server.payload = PAYLOAD + b'more'
+
+        self.download()
+
+        self.assertEqual(self.read_target(), PAYLOAD + b'more')
+
+
+if __name__ == '__main__':
+    unittest.main()